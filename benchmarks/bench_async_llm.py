@@ -0,0 +1,73 @@
+"""Compare serial LLM calls with the async dispatcher against the offline fake.
+
+The fake model simulates per-request latency and random 429s, so this runs
+without network access or an API key:
+
+    python benchmarks/bench_async_llm.py --requests 200 --latency 0.5 --in-flight 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.llm_async import AsyncLLMDispatcher, TransientLLMError
+from src.llm_backends import FakeBackend
+
+
+def run_serial(model, prompts):
+    retries = 0
+    for prompt in prompts:
+        while True:
+            try:
+                model.generate(prompt)
+                break
+            except TransientLLMError:
+                retries += 1
+    return retries
+
+
+async def run_concurrent(dispatcher, prompts):
+    await asyncio.gather(*(dispatcher.generate(prompt) for prompt in prompts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--rate-limit-probability', type=float, default=0.05)
+    parser.add_argument('--in-flight', type=int, default=16)
+    parser.add_argument('--rpm', type=float, default=None)
+    parser.add_argument('--tpm', type=float, default=None)
+    parser.add_argument('--skip-serial', action='store_true')
+    args = parser.parse_args()
+    
+    prompts = [f"Generate a report for student {i}." for i in range(args.requests)]
+    
+    if not args.skip_serial:
+        model = FakeBackend(latency=args.latency,
+                            rate_limit_probability=args.rate_limit_probability, seed=0)
+        start = time.perf_counter()
+        retries = run_serial(model, prompts)
+        elapsed = time.perf_counter() - start
+        print(f"serial     : {elapsed:7.2f}s  {args.requests / elapsed:7.1f} req/s  "
+              f"({retries} retries)")
+        
+    model = FakeBackend(latency=args.latency, rate_limit_probability=args.rate_limit_probability,
+                        seed=0)
+    dispatcher = AsyncLLMDispatcher(model, max_in_flight=args.in_flight,
+                                    requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+                                    base_delay=args.latency)
+    start = time.perf_counter()
+    asyncio.run(run_concurrent(dispatcher, prompts))
+    elapsed = time.perf_counter() - start
+    stats = dispatcher.stats()
+    print(f"concurrent : {elapsed:7.2f}s  {args.requests / elapsed:7.1f} req/s  "
+          f"({stats['retries']} retries, peak {stats['peak_in_flight']} in flight, "
+          f"p95 {stats['p95_latency']:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Charts/sec for serial in-memory rendering vs. a process pool.
+
+    python benchmarks/bench_charts.py --reports 200 --workers 4
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.charts import CHART_NAMES, PACING_CHART_NAME, render_charts_batch, render_performance_charts
+from src.data_processor import DataProcessor, load_submissions
+from src.llm_backends import TemplateBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    
+    backend = TemplateBackend()
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        for submission in load_submissions(path):
+            samples.append(DataProcessor(path, None, data=submission, model=backend).process_data())
+    datas = [samples[i % len(samples)] for i in range(args.reports)]
+    charts = args.reports * len(CHART_NAMES + [PACING_CHART_NAME])
+    
+    start = time.perf_counter()
+    for data in datas:
+        render_performance_charts(data)
+    serial = time.perf_counter() - start
+    print(f"serial          : {serial:7.2f}s  {charts / serial:7.1f} charts/sec")
+    
+    start = time.perf_counter()
+    render_charts_batch(datas, workers=args.workers)
+    parallel = time.perf_counter() - start
+    print(f"parallel ({args.workers:>2} p) : {parallel:7.2f}s  {charts / parallel:7.1f} charts/sec "
+          f"({serial / parallel:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Cohort build time and peak memory for many submissions of one test.
+
+    python benchmarks/bench_cohort.py --submissions 100000
+"""
+import argparse
+import glob
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.cohort import build_cohort
+from src.data_processor import load_submissions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+    
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        samples.extend(load_submissions(path))
+    # A generator, so the cohort never sees more than one chunk of submissions at a time
+    submissions = (samples[i % len(samples)] for i in range(args.submissions))
+    
+    start = time.perf_counter()
+    cohort = build_cohort(submissions, chunk_size=args.chunk_size)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    cohort.summary()
+    cohort.percentile_ranks()
+    summarized = time.perf_counter() - start
+    
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"build    : {built:7.2f}s  {args.submissions / built:9.0f} submissions/sec")
+    print(f"summary  : {summarized:7.3f}s  (distributions, percentile ranks, p-values)")
+    print(f"peak RSS : {peak_mb:7.1f} MB for {len(cohort)} students, "
+          f"{len(cohort.chapter_names)} chapters, {len(cohort.question_keys)} questions")
+
+
+if __name__ == '__main__':
+    main()
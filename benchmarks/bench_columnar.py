@@ -0,0 +1,71 @@
+"""Time the per-question Python analysis against the columnar NumPy engine.
+
+    python benchmarks/bench_columnar.py --submissions 10000
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.columnar import analyze_submissions, analyze_table, build_question_table
+from src.data_processor import DataProcessor, load_submissions
+from src.llm_backends import TemplateBackend
+
+
+def python_engine(processor, submissions):
+    results = []
+    for submission in submissions:
+        section_wise = {}
+        for section in submission['sections']:
+            section_wise[section['sectionId']['title']] = (
+                processor._analyze_question_performance(section['questions'])
+            )
+        results.append(section_wise)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=10000)
+    args = parser.parse_args()
+    
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        samples.extend(load_submissions(path))
+    submissions = [samples[i % len(samples)] for i in range(args.submissions)]
+    
+    # The template backend keeps the processor from touching the network
+    processor = DataProcessor(None, None, data=samples[0], model=TemplateBackend())
+    
+    start = time.perf_counter()
+    table = build_question_table(submissions)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = analyze_table(table)
+    analyze_seconds = time.perf_counter() - start
+    del actual
+    
+    start = time.perf_counter()
+    expected = python_engine(processor, submissions)
+    python_seconds = time.perf_counter() - start
+    
+    actual = analyze_submissions(submissions)
+    if json.dumps(actual) != json.dumps(expected):
+        sys.exit("Columnar output differs from the Python engine")
+        
+    columnar_seconds = build_seconds + analyze_seconds
+    print(f"{args.submissions} submissions, {len(table)} questions")
+    print(f"  python   : {python_seconds:7.3f}s")
+    print(f"  columnar : {columnar_seconds:7.3f}s "
+          f"(flatten {build_seconds:.3f}s + analyze {analyze_seconds:.3f}s)")
+    print(f"  speedup  : {python_seconds / columnar_seconds:.1f}x "
+          f"({python_seconds / analyze_seconds:.1f}x on an already-flattened table)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Report output throughput: PNG charts + PDF against SVG charts + HTML/JSON.
+
+Every report is analysed once with the template backend; only the output
+step is timed, on the same processed data and feedback for both formats.
+
+    python benchmarks/bench_html.py --reports 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.charts import render_performance_charts
+from src.data_processor import DataProcessor
+from src.feedback_generator import generate_feedback
+from src.html_report import JSON_NAME, create_html
+from src.llm_backends import TemplateBackend
+from src.pdf_generator import create_pdf
+from src.synthetic import generate_submissions
+
+
+def timed(label: str, reports, write, output_dir: str) -> float:
+    start = time.perf_counter()
+    sizes = 0
+    for i, (data, feedback) in enumerate(reports):
+        report_dir = os.path.join(output_dir, label, str(i))
+        os.makedirs(report_dir)
+        for path in write(data, feedback, report_dir):
+            sizes += os.path.getsize(path)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<5}: {elapsed:7.2f}s  {len(reports) / elapsed:8.1f} reports/sec  "
+          f"{elapsed / len(reports) * 1000:7.1f} ms/report  {sizes / len(reports) / 1024:6.1f} KB/report")
+    return elapsed
+
+
+def write_pdf(data, feedback, report_dir):
+    path = os.path.join(report_dir, 'report.pdf')
+    create_pdf(feedback, render_performance_charts(data), path)
+    return [path]
+
+
+def write_html(data, feedback, report_dir):
+    path = os.path.join(report_dir, 'report.html')
+    create_html(feedback, data, path)
+    return [path, os.path.join(report_dir, JSON_NAME)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    backend = TemplateBackend()
+    reports = []
+    for submission in generate_submissions(args.reports, args.seed):
+        processor = DataProcessor(None, None, data=submission, model=backend)
+        data = processor.process_data()
+        feedback = generate_feedback(processor.get_llm_prompt(), None, model=backend, context=data)
+        reports.append((data, feedback))
+        
+    with tempfile.TemporaryDirectory() as tmp:
+        # Both first calls pay one-time imports (matplotlib, ReportLab); keep them out of the timing
+        write_pdf(*reports[0], tmp)
+        write_html(*reports[0], tmp)
+        pdf = timed('pdf', reports, write_pdf, tmp)
+        html = timed('html', reports, write_html, tmp)
+    print(f"html is {pdf / html:.0f}x faster than pdf")
+
+
+if __name__ == '__main__':
+    main()
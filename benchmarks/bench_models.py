@@ -0,0 +1,75 @@
+"""Memory held by decoded submission dicts vs. the compact models, per 10k submissions.
+
+    python benchmarks/bench_models.py --submissions 10000
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.columnar import analyze_submissions
+from src.models import QuestionBank, compact_submissions
+
+
+def _samples():
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            samples.extend(json.dumps(submission) for submission in json.load(f))
+    return samples
+
+
+def _decoded(samples, n):
+    # Decode each copy separately, as a real export holds distinct objects
+    for i in range(n):
+        yield json.loads(samples[i % len(samples)])
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=10000)
+    args = parser.parse_args()
+    
+    samples = _samples()
+    n = args.submissions
+    per_10k = 10000 / n / 1e6
+    
+    raw, raw_bytes, raw_time = _measure(lambda: list(_decoded(samples, n)))
+    expected = analyze_submissions(raw[:len(samples)])
+    del raw
+    print(f"{'raw dicts':<17}: {raw_bytes * per_10k:8.1f} MB per 10k submissions "
+          f"(decoded in {raw_time:.2f}s)")
+    
+    for keep_text in (True, False):
+        bank = QuestionBank(keep_text=keep_text)
+        compact, compact_bytes, compact_time = _measure(
+            lambda: (bank, list(compact_submissions(_decoded(samples, n), bank))))
+        _, submissions = compact
+        assert analyze_submissions(s.to_dict(bank) for s in submissions[:len(samples)]) == expected
+        label = 'compact' if keep_text else 'compact, no text'
+        print(f"{label:<17}: {compact_bytes * per_10k:8.1f} MB per 10k submissions "
+              f"({len(bank)} distinct texts, built in {compact_time:.2f}s)")
+        print(f"{'saved':<17}: {(raw_bytes - compact_bytes) * per_10k:8.1f} MB per 10k submissions")
+        del compact, submissions
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Per-PDF timing and throughput: fresh template per PDF, shared template, worker pool.
+
+    python benchmarks/bench_pdf.py --reports 100 --workers 4
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.charts import render_performance_charts
+from src.data_processor import DataProcessor, load_submissions
+from src.feedback_generator import generate_feedback
+from src.llm_backends import TemplateBackend
+from src.pdf_generator import ReportRenderer, render_pdfs
+
+
+def report(label, timings, elapsed):
+    timings = sorted(timings)
+    avg = sum(timings) / len(timings) if timings else 0.0
+    print(f"{label:<22}: {elapsed:7.2f}s total, {avg * 1000:7.1f} ms/PDF, "
+          f"{len(timings) / elapsed:6.1f} PDFs/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    
+    backend = TemplateBackend()
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        for submission in load_submissions(path):
+            processor = DataProcessor(path, None, data=submission, model=backend)
+            data = processor.process_data()
+            feedback = generate_feedback(processor.get_llm_prompt(), None, model=backend,
+                                         context=data)
+            samples.append((feedback, render_performance_charts(data)))
+    jobs = [samples[i % len(samples)] for i in range(args.reports)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        def output(i):
+            return os.path.join(tmp, f'report_{i}.pdf')
+            
+        # Styles rebuilt for every PDF, as create_pdf used to do
+        start = time.perf_counter()
+        timings = [ReportRenderer().render(feedback, charts, output(i))
+                   for i, (feedback, charts) in enumerate(jobs)]
+        report("fresh template", timings, time.perf_counter() - start)
+        
+        renderer = ReportRenderer()
+        start = time.perf_counter()
+        timings = [renderer.render(feedback, charts, output(i))
+                   for i, (feedback, charts) in enumerate(jobs)]
+        report("shared template", timings, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        pdf_jobs = ((feedback, charts, output(i)) for i, (feedback, charts) in enumerate(jobs))
+        stats = render_pdfs(pdf_jobs, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{f'{args.workers} worker processes':<22}: {elapsed:7.2f}s total, "
+              f"{stats['avg_seconds_per_pdf'] * 1000:7.1f} ms/PDF, "
+              f"{stats['pdfs'] / elapsed:6.1f} PDFs/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Run the staged batch pipeline with a slow fake LLM and show where it backs up.
+
+With a slow LLM the analyze/feedback stages are the bottleneck: their queues
+fill up to --queue-size and ingestion waits instead of reading ahead.
+
+    python benchmarks/bench_pipeline.py --submissions 40 --latency 2.0 --llm-workers 2
+    python benchmarks/bench_pipeline.py --latency 0 --chart-workers 2 --pdf-workers 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.llm_backends import FakeBackend
+from src.pipeline import run_pipeline
+from src.synthetic import write_submissions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=2.0,
+                        help="Seconds per fake LLM call (two calls per report)")
+    parser.add_argument('--llm-workers', type=int, default=2)
+    parser.add_argument('--chart-workers', type=int, default=0)
+    parser.add_argument('--pdf-workers', type=int, default=0)
+    parser.add_argument('--queue-size', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'submissions.json')
+        write_submissions(input_path, args.submissions, args.seed)
+        model = FakeBackend(latency=args.latency, jitter=args.latency / 10, seed=args.seed)
+        stats = run_pipeline([input_path], None, os.path.join(tmp, 'output'),
+                             llm_workers=args.llm_workers, chart_workers=args.chart_workers,
+                             pdf_workers=args.pdf_workers, queue_size=args.queue_size,
+                             analysis_model=model, feedback_model=model, progress=5)
+    deepest = max(stage['queue_max'] for stage in stats['pipeline']['stages'].values())
+    print(f"deepest queue {deepest} of {args.queue_size}, "
+          f"peak memory {stats['metrics']['peak_rss_mb']} MB")
+    if deepest > args.queue_size or stats['succeeded'] != args.submissions:
+        print("FAIL: a queue grew past its bound or reports are missing")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Prompt size before/after the token budget and the compact insights JSON.
+
+    python benchmarks/bench_prompt.py --budgets 1500 1200 1000
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.data_processor import DataProcessor, load_submissions
+from src.llm_async import estimate_tokens
+from src.llm_backends import TemplateBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budgets', type=int, nargs='+', default=[1500, 1200, 1000])
+    args = parser.parse_args()
+    
+    backend = TemplateBackend()
+    submissions = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        submissions.extend(load_submissions(path))
+        
+    print(f"{'budget':>8} {'avg tokens':>11} {'avg chars':>10} {'rows dropped':>13}")
+    for budget in [None] + args.budgets:
+        tokens = chars = dropped = 0
+        for submission in submissions:
+            processor = DataProcessor(None, None, data=submission, model=backend, prompt_budget=budget)
+            prompt = processor.get_llm_prompt()
+            tokens += processor.get_prompt_stats()['tokens']
+            chars += len(prompt)
+            dropped += processor.get_prompt_stats()['dropped_rows']
+        n = len(submissions)
+        print(f"{budget or 'none':>8} {tokens / n:11.0f} {chars / n:10.0f} {dropped / n:13.1f}")
+        
+    # Subject-wise JSON in the insights prompt: indented (before) vs compact (now)
+    indented = compact = 0
+    for submission in submissions:
+        subject_wise = DataProcessor(None, None, data=submission, model=backend).get_subject_wise()
+        indented += estimate_tokens(json.dumps(subject_wise, indent=2))
+        compact += estimate_tokens(json.dumps(subject_wise, separators=(',', ':')))
+    print(f"insights JSON: {indented / n:.0f} -> {compact / n:.0f} est. tokens per prompt")
+
+
+if __name__ == '__main__':
+    main()
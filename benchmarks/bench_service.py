@@ -0,0 +1,53 @@
+"""Report service throughput and job latency for different worker counts.
+
+    python benchmarks/bench_service.py --jobs 40 --workers 1 2 4 --latency 0.5
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.data_processor import load_submissions
+from src.llm_backends import FakeBackend
+from src.service import DONE, FAILED, ReportService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=40)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help="Simulated seconds per LLM call")
+    args = parser.parse_args()
+    
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        samples.extend(load_submissions(path))
+        
+    print(f"{'workers':>7} {'jobs/sec':>9} {'wait p50':>9} {'wait p90':>9} {'run p50':>8} "
+          f"{'total p90':>10} {'total p99':>10}")
+    for workers in args.workers:
+        backend = FakeBackend(latency=args.latency, jitter=args.latency / 5, seed=0)
+        with tempfile.TemporaryDirectory() as output_dir:
+            service = ReportService(output_dir, backend, backend, workers=workers,
+                                    max_queue=args.jobs)
+            service.start()
+            start = time.perf_counter()
+            jobs = [service.submit(samples[i % len(samples)]) for i in range(args.jobs)]
+            while any(job.status not in (DONE, FAILED) for job in jobs):
+                time.sleep(0.05)
+            elapsed = time.perf_counter() - start
+            service.close()
+            latency = service.stats()['latency']
+        print(f"{workers:>7} {args.jobs / elapsed:9.2f} {latency['wait']['p50']:9.2f} "
+              f"{latency['wait']['p90']:9.2f} {latency['run']['p50']:8.2f} "
+              f"{latency['total']['p90']:10.2f} {latency['total']['p99']:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
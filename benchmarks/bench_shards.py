@@ -0,0 +1,71 @@
+"""Run a sharded batch with several local worker processes and check the result.
+
+    python benchmarks/bench_shards.py --submissions 200 --workers 4 --shard-size 20
+    python benchmarks/bench_shards.py --workers 3 --kill-after 5 --lease 2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.synthetic import write_submissions
+
+
+def start_worker(input_path: str, run_dir: str, output_dir: str, args) -> subprocess.Popen:
+    command = [sys.executable, '-W', 'ignore', os.path.join(ROOT, 'main.py'),
+               '--batch', input_path, '--shard-run', run_dir, '--output-dir', output_dir,
+               '--shard-size', str(args.shard_size), '--lease', str(args.lease),
+               '--backend', args.backend, '--no-cache']
+    return subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--shard-size', type=int, default=10)
+    parser.add_argument('--backend', choices=['template', 'fake'], default='template')
+    parser.add_argument('--lease', type=float, default=5,
+                        help="Lease of the worker processes, so a killed worker's shard is taken over")
+    parser.add_argument('--kill-after', type=float, default=None, metavar='SECONDS',
+                        help="SIGKILL the first worker after this long to exercise resuming")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'submissions.json')
+        write_submissions(input_path, args.submissions, args.seed)
+        run_dir = os.path.join(tmp, 'run')
+        output_dir = os.path.join(tmp, 'output')
+        
+        start = time.perf_counter()
+        workers = [start_worker(input_path, run_dir, output_dir, args) for _ in range(args.workers)]
+        if args.kill_after is not None:
+            time.sleep(args.kill_after)
+            workers[0].kill()
+            print(f"killed worker 1 after {args.kill_after:.1f}s")
+        codes = [worker.wait() for worker in workers]
+        elapsed = time.perf_counter() - start
+        
+        with open(os.path.join(run_dir, 'summary.json'), 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        reports = sum(1 for name in os.listdir(output_dir)
+                      if os.path.exists(os.path.join(output_dir, name, 'report.pdf')))
+        print(f"{args.workers} workers (exit codes {codes}): {elapsed:.2f}s, "
+              f"{args.submissions / elapsed:.1f} submissions/sec")
+        print(f"shards {summary['shards']}, built {summary['succeeded']}, "
+              f"resumed {summary['resumed']}, failed {summary['failed']}, "
+              f"cohort {summary['cohort']['students']} students, {reports} report files")
+        if summary['submissions'] != args.submissions or reports != args.submissions:
+            print("FAIL: some submissions have no report")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
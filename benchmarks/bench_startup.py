@@ -0,0 +1,83 @@
+"""Import time of the entry points (python -X importtime), failing on regressions.
+
+    python benchmarks/bench_startup.py --max-ms 400
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies and the only stage allowed to import them
+HEAVY = {
+    'google.generativeai': 'Gemini calls',
+    'matplotlib': 'chart rendering',
+    'reportlab': 'PDF layout',
+    'bs4': 'syllabus markup the regex parser rejects',
+    'pandas': 'the legacy DataFrame plots in src/charts.py'
+}
+
+# (label, code, heavy modules it may import)
+SCENARIOS = [
+    ('import main', 'import main', ()),
+    ('import src.batch', 'import src.batch', ()),
+    ('import src.service', 'import src.service', ()),
+    ('template report', "import main; main.main(['--backend', 'template', '--force', "
+                        "'--output-dir', {output_dir!r}])", ('matplotlib', 'reportlab')),
+]
+
+
+def import_times(code: str):
+    """Run ``code`` under -X importtime; returns (total ms, {module: cumulative ms})."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    modules = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative) / 1000
+        # Top-level imports (no indentation) add up to the whole import time
+        if not name[1:].startswith(' '):
+            total += int(cumulative) / 1000
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Runs per scenario; the fastest is reported")
+    parser.add_argument('--max-ms', type=float, default=400,
+                        help="Fail when importing main takes longer than this")
+    parser.add_argument('--top', type=int, default=5,
+                        help="Slowest imports listed per scenario")
+    args = parser.parse_args()
+    
+    failures = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for label, code, allowed in SCENARIOS:
+            code = code.format(output_dir=output_dir)
+            runs = [import_times(code) for _ in range(args.repeat)]
+            total, modules = min(runs, key=lambda run: run[0])
+            print(f"{label:<18} {total:8.1f} ms")
+            slowest = sorted(((ms, name) for name, ms in modules.items() if '.' not in name),
+                             reverse=True)[:args.top]
+            for ms, name in slowest:
+                print(f"    {name:<30} {ms:8.1f} ms")
+            for module, stage in HEAVY.items():
+                if module in modules and module not in allowed:
+                    failures.append(f"{label} imports {module} ({modules[module]:.0f} ms), "
+                                    f"which only {stage} should need")
+            if label == 'import main' and total > args.max_ms:
+                failures.append(f"import main took {total:.0f} ms (budget {args.max_ms:.0f} ms)")
+                
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
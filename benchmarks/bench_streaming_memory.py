@@ -0,0 +1,86 @@
+"""Compare peak RSS of the whole-file loader against the streaming reader.
+
+Builds a synthetic export by repeating the sample submissions, then loads it
+in a fresh interpreter per loader so each peak RSS is measured in isolation:
+
+    python benchmarks/bench_streaming_memory.py --copies 3000
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each loader touches every submission so the work done is comparable
+LOADERS = {
+    'json.load': (
+        "import json\n"
+        "with open(path, encoding='utf-8') as f:\n"
+        "    submissions = json.load(f)\n"
+        "count = sum(len(s['sections']) for s in submissions)\n"
+    ),
+    'stream_submissions': (
+        "from src.data_processor import stream_submissions\n"
+        "count = sum(len(s['sections']) for s in stream_submissions(path))\n"
+    ),
+}
+
+MEASURE = (
+    "import resource, sys, time\n"
+    "path = sys.argv[1]\n"
+    "start = time.perf_counter()\n"
+    "{body}"
+    "elapsed = time.perf_counter() - start\n"
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, elapsed, count)\n"
+)
+
+
+def build_synthetic_file(path, copies):
+    """Write `copies` submissions cycled from the sample data, one at a time."""
+    samples = []
+    for sample_path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        with open(sample_path, encoding='utf-8') as f:
+            samples.extend(json.load(f))
+            
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i in range(copies):
+            submission = dict(samples[i % len(samples)])
+            submission['_id'] = {'$oid': f'{i:024x}'}
+            if i:
+                f.write(',')
+            json.dump(submission, f)
+        f.write(']')
+
+
+def measure(loader, path):
+    script = MEASURE.format(body=LOADERS[loader])
+    result = subprocess.run([sys.executable, '-c', script, path], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    max_rss_kb, elapsed, count = result.stdout.split()
+    return int(max_rss_kb) / 1024, float(elapsed), int(count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, default=2000,
+                        help="Number of submissions in the synthetic file")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic_export.json')
+        build_synthetic_file(path, args.copies)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"Synthetic file: {args.copies} submissions, {size_mb:.1f} MB")
+        
+        for loader in LOADERS:
+            peak_mb, elapsed, count = measure(loader, path)
+            print(f"{loader:>20}: peak RSS {peak_mb:8.1f} MB, {elapsed:6.2f}s ({count} sections)")
+
+
+if __name__ == '__main__':
+    main()
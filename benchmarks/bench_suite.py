@@ -0,0 +1,167 @@
+"""End-to-end stage timings on seeded synthetic submissions, saved for regression checks.
+
+    python benchmarks/bench_suite.py --sizes 1 1000 100000
+    python benchmarks/bench_suite.py --sizes 1 1000 --compare benchmarks/results/BASELINE.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import metrics
+from src.charts import render_performance_charts
+from src.data_processor import DataProcessor, stream_submissions
+from src.feedback_generator import generate_feedback
+from src.llm_backends import FakeBackend
+from src.pdf_generator import create_pdf
+from src.synthetic import write_submissions
+
+# Stages whose per-report cost is large enough that only the first --render-limit
+# reports of a size run them; their totals are extrapolated to the full size
+SAMPLED_STAGES = ('charts', 'pdf')
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def data_file(data_dir: str, size: int, seed: int) -> str:
+    """Synthetic input of ``size`` submissions, generated on first use."""
+    path = os.path.join(data_dir, f'synthetic_s{seed}_n{size}.json')
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        start = time.perf_counter()
+        tmp_path = path + '.tmp'
+        megabytes = write_submissions(tmp_path, size, seed) / 1e6
+        os.replace(tmp_path, path)
+        print(f"generated {size} submissions ({megabytes:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def run_size(path: str, size: int, engine: str, render_limit: int, pdf_path: str) -> dict:
+    """Time every stage of the report pipeline over one input file."""
+    metrics.reset()
+    backend = FakeBackend(latency=0.0, jitter=0.0)
+    submissions = stream_submissions(path)
+    start = time.perf_counter()
+    for index in range(size):
+        with metrics.stage('load_json'):
+            submission = next(submissions)
+        processor = DataProcessor(path, None, data=submission, model=backend, engine=engine)
+        data = processor.process_data()
+        feedback = generate_feedback(processor.get_llm_prompt(), None, model=backend, context=data)
+        if index < render_limit:
+            create_pdf(feedback, render_performance_charts(data), pdf_path)
+    elapsed = time.perf_counter() - start
+    
+    summary = metrics.summary()
+    for name, stage_stats in summary['stages'].items():
+        stage_stats['estimated_total'] = stage_stats['avg'] * size
+        stage_stats['sampled'] = name in SAMPLED_STAGES and stage_stats['calls'] < size
+    return {
+        'submissions': size,
+        'elapsed': elapsed,
+        'submissions_per_second': size / elapsed,
+        'estimated_elapsed': elapsed + sum(stage_stats['estimated_total'] - stage_stats['total']
+                                           for stage_stats in summary['stages'].values()),
+        'stages': summary['stages'],
+        'peak_rss_mb': summary['peak_rss_mb']
+    }
+
+
+def print_size(result: dict):
+    print(f"\n{result['submissions']} submissions: {result['elapsed']:.2f}s "
+          f"({result['submissions_per_second']:.0f}/sec), "
+          f"est. {result['estimated_elapsed']:.1f}s with every report rendered, "
+          f"peak RSS {result['peak_rss_mb']} MB")
+    print(f"  {'stage':<18} {'runs':>8} {'avg ms':>9} {'p95 ms':>9} {'est. total s':>13}")
+    for name, stage_stats in result['stages'].items():
+        note = '  (sampled)' if stage_stats['sampled'] else ''
+        print(f"  {name:<18} {stage_stats['calls']:>8} {stage_stats['avg'] * 1000:9.3f} "
+              f"{stage_stats['p95'] * 1000:9.3f} {stage_stats['estimated_total']:13.2f}{note}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    """Print per-stage average time against ``baseline``; returns the number of regressions."""
+    regressions = 0
+    print(f"\nvs {baseline['version']} (regression above +{tolerance:.0%}):")
+    for size, result in results['sizes'].items():
+        previous = baseline['sizes'].get(size)
+        if previous is None:
+            continue
+        for name, stage_stats in result['stages'].items():
+            if name not in previous['stages']:
+                continue
+            before = previous['stages'][name]['avg']
+            ratio = stage_stats['avg'] / before if before > 0 else 1.0
+            flag = ''
+            if ratio > 1 + tolerance:
+                regressions += 1
+                flag = '  REGRESSION'
+            print(f"  n={size:<7} {name:<18} {before * 1000:9.3f} -> {stage_stats['avg'] * 1000:9.3f} ms "
+                  f"({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=['python', 'columnar'], default='python')
+    parser.add_argument('--render-limit', type=int, default=50,
+                        help="Reports per size whose charts and PDF are rendered")
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'benchmarks', '.data'),
+                        help="Where generated inputs are kept between runs")
+    parser.add_argument('--output', default=None,
+                        help="Results file (default: benchmarks/results/<git version>.json)")
+    parser.add_argument('--compare', default=None, metavar='BASELINE',
+                        help="Earlier results file; exits non-zero if a stage slowed down")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown of a stage's average before it counts as a regression")
+    args = parser.parse_args()
+    
+    version = git_version()
+    results = {
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'engine': args.engine,
+        'render_limit': args.render_limit,
+        'sizes': {}
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            path = data_file(args.data_dir, size, args.seed)
+            result = run_size(path, size, args.engine, args.render_limit,
+                              os.path.join(tmp_dir, 'report.pdf'))
+            results['sizes'][str(size)] = result
+            print_size(result)
+            
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'{version}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Syllabus parses/sec for BeautifulSoup, the regex fast path and the per-test cache.
+
+    python benchmarks/bench_syllabus.py --submissions 10000
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import syllabus
+from src.data_processor import load_submissions
+
+
+def _time(label, parse, htmls):
+    start = time.perf_counter()
+    results = [parse(html) for html in htmls]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16}: {elapsed:7.3f}s  {len(htmls) / elapsed:10.0f} parses/sec")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=10000)
+    args = parser.parse_args()
+    
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.json'))):
+        samples.extend(submission['test']['syllabus'] for submission in load_submissions(path))
+    htmls = [samples[i % len(samples)] for i in range(args.submissions)]
+    print(f"{len(htmls)} submissions, {len(set(htmls))} distinct syllabi")
+    
+    soup = _time('beautifulsoup', syllabus.parse_with_soup, htmls)
+    fast = _time('regex fast path', syllabus.parse_simple, htmls)
+    syllabus.clear_cache()
+    cached = _time('cached', syllabus.parse_syllabus, htmls)
+    assert soup == fast == cached, "parsers disagree"
+    print(f"cache: {syllabus.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Re-analysis time from raw JSON vs. the columnar table cache.
+
+Builds a synthetic export by repeating the sample submissions, converts it
+once, then times section analysis and chart inputs from each source:
+
+    python benchmarks/bench_table_cache.py --copies 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_streaming_memory import build_synthetic_file
+from src import table_cache
+from src.charts import chart_inputs
+from src.columnar import analyze_submissions
+from src.data_processor import DataProcessor, load_submissions
+from src.llm_backends import TemplateBackend
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, default=5000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.json')
+        build_synthetic_file(path, args.copies)
+        cache_dir = os.path.join(tmp, 'table_cache')
+        
+        start = time.perf_counter()
+        directory = table_cache.ingest(path, cache_dir)
+        ingest_time = time.perf_counter() - start
+        print(f"raw JSON : {os.path.getsize(path) / 1e6:8.1f} MB")
+        print(f"cache    : {_dir_size(directory) / 1e6:8.1f} MB  (one-time ingest {ingest_time:.2f}s)")
+        
+        backend = TemplateBackend()
+        start = time.perf_counter()
+        submissions = load_submissions(path)
+        raw_sections = analyze_submissions(submissions)
+        raw_charts = [chart_inputs(DataProcessor(path, None, data=submission, model=backend,
+                                                 section_wise=sections)._get_base_data())
+                      for submission, sections in zip(submissions, raw_sections)]
+        raw = time.perf_counter() - start
+        del submissions
+        
+        start = time.perf_counter()
+        cached = table_cache.load(path, cache_dir)
+        cached_sections = cached.section_wise()
+        cached_charts = cached.chart_inputs()
+        columnar = time.perf_counter() - start
+        
+        assert raw_sections == cached_sections and raw_charts == cached_charts, "results differ"
+        print(f"from JSON : {raw:7.2f}s  {args.copies / raw:9.0f} submissions/sec")
+        print(f"from cache: {columnar:7.2f}s  {args.copies / columnar:9.0f} submissions/sec  "
+              f"({raw / columnar:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Write seeded synthetic submissions in the sample-data schema to a JSON file.
+
+    python benchmarks/generate_submissions.py 10000 data/synthetic_10k.json --seed 7
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.synthetic import write_submissions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('count', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    size = write_submissions(args.output, args.count, args.seed)
+    print(f"{args.count} submissions, {size / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,71 +1,166 @@
+import argparse
+import cProfile
 import os
 import sys
 from dotenv import load_dotenv
 from src.feedback_generator import generate_feedback
 from src.pdf_generator import create_pdf
 from src.data_processor import DataProcessor
-import matplotlib.pyplot as plt
-import pandas as pd
+from src.charts import render_performance_charts
+from src.html_report import HTML_NAME, create_html
+from src.batch import (OUTPUT_FORMATS, is_complete, load_cohort, print_cache_stats, record_inputs,
+                       report_fingerprint, run_batch, run_batch_async)
+from src.llm_backends import BACKENDS, create_backends
+from src.llm_cache import LLMCache
+from src.manifest import BuildManifest
+from src.metrics import MetricsWriter
+from src.store import PerformanceStore, print_trend
+from src import llm_client, metrics, syllabus
 
-def create_performance_charts(data, output_dir):
-    """Create performance visualization charts."""
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 1. Subject-wise Performance Chart
-    subjects = list(data['subject_wise'].keys())
-    accuracies = [data['subject_wise'][subject]['accuracy'] for subject in subjects]
-    
-    plt.figure(figsize=(10, 6))
-    plt.bar(subjects, accuracies)
-    plt.title('Subject-wise Performance')
-    plt.xlabel('Subjects')
-    plt.ylabel('Accuracy (%)')
-    plt.ylim(0, 100)
-    for i, v in enumerate(accuracies):
-        plt.text(i, v + 1, f'{v:.1f}%', ha='center')
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'subject_performance.png'))
-    plt.close()
-    
-    # 2. Section-wise Performance Chart
-    sections = []
-    correct = []
-    total = []
-    
-    for section, analysis in data['section_wise'].items():
-        sections.append(section)
-        correct.append(analysis['correct_answers'])
-        total.append(analysis['total_questions'])
-    
-    plt.figure(figsize=(12, 6))
-    x = range(len(sections))
-    width = 0.35
-    
-    plt.bar(x, total, width, label='Total Questions', color='lightgray')
-    plt.bar(x, correct, width, label='Correct Answers', color='green')
-    
-    plt.title('Section-wise Performance')
-    plt.xlabel('Sections')
-    plt.ylabel('Number of Questions')
-    plt.xticks(x, sections, rotation=45, ha='right')
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'section_performance.png'))
-    plt.close()
-    
-    return [
-        os.path.join(output_dir, 'subject_performance.png'),
-        os.path.join(output_dir, 'section_performance.png')
-    ]
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate student performance reports.")
+    parser.add_argument('input', nargs='?', default='data/sample_submission_analysis_1.json',
+                        help="Submission JSON file for a single report")
+    parser.add_argument('--batch', nargs='+', metavar='PATH',
+                        help="Directories or glob patterns of submission files; "
+                             "one report is produced per submission")
+    parser.add_argument('--output-dir', default='output',
+                        help="Directory where reports are written")
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='pdf',
+                        help="Report output: pdf, or html (report.html with inline SVG charts "
+                             "plus the metrics as report.json; build PDFs later with --pdf-from)")
+    parser.add_argument('--pdf-from', nargs='+', default=None, metavar='REPORT_JSON',
+                        help="Build report.pdf next to each report.json written by --format html "
+                             "and exit")
+    parser.add_argument('--engine', choices=['python', 'columnar'], default='python',
+                        help="Section analysis engine (columnar uses vectorized NumPy)")
+    parser.add_argument('--backend', choices=BACKENDS, default='gemini',
+                        help="LLM backend: gemini, template (rule-based, no API key) "
+                             "or fake (offline testing)")
+    parser.add_argument('--model', default=None,
+                        help="Gemini model name (default: $GEMINI_MODEL or gemini-2.0-flash)")
+    parser.add_argument('--cache-dir', default='.llm_cache',
+                        help="Directory of the on-disk LLM response cache")
+    parser.add_argument('--cache-max-mb', type=float, default=256,
+                        help="Size limit of the LLM cache before LRU eviction")
+    parser.add_argument('--cache-ttl-hours', type=float, default=30 * 24,
+                        help="Ignore cached LLM responses older than this")
+    parser.add_argument('--syllabus-cache-dir', default=None,
+                        help="Also persist parsed syllabi in this directory across runs")
+    parser.add_argument('--cohort', nargs='+', default=None,
+                        help="Submission files, directories or globs of everyone who sat the "
+                             "test; reports then include percentiles against this cohort")
+    parser.add_argument('--store', default=None,
+                        help="SQLite file recording each submission's aggregates for trends "
+                             "across tests (only new submissions are added)")
+    parser.add_argument('--student', default=None,
+                        help="Student the input submissions belong to in --store (required with "
+                             "--store; each input file must hold one of their tests)")
+    parser.add_argument('--trend', action='store_true',
+                        help="Print --student's trend from --store and exit")
+    parser.add_argument('--table-cache', default=None, metavar='DIR',
+                        help="Read --batch inputs through a columnar cache of their questions "
+                             "in DIR, converting each file once")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="LLM requests kept in flight during --batch runs")
+    parser.add_argument('--rpm', type=float, default=None,
+                        help="LLM requests-per-minute budget for concurrent batches")
+    parser.add_argument('--tpm', type=float, default=None,
+                        help="LLM tokens-per-minute budget for concurrent batches")
+    parser.add_argument('--chart-workers', type=int, default=0,
+                        help="Processes rendering charts in parallel during --batch runs "
+                             "(--serve: defaults to one per --workers thread)")
+    parser.add_argument('--pdf-workers', type=int, default=0,
+                        help="Processes building PDFs in parallel during --batch runs "
+                             "(--serve: defaults to one per --workers thread)")
+    parser.add_argument('--prompt-budget', type=int, default=None, metavar='TOKENS',
+                        help="Estimated token limit of the feedback prompt; the least informative "
+                             "chapter/topic rows are dropped to fit")
+    parser.add_argument('--force', action='store_true',
+                        help="Rebuild every report, even ones the build manifest says are unchanged")
+    parser.add_argument('--metrics', default=None, metavar='FILE',
+                        help="Append per-report stage timings, LLM/cache counters and peak "
+                             "memory to FILE as JSON lines")
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help="Write a cProfile dump of the single-report run to FILE "
+                             "(inspect with python -m pstats)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Run --batch as concurrent stages (analyze, feedback, charts, PDF) "
+                             "behind bounded queues; --concurrency sets the LLM threads")
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help="Jobs waiting in front of each --pipeline stage before upstream blocks")
+    parser.add_argument('--progress', type=float, default=None, metavar='SECONDS',
+                        help="Print --pipeline queue depths every SECONDS")
+    parser.add_argument('--shard-run', default=None, metavar='DIR',
+                        help="Work on --batch as one of many workers sharing run directory DIR "
+                             "(shard plan, locks, checkpoints); start as many as wanted")
+    parser.add_argument('--shard-size', type=int, default=500,
+                        help="Submissions per shard when --shard-run plans a new run")
+    parser.add_argument('--lease', type=float, default=600,
+                        help="Seconds after which a silent worker's shard is taken over")
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help="Run the report service on PORT: POST /jobs, GET /jobs/<id>, "
+                             "/jobs/<id>/report.pdf and /stats")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Interface the report service listens on")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="Report service worker threads")
+    parser.add_argument('--max-queue', type=int, default=100,
+                        help="Jobs the report service queues before answering 503")
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument('--no-cache', dest='cache_mode', action='store_const', const='bypass',
+                            default='use', help="Neither read nor write the LLM cache")
+    cache_mode.add_argument('--refresh-cache', dest='cache_mode', action='store_const',
+                            const='refresh', help="Ignore cached responses but store new ones")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    
+    # Trends come straight from the store; no analysis or API key needed
+    if args.trend:
+        if not args.store or not args.student:
+            print("Error: --trend needs --store and --student")
+            sys.exit(1)
+        with PerformanceStore(args.store) as store:
+            print_trend(store, args.student)
+        return
+    
+    # PDFs on demand from reports built in HTML mode; no analysis or API key needed
+    if args.pdf_from:
+        from src.html_report import pdf_from_json
+        for json_path in args.pdf_from:
+            print(f"Built {pdf_from_json(json_path)}")
+        return
+    
+    if args.shard_run and not args.batch:
+        print("Error: --shard-run needs --batch inputs")
+        sys.exit(1)
+    
+    if args.pipeline and (not args.batch or args.shard_run):
+        print("Error: --pipeline needs --batch inputs and can't be combined with --shard-run")
+        sys.exit(1)
+    if args.pipeline and (args.rpm or args.tpm):
+        # Pipeline LLM calls are plain threads; budgets need the async dispatcher
+        print("Error: --rpm/--tpm can't be combined with --pipeline")
+        sys.exit(1)
+    
+    if args.store and not args.student:
+        # Submissions carry no student id of their own, so there is nothing to default to
+        print("Error: --store needs --student")
+        sys.exit(1)
+    
+    if args.table_cache and args.cohort:
+        # Cohort comparison reads every question of the raw submission
+        print("Error: --cohort can't be combined with --table-cache")
+        sys.exit(1)
+    
     # Load environment variables
     load_dotenv()
     
     # Get API key from environment variable
     API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not API_KEY:
+    if not API_KEY and args.backend == 'gemini':
         print("Error: GOOGLE_API_KEY not found!")
         print("\nPlease do ONE of the following:")
         print("\n1. Create a .env file in the project root with:")
@@ -75,23 +170,125 @@ def main():
         print("\nYou can get an API key from https://ai.google.dev/")
         sys.exit(1)
     
+    if args.store:
+        try:
+            with PerformanceStore(args.store) as store:
+                record_inputs(store, args.batch or [args.input], args.student, engine=args.engine)
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            sys.exit(1)
+    
+    if args.model:
+        llm_client.set_default_model(args.model)
+    
+    syllabus.set_cache_dir(args.syllabus_cache_dir)
+    cache = LLMCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                     ttl=args.cache_ttl_hours * 3600, mode=args.cache_mode)
+    cohort = load_cohort(args.cohort, args.output_dir) if args.cohort else None
+    
+    if args.serve is not None:
+        from src.service import ReportService, serve
+        analysis_model, feedback_model = create_backends(args.backend, API_KEY)
+        service = ReportService(args.output_dir, analysis_model, feedback_model,
+                                workers=args.workers, max_queue=args.max_queue, engine=args.engine,
+                                cache=cache, cohort=cohort, prompt_budget=args.prompt_budget,
+                                output_format=args.output_format,
+                                chart_workers=args.chart_workers or None,
+                                pdf_workers=args.pdf_workers or None)
+        serve(service, args.host, args.serve)
+        return
+    
+    metrics_writer = MetricsWriter(args.metrics) if args.metrics else None
+    try:
+        if args.shard_run:
+            from src.shards import run_worker
+            run_worker(args.batch, args.shard_run, API_KEY, args.output_dir, engine=args.engine,
+                       cache=cache, backend=args.backend, cohort=cohort, force=args.force,
+                       prompt_budget=args.prompt_budget, shard_size=args.shard_size,
+                       lease=args.lease, metrics_writer=metrics_writer,
+                       output_format=args.output_format)
+        elif args.pipeline:
+            from src.pipeline import run_pipeline
+            run_pipeline(args.batch, API_KEY, args.output_dir, engine=args.engine, cache=cache,
+                         backend=args.backend, llm_workers=args.concurrency,
+                         chart_workers=args.chart_workers, pdf_workers=args.pdf_workers,
+                         queue_size=args.queue_size, cohort=cohort,
+                         table_cache_dir=args.table_cache, force=args.force,
+                         prompt_budget=args.prompt_budget, metrics_writer=metrics_writer,
+                         progress=args.progress, output_format=args.output_format)
+        elif args.batch and args.concurrency > 1:
+            run_batch_async(args.batch, API_KEY, args.output_dir, engine=args.engine, cache=cache,
+                            max_in_flight=args.concurrency, requests_per_minute=args.rpm,
+                            tokens_per_minute=args.tpm, backend=args.backend,
+                            chart_workers=args.chart_workers, pdf_workers=args.pdf_workers,
+                            cohort=cohort, table_cache_dir=args.table_cache, force=args.force,
+                            prompt_budget=args.prompt_budget, metrics_writer=metrics_writer,
+                            output_format=args.output_format)
+        elif args.batch:
+            run_batch(args.batch, API_KEY, args.output_dir, engine=args.engine, cache=cache,
+                      backend=args.backend, chart_workers=args.chart_workers,
+                      pdf_workers=args.pdf_workers, cohort=cohort,
+                      table_cache_dir=args.table_cache, force=args.force,
+                      prompt_budget=args.prompt_budget, metrics_writer=metrics_writer,
+                      output_format=args.output_format)
+        else:
+            profiler = cProfile.Profile() if args.profile else None
+            if profiler:
+                profiler.enable()
+            try:
+                with metrics.report('report') as report_metrics:
+                    generate_report(args, API_KEY, cache, cohort)
+            finally:
+                if profiler:
+                    profiler.disable()
+                    profiler.dump_stats(args.profile)
+                    print(f"Profile written to {args.profile}")
+            if metrics_writer:
+                metrics_writer.write(report_metrics)
+    finally:
+        if metrics_writer:
+            metrics_writer.close()
+
+def generate_report(args, api_key, cache, cohort):
+    """Build the single report for ``args.input``."""
+    analysis_model, feedback_model = create_backends(args.backend, api_key)
+    
     # Initialize data processor with API key
-    processor = DataProcessor('data/sample_submission_analysis_1.json', API_KEY)
+    processor = DataProcessor(args.input, api_key, model=analysis_model, engine=args.engine,
+                              cache=cache, cohort=cohort, prompt_budget=args.prompt_budget)
+    
+    # Skip everything if the report was already built from the same inputs
+    html = args.output_format == 'html'
+    output_path = os.path.join(args.output_dir, HTML_NAME if html else 'report.pdf')
+    manifest = BuildManifest(args.output_dir, force=args.force)
+    fingerprint = report_fingerprint(processor.data, analysis_model, feedback_model, cohort,
+                                     args.prompt_budget, args.output_format)
+    if manifest.is_current('report', fingerprint, output_path):
+        print(f"Report is up to date: {output_path} (use --force to rebuild)")
+        return
     
     # Process data and get LLM prompt
     data = processor.process_data()
     prompt = processor.get_llm_prompt()
     
     # Generate feedback using the LLM
-    feedback = generate_feedback(prompt, API_KEY)
-    
-    # Create performance charts
-    chart_paths = create_performance_charts(data, 'output')
+    feedback = generate_feedback(prompt, api_key, model=feedback_model, cache=cache, context=data)
     
-    # Generate PDF report
-    create_pdf(feedback, chart_paths, 'output/report.pdf')
+    os.makedirs(args.output_dir, exist_ok=True)
+    if html:
+        # HTML page with inline SVG charts plus report.json; no matplotlib or ReportLab
+        create_html(feedback, data, output_path)
+    else:
+        # Create performance charts in memory and hand them straight to the PDF
+        charts = render_performance_charts(data)
+        create_pdf(feedback, charts, output_path)
+    if is_complete(data, feedback):
+        manifest.record('report', fingerprint, prompt, output_path)
+        manifest.save()
     
     print("Report generated successfully!")
+    if args.cache_mode != 'bypass' and feedback_model.cacheable:
+        print_cache_stats(cache)
 
 if __name__ == "__main__":
     main()
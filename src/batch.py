@@ -0,0 +1,498 @@
+import asyncio
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src import metrics
+from src.charts import chart_inputs, render_chapter_heatmap, render_performance_charts
+from src.cohort import CohortStats, build_cohort
+from src import table_cache
+from src.data_processor import DEFAULT_GEMINI_ANALYSIS, DataProcessor, stream_submissions
+from src.feedback_generator import FALLBACK_FEEDBACK, generate_feedback, generate_feedback_async
+from src.html_report import HTML_NAME, HTML_VERSION, create_html
+from src import llm_client
+from src.llm_async import AsyncLLMDispatcher
+from src.llm_backends import LLMBackend, create_backends
+from src.llm_cache import LLMCache, model_name
+from src.manifest import BuildManifest
+from src.metrics import MetricsWriter
+from src.pdf_generator import ParallelPDFRenderer, create_pdf
+from src.store import PerformanceStore
+
+
+# 'html' writes report.html plus report.json instead of report.pdf (see src/html_report.py)
+OUTPUT_FORMATS = ('pdf', 'html')
+
+
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of JSON files."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, '*.json')))
+        else:
+            paths.extend(glob.glob(item) or [item])
+    # Keep order stable and drop duplicates when patterns overlap
+    return sorted(set(paths))
+
+
+def iter_submissions(paths: List[str]) -> Iterator[Tuple[str, int, Dict]]:
+    """Yield (path, index, submission) for every element of every file."""
+    for path in paths:
+        # Stream each file so only one submission is in memory at a time
+        for index, submission in enumerate(stream_submissions(path)):
+            yield path, index, submission
+
+
+def iter_processors(paths: List[str], api_key: Optional[str], model: LLMBackend,
+                    engine: str = 'python', cache: Optional[LLMCache] = None,
+                    cohort: Optional[CohortStats] = None,
+                    table_cache_dir: Optional[str] = None,
+                    prompt_budget: Optional[int] = None,
+                    on_error: Optional[Callable[[str, int, Exception], None]] = None
+                    ) -> Iterator[Tuple[str, int, DataProcessor]]:
+    """Yield (path, index, processor) for every submission of every file.
+
+    With ``table_cache_dir`` the files are read through the columnar table
+    cache (converted on first use) instead of decoding the raw JSON. With
+    ``on_error``, a file that can't be read is reported as (path, index of the
+    submission being read, error) and the rest of it is skipped.
+    """
+    for path in paths:
+        read = 0
+        try:
+            if table_cache_dir:
+                processors = table_cache.load(path, table_cache_dir).processors(
+                    api_key, model=model, cache=cache, prompt_budget=prompt_budget)
+            else:
+                processors = DataProcessor.from_submissions(stream_submissions(path), api_key,
+                                                            model=model, json_path=path,
+                                                            engine=engine, cache=cache,
+                                                            cohort=cohort,
+                                                            prompt_budget=prompt_budget)
+            for processor in processors:
+                yield path, read, processor
+                read += 1
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(path, read, e)
+
+
+def report_path(output_dir: str, report_id: str, output_format: str = 'pdf') -> str:
+    """Where the report of ``report_id`` is written in ``output_format``."""
+    return os.path.join(output_dir, report_id, HTML_NAME if output_format == 'html' else 'report.pdf')
+
+
+def submission_id(submission: Dict, path: str, index: int) -> str:
+    """Stable identifier used to name a submission's output directory."""
+    _id = submission.get('_id')
+    if isinstance(_id, dict) and '$oid' in _id:
+        return _id['$oid']
+    if _id:
+        return str(_id)
+    return f"{os.path.splitext(os.path.basename(path))[0]}_{index}"
+
+
+def load_cohort(inputs: List[str], output_dir: Optional[str] = None) -> CohortStats:
+    """Build cohort statistics from every submission in ``inputs`` in one streaming pass.
+
+    With ``output_dir``, the cohort summary and chapter heatmap are written there too.
+    """
+    start = time.perf_counter()
+    cohort = build_cohort(submission for _, _, submission in iter_submissions(expand_inputs(inputs)))
+    print(f"Cohort: {len(cohort)} students, {len(cohort.chapter_names)} chapters, "
+          f"{len(cohort.question_keys)} questions in {time.perf_counter() - start:.2f}s")
+    if output_dir:
+        write_cohort_outputs(cohort, output_dir)
+    return cohort
+
+
+def write_cohort_outputs(cohort: CohortStats, output_dir: str):
+    """Write the cohort summary and chapter heatmap to ``output_dir``."""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'cohort_summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(cohort.summary(), f, indent=2)
+    with open(os.path.join(output_dir, 'cohort_heatmap.png'), 'wb') as f:
+        f.write(render_chapter_heatmap(cohort))
+
+
+def record_inputs(store: PerformanceStore, inputs: List[str], student_id: str,
+                  engine: str = 'python') -> Tuple[int, int]:
+    """Add every not-yet-stored submission in ``inputs`` to ``student_id``'s history in the store.
+
+    Every input file must hold a single submission: the inputs are that one
+    student's tests. Raises ValueError, before recording anything, if a file
+    holds several (several students' submissions of one test).
+    """
+    paths = expand_inputs(inputs)
+    for path in paths:
+        if len(list(islice(stream_submissions(path), 2))) > 1:
+            raise ValueError(f"{path} holds several submissions, but the store records one "
+                             f"student's tests; pass one file per test for --student")
+    total_recorded = total_skipped = 0
+    # Files are named per test, so the file name doubles as the test label
+    for path in paths:
+        test_id = os.path.splitext(os.path.basename(path))[0]
+        recorded, skipped = store.ingest(
+            ((submission_id(submission, path, index), submission)
+             for index, submission in enumerate(stream_submissions(path))),
+            student_id, test_id=test_id, engine=engine)
+        total_recorded += recorded
+        total_skipped += skipped
+    print(f"Store: {total_recorded} submissions recorded, {total_skipped} already stored")
+    return total_recorded, total_skipped
+
+
+def print_cache_stats(cache: LLMCache):
+    cache_stats = cache.stats()
+    print(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+          f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['evictions']} evictions")
+
+
+def run_batch(inputs: List[str], api_key: Optional[str], output_dir: str = 'output',
+              engine: str = 'python', cache: Optional[LLMCache] = None,
+              backend: str = 'gemini', chart_workers: int = 0,
+              pdf_workers: int = 0, cohort: Optional[CohortStats] = None,
+              table_cache_dir: Optional[str] = None, force: bool = False,
+              prompt_budget: Optional[int] = None,
+              metrics_writer: Optional[MetricsWriter] = None,
+              output_format: str = 'pdf') -> Dict[str, float]:
+    """Generate one report per submission across all inputs in a single process.
+
+    With ``chart_workers`` > 0, charts render in a process pool while the
+    feedback LLM call for the same report is in flight. With ``pdf_workers``
+    > 0, PDFs are laid out in worker processes behind a bounded queue.
+    Each report is ranked against ``cohort`` when one is given. Reports whose
+    inputs are unchanged since the last run are skipped unless ``force``.
+    Per-report stage timings go to ``metrics_writer`` when one is given.
+    With ``output_format`` 'html' no charts are drawn and no PDFs are built.
+    """
+    paths = expand_inputs(inputs)
+    
+    # One-time setup shared by every submission
+    analysis_model, feedback_model = create_backends(backend, api_key)
+    if not feedback_model.cacheable:
+        cache = None
+    pdf = output_format == 'pdf'
+    chart_pool = ProcessPoolExecutor(chart_workers) if chart_workers and pdf else None
+    pdf_renderer = ParallelPDFRenderer(pdf_workers) if pdf_workers and pdf else None
+    manifest = BuildManifest(output_dir, force=force)
+    prompt_totals: Dict[str, int] = {}
+    
+    succeeded = 0
+    failed = 0
+    start = time.perf_counter()
+    
+    def skip_file(path: str, index: int, e: Exception):
+        nonlocal failed
+        print(f"Error reading submission {index} of {path}, skipping the rest of the file: {str(e)}")
+        failed += 1
+        
+    processors = iter_processors(paths, api_key, analysis_model, engine=engine, cache=cache,
+                                 cohort=cohort, table_cache_dir=table_cache_dir,
+                                 prompt_budget=prompt_budget, on_error=skip_file)
+    try:
+        for path, index, processor in processors:
+            try:
+                report_id = submission_id(processor.data, path, index)
+                output_path = report_path(output_dir, report_id, output_format)
+                fingerprint = report_fingerprint(processor.data, analysis_model, feedback_model,
+                                                 cohort, prompt_budget, output_format)
+                if manifest.is_current(report_id, fingerprint, output_path):
+                    continue
+                with metrics.report(report_id) as report_metrics:
+                    build_report(processor, api_key, feedback_model, output_path, cache, chart_pool,
+                                 pdf_renderer, prompt_totals, output_format,
+                                 on_written=partial(_record_report, manifest, report_id,
+                                                    fingerprint, output_path))
+                if metrics_writer:
+                    metrics_writer.write(report_metrics)
+                succeeded += 1
+            except Exception as e:
+                print(f"Error processing submission {index} of {path}: {str(e)}")
+                failed += 1
+    finally:
+        if chart_pool:
+            chart_pool.shutdown()
+        if pdf_renderer:
+            pdf_renderer.close()
+        # Keep what was built even if the run is interrupted
+        manifest.save()
+    if pdf_renderer:
+        succeeded -= pdf_renderer.failed
+        failed += pdf_renderer.failed
+    return _summarize(paths, succeeded, failed, time.perf_counter() - start, cache,
+                      pdf_renderer=pdf_renderer, manifest=manifest, prompt_totals=prompt_totals)
+
+
+def build_report(processor: DataProcessor, api_key: Optional[str], feedback_model: LLMBackend,
+                 output_path: str, cache: Optional[LLMCache] = None,
+                 chart_pool: Optional[ProcessPoolExecutor] = None,
+                 pdf_renderer: Optional[ParallelPDFRenderer] = None,
+                 prompt_totals: Optional[Dict[str, int]] = None,
+                 output_format: str = 'pdf',
+                 on_written: Optional[Callable[[Dict, str, str], None]] = None) -> Tuple[Dict, str, str]:
+    """Analyse one submission, get its feedback and write its report; returns (data, prompt, feedback).
+
+    Charts render in ``chart_pool`` while the feedback call is in flight when one is given.
+    ``on_written(data, prompt, feedback)`` is called once the report file exists: with
+    ``pdf_renderer`` that is after its PDF is built, and not at all if the build fails.
+    """
+    data = processor.process_data()
+    charts = chart_pool.submit(render_performance_charts, chart_inputs(data)) if chart_pool else None
+    prompt = processor.get_llm_prompt()
+    if prompt_totals is not None:
+        _add_prompt_stats(prompt_totals, processor.get_prompt_stats())
+    feedback = generate_feedback(prompt, api_key, model=feedback_model, cache=cache, context=data)
+    if output_format == 'html':
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        create_html(feedback, data, output_path)
+        if on_written:
+            on_written(data, prompt, feedback)
+        return data, prompt, feedback
+    charts = charts.result() if charts else render_performance_charts(data)
+    _write_pdf(pdf_renderer, feedback, charts, output_path,
+               on_written and partial(on_written, data, prompt, feedback))
+    return data, prompt, feedback
+
+
+def _add_prompt_stats(totals: Dict[str, int], prompt_stats: Dict[str, int]):
+    totals['prompts'] = totals.get('prompts', 0) + 1
+    for key, value in prompt_stats.items():
+        totals[key] = totals.get(key, 0) + value
+
+
+def report_fingerprint(submission: Dict, analysis_model: LLMBackend, feedback_model: LLMBackend,
+                       cohort: Optional[CohortStats] = None,
+                       prompt_budget: Optional[int] = None,
+                       output_format: str = 'pdf') -> Dict[str, str]:
+    """BuildManifest fingerprint of one report, including the cohort, prompt budget and format."""
+    extra = {}
+    if cohort is not None:
+        extra['cohort'] = cohort.fingerprint()
+    if prompt_budget is not None:
+        extra['prompt_budget'] = prompt_budget
+    fingerprint = BuildManifest.fingerprint(submission, model_name(analysis_model),
+                                            model_name(feedback_model), extra)
+    if output_format == 'html':
+        fingerprint['renderer'] = f'html/{HTML_VERSION}'
+    return fingerprint
+
+
+def is_complete(data: Dict, feedback: str) -> bool:
+    """False when an LLM call failed and the report fell back to placeholder text.
+
+    Such reports are not recorded in the manifest, so the next run retries them.
+    """
+    return feedback != FALLBACK_FEEDBACK and data.get('gemini_analysis') != DEFAULT_GEMINI_ANALYSIS
+
+
+def _record_report(manifest: BuildManifest, report_id: str, fingerprint: Dict[str, str],
+                   output_path: str, data: Dict, prompt: str, feedback: str):
+    """build_report's on_written callback: add a finished, complete report to the manifest."""
+    if is_complete(data, feedback):
+        manifest.record(report_id, fingerprint, prompt, output_path)
+
+
+def _write_pdf(pdf_renderer: Optional[ParallelPDFRenderer], feedback: str, charts: List[bytes],
+               output_path: str, on_written: Optional[Callable[[], None]] = None):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if pdf_renderer:
+        # Queued: the renderer calls on_written from the build's done-callback on success
+        pdf_renderer.submit(feedback, charts, output_path, on_written)
+        return
+    create_pdf(feedback, charts, output_path)
+    if on_written:
+        on_written()
+
+
+def _summarize(paths: List[str], succeeded: int, failed: int, elapsed: float,
+               cache: Optional[LLMCache], dispatcher: Optional[AsyncLLMDispatcher] = None,
+               pdf_renderer: Optional[ParallelPDFRenderer] = None,
+               manifest: Optional[BuildManifest] = None,
+               prompt_totals: Optional[Dict[str, int]] = None) -> Dict[str, float]:
+    total = succeeded + failed
+    stats = {
+        'files': len(paths),
+        'submissions': total,
+        'succeeded': succeeded,
+        'failed': failed,
+        'elapsed_seconds': elapsed,
+        'submissions_per_second': total / elapsed if elapsed > 0 else 0.0
+    }
+    
+    print(f"Processed {total} submissions from {len(paths)} files "
+          f"({succeeded} succeeded, {failed} failed) in {elapsed:.2f}s")
+    print(f"Throughput: {stats['submissions_per_second']:.2f} submissions/sec")
+    if manifest is not None:
+        stats['reports'] = manifest.stats()
+        print(f"Reports: {manifest.rebuilt} rebuilt, {manifest.skipped} skipped (unchanged)")
+    if prompt_totals:
+        stats['prompt'] = prompt_totals
+        count = prompt_totals['prompts']
+        print(f"Prompt: avg {prompt_totals['tokens'] / count:.0f} est. tokens "
+              f"({prompt_totals['full_tokens'] / count:.0f} before budget), "
+              f"{prompt_totals['dropped_rows']} rows dropped")
+    if dispatcher is not None:
+        stats['llm'] = dispatcher.stats()
+        print(f"LLM: {stats['llm']['requests']} requests, {stats['llm']['retries']} retries, "
+              f"peak {stats['llm']['peak_in_flight']} in flight, "
+              f"p95 latency {stats['llm']['p95_latency']:.2f}s")
+    if pdf_renderer is not None:
+        stats['pdf'] = pdf_renderer.stats()
+        print(f"PDF: {stats['pdf']['pdfs']} built on {stats['pdf']['workers']} workers, "
+              f"avg {stats['pdf']['avg_seconds_per_pdf']:.2f}s per PDF, "
+              f"{stats['pdf']['pdfs_per_second']:.2f} PDFs/sec")
+    stage_summary = metrics.summary()
+    if stage_summary['stages']:
+        stats['metrics'] = stage_summary
+        for name, stage_stats in stage_summary['stages'].items():
+            print(f"Stage {name}: {stage_stats['calls']} runs, total {stage_stats['total']:.2f}s, "
+                  f"avg {stage_stats['avg'] * 1000:.1f}ms, p95 {stage_stats['p95'] * 1000:.1f}ms")
+        counters = ', '.join(f"{value} {name}" for name, value in sorted(stage_summary['counters'].items()))
+        print(f"Counters: {counters or 'none'}; peak memory {stage_summary['peak_rss_mb']} MB")
+    latencies = llm_client.latency_stats()
+    if latencies:
+        stats['llm_latency'] = latencies
+        for name, model_stats in latencies.items():
+            print(f"{name}: {model_stats['calls']} calls, avg {model_stats['avg']:.2f}s, "
+                  f"p95 {model_stats['p95']:.2f}s")
+    if cache is not None:
+        stats['llm_cache'] = cache.stats()
+        print_cache_stats(cache)
+    return stats
+
+
+def run_batch_async(inputs: List[str], api_key: Optional[str], output_dir: str = 'output',
+                    engine: str = 'python', cache: Optional[LLMCache] = None,
+                    max_in_flight: int = 8, requests_per_minute: Optional[float] = None,
+                    tokens_per_minute: Optional[float] = None, backend: str = 'gemini',
+                    chart_workers: int = 0, pdf_workers: int = 0,
+                    analysis_model: Optional[LLMBackend] = None,
+                    feedback_model: Optional[LLMBackend] = None,
+                    cohort: Optional[CohortStats] = None,
+                    table_cache_dir: Optional[str] = None,
+                    force: bool = False,
+                    prompt_budget: Optional[int] = None,
+                    metrics_writer: Optional[MetricsWriter] = None,
+                    output_format: str = 'pdf') -> Dict[str, float]:
+    """Like run_batch, but with LLM calls for many submissions in flight at once.
+
+    Each report's PDF is rendered as soon as its feedback arrives; with
+    ``chart_workers`` > 0 its charts render in a process pool meanwhile, and
+    ``pdf_workers`` > 0 moves PDF layout to worker processes. Pass
+    FakeBackend instances as the models to simulate latency and 429s offline.
+    """
+    paths = expand_inputs(inputs)
+    
+    if analysis_model is None or feedback_model is None:
+        default_analysis, default_feedback = create_backends(backend, api_key)
+        analysis_model = analysis_model or default_analysis
+        feedback_model = feedback_model or default_feedback
+    if not feedback_model.cacheable:
+        cache = None
+    dispatcher = AsyncLLMDispatcher(analysis_model, max_in_flight=max_in_flight,
+                                    requests_per_minute=requests_per_minute,
+                                    tokens_per_minute=tokens_per_minute)
+    pdf = output_format == 'pdf'
+    chart_pool = ProcessPoolExecutor(chart_workers) if chart_workers and pdf else None
+    pdf_renderer = ParallelPDFRenderer(pdf_workers) if pdf_workers and pdf else None
+    manifest = BuildManifest(output_dir, force=force)
+    prompt_totals: Dict[str, int] = {}
+    
+    async def generate(processor, report_metrics):
+        # Each task runs in its own context, so its stages are charged to its report
+        with metrics.use(report_metrics):
+            data = await processor.process_data_async(dispatcher)
+            charts = None
+            if chart_pool:
+                charts = asyncio.wrap_future(chart_pool.submit(render_performance_charts,
+                                                               chart_inputs(data)))
+            prompt = processor.get_llm_prompt()
+            _add_prompt_stats(prompt_totals, processor.get_prompt_stats())
+            feedback = await generate_feedback_async(prompt, dispatcher, cache=cache,
+                                                     model=feedback_model, context=data)
+            return data, prompt, feedback, (await charts if charts else None)
+        
+    async def run():
+        succeeded = failed = 0
+        
+        def skip_file(path: str, index: int, e: Exception):
+            nonlocal failed
+            print(f"Error reading submission {index} of {path}, skipping the rest of the file: "
+                  f"{str(e)}")
+            failed += 1
+            
+        processors = iter_processors(paths, api_key, analysis_model, engine=engine, cache=cache,
+                                     cohort=cohort, table_cache_dir=table_cache_dir,
+                                     prompt_budget=prompt_budget, on_error=skip_file)
+        pending = {}
+        exhausted = False
+        # Only keep a bounded window of submissions alive at a time
+        window = max_in_flight * 2
+        
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    path, index, processor = next(processors)
+                except StopIteration:
+                    exhausted = True
+                    break
+                report_id = submission_id(processor.data, path, index)
+                output_path = report_path(output_dir, report_id, output_format)
+                fingerprint = report_fingerprint(processor.data, analysis_model, feedback_model,
+                                                 cohort, prompt_budget, output_format)
+                if manifest.is_current(report_id, fingerprint, output_path):
+                    continue
+                report_metrics = metrics.ReportMetrics(report_id)
+                task = asyncio.ensure_future(generate(processor, report_metrics))
+                pending[task] = (path, index, report_id, output_path, fingerprint, report_metrics)
+            if not pending:
+                return succeeded, failed
+                
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                path, index, report_id, output_path, fingerprint, report_metrics = pending.pop(task)
+                try:
+                    data, prompt, feedback, charts = task.result()
+                    record = partial(_record_report, manifest, report_id, fingerprint, output_path,
+                                     data, prompt, feedback)
+                    with metrics.use(report_metrics):
+                        if not pdf:
+                            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                            create_html(feedback, data, output_path)
+                            record()
+                        else:
+                            # Drawing charts, laying out the PDF and waiting for a renderer
+                            # queue slot all block; in-flight LLM calls must not stall on them
+                            charts = charts or await asyncio.to_thread(render_performance_charts, data)
+                            await asyncio.to_thread(_write_pdf, pdf_renderer, feedback, charts,
+                                                    output_path, record)
+                    if metrics_writer:
+                        metrics_writer.write(report_metrics)
+                    succeeded += 1
+                except Exception as e:
+                    print(f"Error processing submission {index} of {path}: {str(e)}")
+                    failed += 1
+                    
+    start = time.perf_counter()
+    try:
+        succeeded, failed = asyncio.run(run())
+    finally:
+        if chart_pool:
+            chart_pool.shutdown()
+        if pdf_renderer:
+            pdf_renderer.close()
+        # Keep what was built even if the run is interrupted
+        manifest.save()
+    if pdf_renderer:
+        succeeded -= pdf_renderer.failed
+        failed += pdf_renderer.failed
+    return _summarize(paths, succeeded, failed, time.perf_counter() - start, cache, dispatcher,
+                      pdf_renderer, manifest, prompt_totals)
@@ -1,4 +1,228 @@
-import matplotlib.pyplot as plt
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from src import metrics
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# Charts are drawn with the object-oriented Agg API rather than pyplot: no
+# global figure state, so rendering is safe in worker processes and threads,
+# and PNGs go to memory instead of a shared output directory. matplotlib is
+# imported by the first chart rather than with this module, so runs that
+# never draw (or only prepare chart_inputs for a pool) don't pay for it.
+
+# Bump whenever a chart's look changes so build manifests rebuild existing reports
+CHARTS_VERSION = 2
+
+CHART_NAMES = ['subject_performance.png', 'section_performance.png']
+# Added after CHART_NAMES when the report has a pacing analysis
+PACING_CHART_NAME = 'pacing.png'
+# Added after CHART_NAMES when the report was built against a cohort
+COHORT_CHART_NAME = 'cohort_comparison.png'
+
+
+def _new_figure(figsize) -> 'Figure':
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _to_png(fig: 'Figure') -> bytes:
+    buf = BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def pacing_chart_inputs(pacing: Dict[str, Any]) -> Dict[str, List]:
+    """Per-phase values of a pacing report (src/pacing.py) for render_pacing_chart."""
+    nan = float('nan')
+    phases = pacing['phases']
+    return {
+        'labels': [f"{phase['from_minute']:.0f}-{phase['to_minute']:.0f}" for phase in phases],
+        'accuracy': [nan if phase['accuracy'] is None else phase['accuracy'] for phase in phases],
+        'avg_time': [nan if phase['avg_time'] is None else phase['avg_time'] for phase in phases],
+        'flags': [phase['flag'] or '' for phase in phases]
+    }
+
+
+def chart_inputs(data: Dict[str, Any]) -> Dict[str, List]:
+    """The few values the performance charts need from process_data output.
+
+    Small and picklable, so it is cheap to ship to worker processes.
+    """
+    sections = list(data['section_wise'].items())
+    inputs = {
+        'subjects': list(data['subject_wise'].keys()),
+        'accuracies': [stats['accuracy'] for stats in data['subject_wise'].values()],
+        'sections': [section for section, _ in sections],
+        'correct': [analysis['correct_answers'] for _, analysis in sections],
+        'total': [analysis['total_questions'] for _, analysis in sections]
+    }
+    if 'pacing' in data:
+        inputs['pacing'] = pacing_chart_inputs(data['pacing'])
+    if 'cohort_comparison' in data:
+        chapters = [(chapter, stats) for chapter, stats in data['cohort_comparison']['chapters'].items()
+                    if 'cohort_mean' in stats]
+        inputs['cohort'] = {
+            'chapters': [chapter for chapter, _ in chapters],
+            'accuracy': [stats['accuracy'] for _, stats in chapters],
+            'cohort_mean': [stats['cohort_mean'] for _, stats in chapters]
+        }
+    return inputs
+
+
+def render_subject_chart(inputs: Dict[str, List]) -> bytes:
+    """Subject-wise accuracy bar chart as PNG bytes."""
+    fig = _new_figure((10, 6))
+    ax = fig.add_subplot()
+    ax.bar(inputs['subjects'], inputs['accuracies'])
+    ax.set_title('Subject-wise Performance')
+    ax.set_xlabel('Subjects')
+    ax.set_ylabel('Accuracy (%)')
+    ax.set_ylim(0, 100)
+    for i, v in enumerate(inputs['accuracies']):
+        ax.text(i, v + 1, f'{v:.1f}%', ha='center')
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def render_section_chart(inputs: Dict[str, List]) -> bytes:
+    """Section-wise correct vs. total questions as PNG bytes."""
+    fig = _new_figure((12, 6))
+    ax = fig.add_subplot()
+    x = range(len(inputs['sections']))
+    width = 0.35
+    
+    ax.bar(x, inputs['total'], width, label='Total Questions', color='lightgray')
+    ax.bar(x, inputs['correct'], width, label='Correct Answers', color='green')
+    
+    ax.set_title('Section-wise Performance')
+    ax.set_xlabel('Sections')
+    ax.set_ylabel('Number of Questions')
+    ax.set_xticks(list(x))
+    ax.set_xticklabels(inputs['sections'], rotation=45, ha='right')
+    ax.legend()
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def render_pacing_chart(inputs: Dict[str, List]) -> bytes:
+    """Accuracy and seconds per answer over the phases of the test as PNG bytes."""
+    pacing = inputs['pacing']
+    colors = {'': 'steelblue', 'rush': 'orange', 'fatigue': 'firebrick'}
+    fig = _new_figure((10, 6))
+    ax = fig.add_subplot()
+    x = np.arange(len(pacing['labels']))
+    
+    ax.bar(x, pacing['accuracy'], color=[colors[flag] for flag in pacing['flags']])
+    ax.set_title('Pacing Through the Test')
+    ax.set_xlabel('Minutes into the test')
+    ax.set_ylabel('Accuracy (%)')
+    ax.set_ylim(0, 100)
+    ax.set_xticks(x)
+    ax.set_xticklabels(pacing['labels'])
+    for i, flag in enumerate(pacing['flags']):
+        if flag:
+            ax.text(i, 2, flag, ha='center', color='white')
+            
+    time_ax = ax.twinx()
+    time_ax.plot(x, pacing['avg_time'], color='black', marker='o')
+    time_ax.set_ylabel('Average Time per Answer (s)')
+    time_ax.set_ylim(bottom=0)
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def render_cohort_chart(inputs: Dict[str, List]) -> bytes:
+    """Student vs. cohort-average accuracy per chapter as PNG bytes."""
+    cohort = inputs['cohort']
+    fig = _new_figure((12, 6))
+    ax = fig.add_subplot()
+    x = np.arange(len(cohort['chapters']))
+    width = 0.4
+    
+    ax.bar(x - width / 2, cohort['accuracy'], width, label='Student', color='steelblue')
+    ax.bar(x + width / 2, cohort['cohort_mean'], width, label='Cohort Average', color='lightgray')
+    
+    ax.set_title('Chapter Accuracy vs. Cohort')
+    ax.set_ylabel('Accuracy (%)')
+    ax.set_ylim(0, 100)
+    ax.set_xticks(x)
+    ax.set_xticklabels(cohort['chapters'], rotation=45, ha='right')
+    ax.legend()
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def render_chapter_heatmap(cohort) -> bytes:
+    """Heatmap of how a CohortStats' students are spread over chapter accuracy bands."""
+    accuracy = cohort.chapter_accuracy
+    bands = np.linspace(0, 100, 11)
+    # Share of the students who saw each chapter that fall in each 10% band
+    shares = np.array([np.histogram(column[~np.isnan(column)], bins=bands)[0]
+                       for column in accuracy.T], dtype=np.float64).reshape(-1, len(bands) - 1)
+    shares /= np.maximum(shares.sum(axis=1, keepdims=True), 1)
+    
+    fig = _new_figure((10, max(4, 0.3 * len(cohort.chapter_names) + 2)))
+    ax = fig.add_subplot()
+    image = ax.imshow(shares * 100, aspect='auto', cmap='viridis')
+    ax.set_title(f'Chapter Accuracy Distribution ({len(cohort)} students)')
+    ax.set_xlabel('Accuracy (%)')
+    ax.set_xticks(np.arange(len(bands) - 1))
+    ax.set_xticklabels([f'{int(lo)}-{int(hi)}' for lo, hi in zip(bands[:-1], bands[1:])],
+                       rotation=45, ha='right')
+    ax.set_yticks(np.arange(len(cohort.chapter_names)))
+    ax.set_yticklabels(cohort.chapter_names)
+    fig.colorbar(image, ax=ax, label='Students (%)')
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def render_performance_charts(data: Dict[str, Any]) -> List[bytes]:
+    """Render the report charts in memory; accepts process_data output or chart_inputs."""
+    with metrics.stage('charts'):
+        inputs = data if 'subjects' in data else chart_inputs(data)
+        charts = [render_subject_chart(inputs), render_section_chart(inputs)]
+        if 'pacing' in inputs:
+            charts.append(render_pacing_chart(inputs))
+        if 'cohort' in inputs:
+            charts.append(render_cohort_chart(inputs))
+        return charts
+
+
+def render_charts_batch(datas: List[Dict[str, Any]], workers: Optional[int] = None,
+                        executor: Optional[ProcessPoolExecutor] = None) -> List[List[bytes]]:
+    """Render charts for many reports across a process pool, in input order."""
+    inputs = [chart_inputs(data) for data in datas]
+    if executor is not None:
+        return list(executor.map(render_performance_charts, inputs))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Batch items per task so pickling overhead doesn't dominate
+        chunksize = max(1, len(inputs) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(render_performance_charts, inputs, chunksize=chunksize))
+
+
+def create_performance_charts(data, output_dir):
+    """Create performance visualization charts."""
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    
+    names = CHART_NAMES + ([PACING_CHART_NAME] if 'pacing' in data else []) + [COHORT_CHART_NAME]
+    paths = []
+    for name, png in zip(names, render_performance_charts(data)):
+        path = os.path.join(output_dir, name)
+        with open(path, 'wb') as f:
+            f.write(png)
+        paths.append(path)
+    return paths
 
 def plot_accuracy_by_chapter(df, output_path):
     # Filter attempted questions only
@@ -8,14 +232,17 @@ def plot_accuracy_by_chapter(df, output_path):
         return
     acc = attempted.groupby('chapter')['is_correct'].mean() * 100
     acc = acc.sort_values(ascending=False)
-    plt.figure(figsize=(8, 4))
-    acc.plot(kind='bar', color='skyblue')
-    plt.title('Accuracy by Chapter')
-    plt.ylabel('Accuracy (%)')
-    plt.xlabel('Chapter')
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+    fig = _new_figure((8, 4))
+    ax = fig.add_subplot()
+    ax.bar(range(len(acc)), acc.values, color='skyblue')
+    ax.set_xticks(range(len(acc)))
+    ax.set_xticklabels(acc.index, rotation=90)
+    ax.set_title('Accuracy by Chapter')
+    ax.set_ylabel('Accuracy (%)')
+    ax.set_xlabel('Chapter')
+    fig.tight_layout()
+    # output_path may be a filename or a file-like object such as BytesIO
+    fig.savefig(output_path, format='png')
 
 def plot_time_vs_accuracy(df, output_path):
     attempted = df[df['status'].isin(['answered', 'answeredReview', 'markedReview'])]
@@ -23,13 +250,13 @@ def plot_time_vs_accuracy(df, output_path):
         print("No attempted questions to plot.")
         return
     grouped = attempted.groupby('chapter').agg({'time_taken':'mean', 'is_correct':'mean'})
-    plt.figure(figsize=(6, 4))
-    plt.scatter(grouped['time_taken'], grouped['is_correct']*100, color='orange')
+    fig = _new_figure((6, 4))
+    ax = fig.add_subplot()
+    ax.scatter(grouped['time_taken'], grouped['is_correct']*100, color='orange')
     for i, txt in enumerate(grouped.index):
-        plt.annotate(txt, (grouped['time_taken'].iloc[i], grouped['is_correct'].iloc[i]*100))
-    plt.xlabel('Average Time Taken (s)')
-    plt.ylabel('Accuracy (%)')
-    plt.title('Time vs Accuracy by Chapter')
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+        ax.annotate(txt, (grouped['time_taken'].iloc[i], grouped['is_correct'].iloc[i]*100))
+    ax.set_xlabel('Average Time Taken (s)')
+    ax.set_ylabel('Accuracy (%)')
+    ax.set_title('Time vs Accuracy by Chapter')
+    fig.tight_layout()
+    fig.savefig(output_path, format='png')
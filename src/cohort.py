@@ -0,0 +1,439 @@
+import hashlib
+from functools import cached_property
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.columnar import LEVELS, _gc_paused, build_question_table
+from src.data_processor import SUBJECT_NAMES
+from src.pacing import analyze_pacing
+
+# Percentiles reported for every score distribution
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _question_key(question: Dict) -> str:
+    """Identify a question across submissions (section order varies per student)."""
+    return question['questionId']['question']['text']
+
+
+def percentile_rank(scores: np.ndarray, values) -> np.ndarray:
+    """Percent of ``scores`` below each value, counting ties as half (NaNs ignored)."""
+    return _rank_sorted(np.sort(scores[~np.isnan(scores)]), values)
+
+
+def _sorted_columns(matrix: np.ndarray) -> List[np.ndarray]:
+    """Each column of ``matrix`` sorted with its NaNs dropped, sorting the matrix once."""
+    ranked = np.sort(matrix, axis=0)
+    counts = (~np.isnan(matrix)).sum(axis=0).tolist()
+    return [ranked[:count, i] for i, count in enumerate(counts)]
+
+
+def _sorted_median(ranked: np.ndarray) -> float:
+    """np.median of scores already sorted with NaNs dropped, without partitioning them again."""
+    middle = len(ranked) // 2
+    if len(ranked) == 0:
+        return np.nan
+    if len(ranked) % 2:
+        return float(ranked[middle])
+    return float((ranked[middle - 1] + ranked[middle]) / 2)
+
+
+def _rank_sorted(ranked: np.ndarray, values) -> np.ndarray:
+    """percentile_rank against scores already sorted with NaNs dropped."""
+    if len(ranked) == 0:
+        return np.full(np.shape(values), np.nan)
+    below = np.searchsorted(ranked, values, side='left')
+    at_or_below = np.searchsorted(ranked, values, side='right')
+    return (below + at_or_below) / 2 / len(ranked) * 100
+
+
+def distribution(values: np.ndarray) -> Dict[str, float]:
+    """Mean and PERCENTILES of the non-NaN values."""
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'students': 0}
+    summary = {'students': len(values), 'mean': float(values.mean())}
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist()):
+        summary[f'p{p}'] = value
+    return summary
+
+
+# CohortStats attributes stored by save(): NumPy columns, then lists of names
+_ARRAYS = ('total_scores', 'subject_scores', 'chapter_correct', 'chapter_total', 'question_seen',
+           'question_correct', 'question_answered', 'question_time', 'level_times')
+_NAMES = ('subject_names', 'chapter_names', 'question_keys', 'question_chapters')
+
+
+class CohortStats:
+    """Score distributions of many submissions of one test.
+
+    Per-student values are kept as NumPy columns (one row per submission), so
+    a 100k-student cohort takes a few tens of MB; per-question counters are
+    summed over the whole cohort.
+    """
+    
+    def __init__(self, total_scores: np.ndarray, subject_names: List[str],
+                 subject_scores: np.ndarray, chapter_names: List[str],
+                 chapter_correct: np.ndarray, chapter_total: np.ndarray,
+                 question_keys: List[str], question_chapters: List[str],
+                 question_seen: np.ndarray, question_correct: np.ndarray,
+                 question_answered: np.ndarray, question_time: np.ndarray,
+                 level_times: np.ndarray):
+        self.total_scores = total_scores
+        self.subject_names = subject_names
+        self.subject_scores = subject_scores
+        self.chapter_names = chapter_names
+        self.chapter_correct = chapter_correct
+        self.chapter_total = chapter_total
+        self.question_keys = question_keys
+        self.question_chapters = question_chapters
+        self.question_seen = question_seen
+        self.question_correct = question_correct
+        self.question_answered = question_answered
+        self.question_time = question_time
+        # Students x LEVELS mean seconds per answered question (see src/pacing.py)
+        self.level_times = level_times
+        self._question_index = {key: i for i, key in enumerate(question_keys)}
+        self._fingerprint: Optional[str] = None
+        self._chapter_index = {name: i for i, name in enumerate(chapter_names)}
+        
+    def __len__(self) -> int:
+        return len(self.total_scores)
+        
+    @cached_property
+    def chapter_accuracy(self) -> np.ndarray:
+        """Students x chapters accuracy in percent; NaN where a student saw no question."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.chapter_total > 0,
+                            self.chapter_correct / self.chapter_total * 100, np.nan)
+            
+    # compare() runs once per report against the same cohort: sort every column
+    # once and rank each report with np.searchsorted. The columns are never
+    # modified after construction (merge_cohorts builds a new CohortStats).
+    @cached_property
+    def _ranked_totals(self) -> np.ndarray:
+        return np.sort(self.total_scores[~np.isnan(self.total_scores)])
+        
+    @cached_property
+    def _ranked_subjects(self) -> List[np.ndarray]:
+        return _sorted_columns(self.subject_scores)
+        
+    @cached_property
+    def _ranked_chapters(self) -> List[np.ndarray]:
+        return _sorted_columns(self.chapter_accuracy)
+        
+    @cached_property
+    def _ranked_levels(self) -> List[np.ndarray]:
+        return _sorted_columns(self.level_times)
+        
+    @cached_property
+    def _chapter_means(self) -> List[float]:
+        return [float(column.mean()) if len(column) else np.nan for column in self._ranked_chapters]
+        
+    @property
+    def p_values(self) -> np.ndarray:
+        """Observed difficulty: share of students who got each question right."""
+        return self.question_correct / np.maximum(self.question_seen, 1)
+        
+    @property
+    def avg_times(self) -> np.ndarray:
+        """Average seconds spent on each question."""
+        return self.question_time / np.maximum(self.question_seen, 1)
+        
+    def fingerprint(self) -> str:
+        """Hash of the cohort's contents, so reports compared against it can be cached."""
+        # Every report's manifest fingerprint asks for it; hash the columns only once
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            for column in (self.total_scores, self.subject_scores, self.chapter_correct,
+                           self.chapter_total, self.question_seen, self.question_correct,
+                           self.question_time, self.level_times):
+                digest.update(np.ascontiguousarray(column).tobytes())
+            digest.update('\0'.join(self.subject_names + self.chapter_names).encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+        
+    def save(self, path: str):
+        """Write every column to one .npz file (read back with CohortStats.load)."""
+        columns = {name: getattr(self, name) for name in _ARRAYS}
+        columns.update({name: np.array(getattr(self, name), dtype=str) for name in _NAMES})
+        with open(path, 'wb') as f:
+            np.savez(f, **columns)
+            
+    @classmethod
+    def load(cls, path: str) -> 'CohortStats':
+        with np.load(path) as columns:
+            return cls(**{name: columns[name] for name in _ARRAYS},
+                       **{name: columns[name].tolist() for name in _NAMES})
+        
+    def percentile_ranks(self) -> np.ndarray:
+        """Every student's percentile rank on total marks."""
+        return percentile_rank(self.total_scores, self.total_scores)
+        
+    def summary(self, hardest: int = 10) -> Dict[str, Any]:
+        """Cohort-wide distributions and the questions the fewest students got right."""
+        chapter_accuracy = self.chapter_accuracy
+        p_values = self.p_values
+        avg_times = self.avg_times
+        attempt_rates = self.question_answered / np.maximum(self.question_seen, 1)
+        order = np.argsort(p_values, kind='stable')[:hardest].tolist()
+        return {
+            'students': len(self),
+            'total_marks': distribution(self.total_scores),
+            'subjects': {name: distribution(self.subject_scores[:, i])
+                         for i, name in enumerate(self.subject_names)},
+            'chapters': {name: distribution(chapter_accuracy[:, i])
+                         for i, name in enumerate(self.chapter_names)},
+            'level_times': {level: distribution(self.level_times[:, i])
+                            for i, level in enumerate(LEVELS)},
+            'hardest_questions': [{
+                'chapter': self.question_chapters[i],
+                'p_value': float(p_values[i]),
+                'attempt_rate': float(attempt_rates[i]),
+                'avg_time': float(avg_times[i])
+            } for i in order]
+        }
+        
+    def compare(self, submission: Dict) -> Dict[str, Any]:
+        """How one submission stands against the cohort (it need not be part of it)."""
+        subject_marks = {SUBJECT_NAMES.get(s['subjectId']['$oid'], 'Unknown'): s['totalMarkScored']
+                         for s in submission['subjects']}
+        table = build_question_table([submission])
+        
+        chapter_counts = np.diff(table.chapter_offsets)
+        correct = np.repeat(table.correct, chapter_counts)
+        totals = np.bincount(table.chapter_codes, minlength=len(table.chapter_names))
+        corrects = np.bincount(table.chapter_codes, weights=correct, minlength=len(table.chapter_names))
+        chapters = {}
+        for code, name in enumerate(table.chapter_names):
+            if totals[code] == 0:
+                continue
+            accuracy = corrects[code] / totals[code] * 100
+            entry = {'accuracy': accuracy}
+            if name in self._chapter_index:
+                i = self._chapter_index[name]
+                entry['cohort_mean'] = self._chapter_means[i]
+                entry['percentile'] = float(_rank_sorted(self._ranked_chapters[i], accuracy))
+            chapters[name] = entry
+            
+        # Seconds per answer at each level against the cohort; a high percentile means slower
+        level_times = {}
+        student_times = analyze_pacing(table, [submission['test']['totalTime']]).level_time[0].tolist()
+        for level, seconds, column in zip(LEVELS, student_times, self._ranked_levels):
+            if np.isnan(seconds) or len(column) == 0:
+                continue
+            level_times[level] = {
+                'avg_time': seconds,
+                'cohort_median': _sorted_median(column),
+                'percentile': float(_rank_sorted(column, seconds))
+            }
+            
+        # Questions most of the cohort answered correctly but this student missed
+        p_values = self.p_values
+        avg_times = self.avg_times
+        missed = []
+        questions = [q for section in submission['sections'] for q in section['questions']]
+        for question, got_right in zip(questions, table.correct.tolist()):
+            index = self._question_index.get(_question_key(question))
+            if index is not None and not got_right:
+                missed.append({
+                    'chapter': self.question_chapters[index],
+                    'p_value': float(p_values[index]),
+                    'avg_time': float(avg_times[index]),
+                    'time_taken': question.get('timeTaken', 0)
+                })
+        missed.sort(key=lambda q: q['p_value'], reverse=True)
+        
+        return {
+            'students': len(self),
+            'total_marks': {
+                'score': submission['totalMarkScored'],
+                'percentile': float(_rank_sorted(self._ranked_totals, submission['totalMarkScored'])),
+                'median': _sorted_median(self._ranked_totals)
+            },
+            'subjects': {name: {
+                'score': subject_marks[name],
+                'percentile': float(_rank_sorted(self._ranked_subjects[i], subject_marks[name])),
+                'median': _sorted_median(self._ranked_subjects[i])
+            } for i, name in enumerate(self.subject_names) if name in subject_marks},
+            'chapters': chapters,
+            'level_times': level_times,
+            'missed_common_questions': [q for q in missed if q['p_value'] >= 0.5]
+        }
+
+
+class CohortBuilder:
+    """Accumulate CohortStats from submissions added in chunks.
+
+    Only small per-student rows and per-question counters are kept, so
+    submissions can be streamed from disk and dropped after each chunk.
+    """
+    
+    def __init__(self):
+        self.subject_index: Dict[str, int] = {}
+        self.chapter_index: Dict[str, int] = {}
+        self.question_index: Dict[str, int] = {}
+        self.question_chapters: List[str] = []
+        self._total_scores: List[np.ndarray] = []
+        self._subject_scores: List[np.ndarray] = []
+        self._chapter_correct: List[np.ndarray] = []
+        self._chapter_total: List[np.ndarray] = []
+        self._level_times: List[np.ndarray] = []
+        self._seen = np.zeros(0, dtype=np.int64)
+        self._correct = np.zeros(0, dtype=np.int64)
+        self._answered = np.zeros(0, dtype=np.int64)
+        self._time = np.zeros(0, dtype=np.float64)
+        
+    @_gc_paused()
+    def add(self, submissions: List[Dict]):
+        """Fold one chunk of submissions into the running totals."""
+        if not submissions:
+            return
+        n = len(submissions)
+        table = build_question_table(submissions)
+        
+        self._total_scores.append(np.array([s['totalMarkScored'] for s in submissions],
+                                           dtype=np.float64))
+        subject_rows, subject_cols, subject_marks = [], [], []
+        for row, submission in enumerate(submissions):
+            for subject in submission['subjects']:
+                name = SUBJECT_NAMES.get(subject['subjectId']['$oid'], 'Unknown')
+                subject_rows.append(row)
+                subject_cols.append(self.subject_index.setdefault(name, len(self.subject_index)))
+                subject_marks.append(subject['totalMarkScored'])
+        scores = np.full((n, len(self.subject_index)), np.nan)
+        scores[subject_rows, subject_cols] = subject_marks
+        self._subject_scores.append(scores)
+        
+        # Per-student chapter counts: remap this chunk's chapter codes to global ones
+        remap = np.array([self.chapter_index.setdefault(name, len(self.chapter_index))
+                          for name in table.chapter_names], dtype=np.int64)
+        chapter_counts = np.diff(table.chapter_offsets)
+        row_student = np.array([submission_index for submission_index, _ in table.groups],
+                               dtype=np.int64)[np.repeat(table.group, chapter_counts)]
+        num_chapters = len(self.chapter_index)
+        keys = row_student * num_chapters + remap[table.chapter_codes]
+        size = n * num_chapters
+        self._chapter_total.append(
+            np.bincount(keys, minlength=size).reshape(n, num_chapters).astype(np.int16))
+        self._chapter_correct.append(
+            np.bincount(keys, weights=np.repeat(table.correct, chapter_counts),
+                        minlength=size).reshape(n, num_chapters).astype(np.int16))
+        
+        total_times = [submission['test']['totalTime'] for submission in submissions]
+        self._level_times.append(analyze_pacing(table, total_times).level_time)
+        
+        # Per-question counters keyed by question identity
+        codes = []
+        for submission in submissions:
+            for section in submission['sections']:
+                for question in section['questions']:
+                    key = _question_key(question)
+                    code = self.question_index.get(key)
+                    if code is None:
+                        code = self.question_index[key] = len(self.question_index)
+                        chapters = question['questionId']['chapters']
+                        self.question_chapters.append(chapters[0]['title'] if chapters else 'Unknown')
+                    codes.append(code)
+        codes = np.array(codes, dtype=np.int64)
+        m = len(self.question_index)
+        self._seen = self._grow(self._seen, m) + np.bincount(codes, minlength=m)
+        self._correct = self._grow(self._correct, m) + np.bincount(
+            codes, weights=table.correct, minlength=m).astype(np.int64)
+        self._answered = self._grow(self._answered, m) + np.bincount(
+            codes, weights=table.answered, minlength=m).astype(np.int64)
+        self._time = self._grow(self._time, m) + np.bincount(
+            codes, weights=table.time_taken, minlength=m)
+        
+    @staticmethod
+    def _grow(counts: np.ndarray, size: int) -> np.ndarray:
+        return np.concatenate((counts, np.zeros(size - len(counts), dtype=counts.dtype)))
+        
+    @staticmethod
+    def _stack(chunks: List[np.ndarray], width: int, fill) -> np.ndarray:
+        """Stack per-chunk matrices, padding columns first seen in later chunks."""
+        return np.vstack([np.pad(chunk, ((0, 0), (0, width - chunk.shape[1])),
+                                 constant_values=fill) for chunk in chunks])
+        
+    def finish(self) -> CohortStats:
+        if not self._total_scores:
+            raise ValueError("Cohort has no submissions")
+        num_chapters = len(self.chapter_index)
+        return CohortStats(
+            total_scores=np.concatenate(self._total_scores),
+            subject_names=list(self.subject_index),
+            subject_scores=self._stack(self._subject_scores, len(self.subject_index), np.nan),
+            chapter_names=list(self.chapter_index),
+            chapter_correct=self._stack(self._chapter_correct, num_chapters, 0),
+            chapter_total=self._stack(self._chapter_total, num_chapters, 0),
+            question_keys=list(self.question_index),
+            question_chapters=self.question_chapters,
+            question_seen=self._seen,
+            question_correct=self._correct,
+            question_answered=self._answered,
+            question_time=self._time,
+            level_times=np.concatenate(self._level_times)
+        )
+
+
+def merge_cohorts(parts: List[CohortStats]) -> CohortStats:
+    """One CohortStats over the students of every part, e.g. per-shard cohorts of one test."""
+    if not parts:
+        raise ValueError("Cohort has no submissions")
+    subject_index: Dict[str, int] = {}
+    chapter_index: Dict[str, int] = {}
+    question_index: Dict[str, int] = {}
+    question_chapters: List[str] = []
+    for part in parts:
+        for name in part.subject_names:
+            subject_index.setdefault(name, len(subject_index))
+        for name in part.chapter_names:
+            chapter_index.setdefault(name, len(chapter_index))
+        for key, chapter in zip(part.question_keys, part.question_chapters):
+            if key not in question_index:
+                question_index[key] = len(question_index)
+                question_chapters.append(chapter)
+                
+    def widen(matrix: np.ndarray, names: List[str], index: Dict[str, int], fill) -> np.ndarray:
+        # Columns follow each part's own name order; move them to the merged order
+        wide = np.full((len(matrix), len(index)), fill, dtype=matrix.dtype)
+        wide[:, [index[name] for name in names]] = matrix
+        return wide
+        
+    m = len(question_index)
+    counters = {name: np.zeros(m, dtype=np.float64 if name == 'question_time' else np.int64)
+                for name in ('question_seen', 'question_correct', 'question_answered', 'question_time')}
+    for part in parts:
+        codes = np.array([question_index[key] for key in part.question_keys], dtype=np.int64)
+        for name, total in counters.items():
+            total[codes] += getattr(part, name)
+            
+    return CohortStats(
+        total_scores=np.concatenate([part.total_scores for part in parts]),
+        subject_names=list(subject_index),
+        subject_scores=np.vstack([widen(part.subject_scores, part.subject_names, subject_index, np.nan)
+                                  for part in parts]),
+        chapter_names=list(chapter_index),
+        chapter_correct=np.vstack([widen(part.chapter_correct, part.chapter_names, chapter_index, 0)
+                                   for part in parts]),
+        chapter_total=np.vstack([widen(part.chapter_total, part.chapter_names, chapter_index, 0)
+                                 for part in parts]),
+        question_keys=list(question_index),
+        question_chapters=question_chapters,
+        level_times=np.vstack([part.level_times for part in parts]),
+        **counters
+    )
+
+
+def build_cohort(submissions: Iterable[Dict], chunk_size: int = 2000) -> CohortStats:
+    """Build CohortStats in one pass, holding at most ``chunk_size`` submissions at once."""
+    builder = CohortBuilder()
+    submissions = iter(submissions)
+    while True:
+        chunk = list(islice(submissions, chunk_size))
+        if not chunk:
+            break
+        builder.add(chunk)
+    return builder.finish()
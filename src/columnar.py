@@ -0,0 +1,253 @@
+import gc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Order matches the difficulty_analysis dict built by DataProcessor
+LEVELS = ('easy', 'medium', 'tough')
+_LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+
+
+def is_correct_answer(question: Dict) -> bool:
+    """Check if the question was answered correctly (mirrors DataProcessor)."""
+    if 'markedOptions' in question:
+        for option in question['markedOptions']:
+            if option.get('isCorrect', False):
+                return True
+                
+    if 'inputValue' in question and question['inputValue'] is not None:
+        return question['inputValue'].get('isCorrect', False)
+        
+    return False
+
+
+@contextmanager
+def _gc_paused():
+    """Suspend cyclic GC while bulk-allocating containers that hold no cycles."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class QuestionTable:
+    """Every question of every section of many submissions as flat columns.
+
+    Each (submission, section) pair is a *group*; per-question columns carry
+    the group index they belong to. Chapters and topics are multi-valued, so
+    they are stored CSR-style: ``chapter_offsets[i]:chapter_offsets[i + 1]``
+    slices ``chapter_codes`` for question ``i``.
+    """
+    
+    # Per-question columns and the CSR label arrays, in the order they are saved to disk
+    COLUMNS = ('group', 'answered', 'correct', 'time_taken', 'time_is_float', 'time_left',
+               'level', 'chapter_offsets', 'chapter_codes', 'topic_offsets', 'topic_codes',
+               'concept_offsets', 'concept_codes')
+    
+    def __init__(self, groups: List[Tuple[int, str]], group: np.ndarray,
+                 answered: np.ndarray, correct: np.ndarray, time_taken: np.ndarray,
+                 time_is_float: np.ndarray, time_left: np.ndarray, level: np.ndarray,
+                 chapter_offsets: np.ndarray, chapter_codes: np.ndarray,
+                 chapter_names: List[str], topic_offsets: np.ndarray,
+                 topic_codes: np.ndarray, topic_names: List[str],
+                 concept_offsets: np.ndarray, concept_codes: np.ndarray,
+                 concept_names: List[str]):
+        self.groups = groups
+        self.group = group
+        self.answered = answered
+        self.correct = correct
+        self.time_taken = time_taken
+        self.time_is_float = time_is_float
+        # timeLeftWhenAttempted in minutes, NaN where the export has none
+        self.time_left = time_left
+        self.level = level
+        self.chapter_offsets = chapter_offsets
+        self.chapter_codes = chapter_codes
+        self.chapter_names = chapter_names
+        self.topic_offsets = topic_offsets
+        self.topic_codes = topic_codes
+        self.topic_names = topic_names
+        self.concept_offsets = concept_offsets
+        self.concept_codes = concept_codes
+        self.concept_names = concept_names
+        
+    def __len__(self) -> int:
+        return len(self.group)
+        
+    @property
+    def num_groups(self) -> int:
+        return len(self.groups)
+
+
+@_gc_paused()
+def build_question_table(submissions: Iterable[Dict]) -> QuestionTable:
+    """Flatten all questions of all sections of all submissions in one pass."""
+    groups, group_sizes = [], []
+    answered, correct, time_taken, time_left, level = [], [], [], [], []
+    chapter_counts, chapter_codes = [], []
+    topic_counts, topic_codes = [], []
+    concept_counts, concept_codes = [], []
+    # Dictionary-encode labels; setdefault hands out codes in first-seen order
+    chapter_index: Dict[str, int] = {}
+    topic_index: Dict[str, int] = {}
+    concept_index: Dict[str, int] = {}
+    
+    for submission_index, submission in enumerate(submissions):
+        for section in submission['sections']:
+            groups.append((submission_index, section['sectionId']['title']))
+            questions = section['questions']
+            group_sizes.append(len(questions))
+            details = [q['questionId'] for q in questions]
+            
+            answered.extend([q['status'] == 'answered' for q in questions])
+            correct.extend([is_correct_answer(q) for q in questions])
+            time_taken.extend([q.get('timeTaken', 0) for q in questions])
+            time_left.extend([q.get('timeLeftWhenAttempted') for q in questions])
+            # Unknown levels fail just like the dict-based analysis does
+            level.extend([_LEVEL_CODES[d['level']] for d in details])
+            
+            chapter_counts.extend([len(d['chapters']) for d in details])
+            chapter_codes.extend([chapter_index.setdefault(c['title'], len(chapter_index))
+                                  for d in details for c in d['chapters']])
+            topic_counts.extend([len(d['topics']) for d in details])
+            topic_codes.extend([topic_index.setdefault(t['title'], len(topic_index))
+                                for d in details for t in d['topics']])
+            concept_counts.extend([len(d.get('concepts', ())) for d in details])
+            concept_codes.extend([concept_index.setdefault(c['title'], len(concept_index))
+                                  for d in details for c in d.get('concepts', ())])
+            
+    return QuestionTable(
+        groups=groups,
+        group=np.repeat(np.arange(len(groups), dtype=np.int64), group_sizes),
+        answered=np.array(answered, dtype=bool),
+        correct=np.array(correct, dtype=bool),
+        time_taken=np.array(time_taken, dtype=np.float64),
+        time_is_float=np.array([isinstance(t, float) for t in time_taken], dtype=bool),
+        # None becomes NaN
+        time_left=np.array(time_left, dtype=np.float64),
+        level=np.array(level, dtype=np.int8),
+        chapter_offsets=np.concatenate(([0], np.cumsum(chapter_counts, dtype=np.int64))),
+        chapter_codes=np.array(chapter_codes, dtype=np.int64),
+        chapter_names=list(chapter_index),
+        topic_offsets=np.concatenate(([0], np.cumsum(topic_counts, dtype=np.int64))),
+        topic_codes=np.array(topic_codes, dtype=np.int64),
+        topic_names=list(topic_index),
+        concept_offsets=np.concatenate(([0], np.cumsum(concept_counts, dtype=np.int64))),
+        concept_codes=np.array(concept_codes, dtype=np.int64),
+        concept_names=list(concept_index)
+    )
+
+
+def _label_breakdown(table: QuestionTable, offsets: np.ndarray, codes: np.ndarray,
+                     names: List[str]) -> List[Dict[str, Dict[str, int]]]:
+    """Per-group {label: {'total', 'correct'}} dicts in first-appearance order."""
+    breakdown = [{} for _ in range(table.num_groups)]
+    if len(codes) == 0:
+        return breakdown
+        
+    # Expand question-level columns to one row per (question, label)
+    counts = np.diff(offsets)
+    row_group = np.repeat(table.group, counts)
+    row_correct = np.repeat(table.correct, counts)
+    
+    keys = row_group * len(names) + codes
+    unique_keys, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    totals = np.bincount(inverse, minlength=len(unique_keys))
+    corrects = np.bincount(inverse, weights=row_correct, minlength=len(unique_keys))
+    
+    # Rows are already grouped in order, so first appearance gives dict order.
+    # Plain lists make the dict-building loop far cheaper than NumPy scalars.
+    order = np.argsort(first_index, kind='stable')
+    ordered_keys = unique_keys[order]
+    for group_index, code, total, correct in zip((ordered_keys // len(names)).tolist(),
+                                                 (ordered_keys % len(names)).tolist(),
+                                                 totals[order].tolist(),
+                                                 corrects[order].astype(np.int64).tolist()):
+        breakdown[group_index][names[code]] = {'total': total, 'correct': correct}
+    return breakdown
+
+
+@_gc_paused()
+def analyze_table(table: QuestionTable) -> List[Dict[str, Any]]:
+    """Compute DataProcessor._analyze_question_performance for every group at once."""
+    n = table.num_groups
+    g = table.group
+    
+    totals = np.bincount(g, minlength=n)
+    correct_answers = np.bincount(g, weights=table.answered & table.correct, minlength=n)
+    incorrect_answers = np.bincount(g, weights=table.answered & ~table.correct, minlength=n)
+    
+    time_total = np.bincount(g, weights=table.time_taken, minlength=n)
+    # Totals stay ints unless a group saw a float timeTaken, as in the Python engine
+    float_time = np.bincount(g, weights=table.time_is_float, minlength=n) > 0
+    bucket = np.where(table.time_taken < 30, 0, np.where(table.time_taken < 60, 1, 2))
+    buckets = np.bincount(g * 3 + bucket, minlength=n * 3).reshape(n, 3)
+    
+    level_key = g * len(LEVELS) + table.level
+    level_totals = np.bincount(level_key, minlength=n * len(LEVELS)).reshape(n, len(LEVELS))
+    level_correct = np.bincount(level_key, weights=table.correct,
+                                minlength=n * len(LEVELS)).reshape(n, len(LEVELS))
+    
+    chapter_wise = _label_breakdown(table, table.chapter_offsets, table.chapter_codes,
+                                    table.chapter_names)
+    topic_wise = _label_breakdown(table, table.topic_offsets, table.topic_codes,
+                                  table.topic_names)
+    
+    # Convert once up front; indexing NumPy arrays per group is slow
+    totals = totals.tolist()
+    correct_answers = correct_answers.astype(np.int64).tolist()
+    incorrect_answers = incorrect_answers.astype(np.int64).tolist()
+    time_total = time_total.tolist()
+    float_time = float_time.tolist()
+    buckets = buckets.tolist()
+    level_totals = level_totals.tolist()
+    level_correct = level_correct.astype(np.int64).tolist()
+    
+    results = []
+    for i in range(n):
+        total_questions = totals[i]
+        total_time = time_total[i] if float_time[i] else int(time_total[i])
+        quick, moderate, slow = buckets[i]
+        easy, medium, tough = level_totals[i]
+        easy_correct, medium_correct, tough_correct = level_correct[i]
+        results.append({
+            'total_questions': total_questions,
+            'correct_answers': correct_answers[i],
+            'incorrect_answers': incorrect_answers[i],
+            'unattempted': total_questions - correct_answers[i] - incorrect_answers[i],
+            'time_analysis': {
+                'total_time': total_time,
+                'avg_time_per_question': total_time / total_questions if total_questions > 0 else 0,
+                'time_distribution': {
+                    'quick': quick,
+                    'moderate': moderate,
+                    'slow': slow
+                }
+            },
+            'difficulty_analysis': {
+                'easy': {'total': easy, 'correct': easy_correct},
+                'medium': {'total': medium, 'correct': medium_correct},
+                'tough': {'total': tough, 'correct': tough_correct}
+            },
+            'chapter_wise': chapter_wise[i],
+            'topic_wise': topic_wise[i]
+        })
+    return results
+
+
+def section_wise_from_table(table: QuestionTable, count: int) -> List[Dict[str, Dict[str, Any]]]:
+    """The section_wise dict of process_data for each of the ``count`` submissions in ``table``."""
+    section_wise: List[Dict[str, Dict[str, Any]]] = [{} for _ in range(count)]
+    for (submission_index, title), analysis in zip(table.groups, analyze_table(table)):
+        section_wise[submission_index][title] = analysis
+    return section_wise
+
+
+def analyze_submissions(submissions: Iterable[Dict]) -> List[Dict[str, Dict[str, Any]]]:
+    """Return the section_wise dict of process_data for each submission."""
+    submissions = list(submissions)
+    return section_wise_from_table(build_question_table(submissions), len(submissions))
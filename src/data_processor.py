@@ -1,61 +1,173 @@
 import json
-from typing import Dict, List, Any
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional
 import re
-from bs4 import BeautifulSoup
-import google.generativeai as genai
+from src import metrics
+from src.columnar import (analyze_submissions, build_question_table, is_correct_answer,
+                          section_wise_from_table)
+from src.json_stream import iter_json_file
+from src.llm_async import estimate_tokens
+from src.llm_backends import INSIGHTS, LLMBackend, create_model
+from src.llm_cache import LLMCache, model_name, model_settings
+from src.pacing import analyze_pacing, pacing_for_submissions
+from src.prompt_builder import build_report_prompt
+from src.syllabus import parse_syllabus
+
+SUBJECT_NAMES = {
+    "607018ee404ae53194e73d92": "Physics",
+    "607018ee404ae53194e73d90": "Chemistry",
+    "607018ee404ae53194e73d91": "Mathematics"
+}
+
+# Submissions analysed together by the columnar engine in batch runs
+COLUMNAR_CHUNK = 256
+
+# Insights used when the Gemini call or its parsing fails
+DEFAULT_GEMINI_ANALYSIS = {
+    "strengths": ["Unable to analyze strengths at this time"],
+    "improvements": ["Unable to analyze areas for improvement at this time"],
+    "time_management": ["Unable to analyze time management at this time"],
+    "recommendations": ["Please review the raw performance data for insights"]
+}
+
+
+def load_submissions(json_path: str) -> List[Dict]:
+    """Load every submission from a JSON file holding a top-level array."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def stream_submissions(json_path: str) -> Iterator[Dict]:
+    """Yield submissions one at a time without loading the whole file."""
+    return iter_json_file(json_path)
+
 
 class DataProcessor:
-    def __init__(self, json_path: str, api_key: str):
+    def __init__(self, json_path: Optional[str], api_key: str,
+                 data: Optional[Dict] = None, model: Optional[LLMBackend] = None,
+                 engine: str = 'python',
+                 cache: Optional[LLMCache] = None, cohort=None,
+                 section_wise: Optional[Dict[str, Dict[str, Any]]] = None,
+                 prompt_budget: Optional[int] = None,
+                 pacing: Optional[Dict[str, Any]] = None):
+        if engine not in ('python', 'columnar'):
+            raise ValueError(f"Unknown analysis engine: {engine}")
         self.json_path = json_path
         self.api_key = api_key
-        self.data = self._load_json()
-        genai.configure(api_key=self.api_key)
-        # Try to use gemini-pro model first, fallback to gemini-2.0-flash if not available
-        try:
-            self.model = genai.GenerativeModel('gemini-pro')
-        except:
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
+        # 'columnar' computes section analysis with vectorized NumPy (src/columnar.py)
+        self.engine = engine
+        # Memoized pipeline stages, cleared whenever the submission changes
+        self._stages: Dict[str, Any] = {}
+        # A submission dict can be handed in directly (batch mode) instead of a path
+        self.data = data if data is not None else self._load_json()
+        # Precomputed section analysis, e.g. from the columnar table cache (src/table_cache.py),
+        # for submissions whose 'sections' were not loaded
+        if section_wise is not None:
+            self._stages['section_wise'] = section_wise
+        # Likewise a pacing report computed for a whole batch at once (src/pacing.py)
+        if pacing is not None:
+            self._stages['pacing'] = pacing
+        # Reuse a shared backend when one is provided so batch runs configure the client once;
+        # any LLMBackend works, e.g. TemplateBackend to run without the Gemini API
+        if model is None:
+            model = create_model(self.api_key)
+        self.model = model
+        # Optional on-disk cache of Gemini responses (src/llm_cache.py)
+        self.cache = cache if model.cacheable else None
+        # Optional CohortStats (src/cohort.py) to rank this submission against peers
+        self.cohort = cohort
+        # Estimated token limit of the feedback prompt (src/prompt_builder.py); None keeps every row
+        self.prompt_budget = prompt_budget
+        
+    @property
+    def data(self) -> Dict:
+        return self._data
+        
+    @data.setter
+    def data(self, value: Dict):
+        self._data = value
+        self.invalidate()
+        
+    def invalidate(self):
+        """Drop every memoized stage, e.g. after mutating ``data`` in place."""
+        self._stages.clear()
+        
+    def _stage(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Run a pipeline stage once per submission and reuse its result."""
+        if name not in self._stages:
+            self._stages[name] = compute()
+        return self._stages[name]
+        
+    @classmethod
+    def from_submissions(cls, submissions: Iterable[Dict], api_key: str,
+                         model: Optional[LLMBackend] = None,
+                         json_path: Optional[str] = None,
+                         engine: str = 'python',
+                         cache: Optional[LLMCache] = None,
+                         cohort=None,
+                         prompt_budget: Optional[int] = None) -> Iterator['DataProcessor']:
+        """Yield a processor per submission from any iterable, e.g. stream_submissions().
+
+        With the columnar engine, submissions are read in chunks of
+        COLUMNAR_CHUNK and each chunk is analysed as one table, since a table
+        per submission is slower than the plain Python engine.
+        """
+        if model is None:
+            model = create_model(api_key)
+        if engine == 'columnar':
+            yield from cls._from_chunks(submissions, api_key, model, json_path, cache, cohort,
+                                        prompt_budget)
+            return
+        for submission in submissions:
+            yield cls(json_path, api_key, data=submission, model=model, engine=engine,
+                      cache=cache, cohort=cohort, prompt_budget=prompt_budget)
+            
+    @classmethod
+    def _from_chunks(cls, submissions: Iterable[Dict], api_key: str, model: LLMBackend,
+                     json_path: Optional[str], cache: Optional[LLMCache], cohort,
+                     prompt_budget: Optional[int]) -> Iterator['DataProcessor']:
+        submissions = iter(submissions)
+        while True:
+            chunk = list(islice(submissions, COLUMNAR_CHUNK))
+            if not chunk:
+                return
+            try:
+                table = build_question_table(chunk)
+                with metrics.stage('section_analysis'):
+                    section_wise = section_wise_from_table(table, len(chunk))
+                with metrics.stage('pacing'):
+                    pacing = analyze_pacing(table, [s['test']['totalTime'] for s in chunk]).reports()
+            except Exception:
+                # One malformed submission fails the whole table; analyse this chunk one
+                # submission at a time so only that one fails, in process_data as with
+                # the python engine
+                for submission in chunk:
+                    yield cls(json_path, api_key, data=submission, model=model, engine='columnar',
+                              cache=cache, cohort=cohort, prompt_budget=prompt_budget)
+                continue
+            for submission, sections, report in zip(chunk, section_wise, pacing):
+                yield cls(json_path, api_key, data=submission, model=model, engine='columnar',
+                          cache=cache, cohort=cohort, section_wise=sections,
+                          prompt_budget=prompt_budget, pacing=report)
         
     def _load_json(self) -> Dict:
         """Load and parse the JSON file."""
-        with open(self.json_path, 'r', encoding='utf-8') as f:
+        with metrics.stage('load_json'), open(self.json_path, 'r', encoding='utf-8') as f:
             return json.load(f)[0]  # Assuming first item in array
             
     def _parse_syllabus(self) -> Dict[str, List[str]]:
-        """Parse the syllabus HTML into a structured format."""
-        soup = BeautifulSoup(self.data['test']['syllabus'], 'html.parser')
-        syllabus = {}
-        
-        # Extract subject sections
-        for subject in soup.find_all('h2'):
-            subject_name = subject.text.strip()
-            topics = [li.text.strip() for li in subject.find_next('ul').find_all('li')]
-            syllabus[subject_name] = topics
-            
-        return syllabus
+        """Parse the syllabus HTML into a structured format (cached per test, see src/syllabus.py)."""
+        with metrics.stage('syllabus'):
+            return parse_syllabus(self.data['test']['syllabus'])
         
     def _get_subject_name(self, subject_id: str) -> str:
         """Map subject ID to subject name."""
-        subject_map = {
-            "607018ee404ae53194e73d92": "Physics",
-            "607018ee404ae53194e73d90": "Chemistry",
-            "607018ee404ae53194e73d91": "Mathematics"
-        }
-        return subject_map.get(subject_id, "Unknown")
+        return SUBJECT_NAMES.get(subject_id, "Unknown")
         
     def _is_correct_answer(self, question: Dict) -> bool:
         """Check if the question was answered correctly."""
-        # Check marked options
-        if 'markedOptions' in question:
-            for option in question['markedOptions']:
-                if option.get('isCorrect', False):
-                    return True
-                    
-        # Check input value for numerical questions
-        if 'inputValue' in question and question['inputValue'] is not None:
-            return question['inputValue'].get('isCorrect', False)
-            
-        return False
+        return is_correct_answer(question)
         
     def _analyze_question_performance(self, questions: List[Dict]) -> Dict[str, Any]:
         """Analyze performance at question level."""
@@ -134,10 +246,10 @@ class DataProcessor:
             
         return analysis
         
-    def _parse_with_gemini(self, data: Dict) -> Dict:
-        """Use Gemini to parse and structure the JSON data."""
+    def _build_gemini_prompt(self, data: Dict) -> str:
+        """Prompt asking Gemini for structured insights."""
         # Create a more focused prompt that's easier for the model to handle
-        prompt = f"""Analyze this student test data and provide insights in a structured format.
+        return f"""Analyze this student test data and provide insights in a structured format.
         
         Test Data Summary:
         - Total Questions: {data['test_info']['total_questions']}
@@ -145,7 +257,7 @@ class DataProcessor:
         - Overall Accuracy: {data['overall_performance']['accuracy']}%
         
         Subject-wise Performance:
-        {json.dumps(data['subject_wise'], indent=2)}
+        {json.dumps(data['subject_wise'], separators=(',', ':'))}
         
         Please analyze this data and provide:
         1. Overall strengths (list 2-3 key strengths)
@@ -163,165 +275,174 @@ class DataProcessor:
         
         Keep each point concise and specific."""
         
+    def _cached_gemini_analysis(self, prompt: str) -> Optional[Dict]:
+        """Parsed insights from the response cache, if present."""
+        if not self.cache:
+            return None
+        raw_text = self.cache.get(model_name(self.model), prompt, model_settings(self.model))
+        return self._parse_gemini_response(raw_text) if raw_text is not None else None
+        
+    def _accept_gemini_response(self, prompt: str, raw_text: str) -> Dict:
+        """Parse a fresh response and cache it once it proved valid."""
+        analysis = self._parse_gemini_response(raw_text)
+        # Only responses that parsed are worth caching
+        if self.cache:
+            self.cache.put(model_name(self.model), prompt, raw_text, model_settings(self.model))
+        return analysis
+        
+    @staticmethod
+    def _parse_gemini_response(raw_text: str) -> Dict:
+        # Clean the response text to ensure it's valid JSON
+        response_text = raw_text.strip()
+        # Remove any markdown code block markers
+        response_text = re.sub(r'```json\s*|\s*```', '', response_text)
+        # Parse the cleaned response
+        return json.loads(response_text)
+        
+    @staticmethod
+    def _default_gemini_analysis(error: Exception) -> Dict:
+        print(f"Error in Gemini parsing: {str(error)}")
+        # Return a default structure if parsing fails
+        return {key: list(points) for key, points in DEFAULT_GEMINI_ANALYSIS.items()}
+        
+    def _parse_with_gemini(self, data: Dict) -> Dict:
+        """Use Gemini to parse and structure the JSON data."""
+        prompt = self._build_gemini_prompt(data)
         try:
-            response = self.model.generate_content(prompt)
-            # Clean the response text to ensure it's valid JSON
-            response_text = response.text.strip()
-            # Remove any markdown code block markers
-            response_text = re.sub(r'```json\s*|\s*```', '', response_text)
-            # Parse the cleaned response
-            analysis = json.loads(response_text)
+            with metrics.stage('llm_insights'):
+                analysis = self._cached_gemini_analysis(prompt)
+                if analysis is None:
+                    raw_text = self.model.generate(prompt, task=INSIGHTS, context=data)
+                    metrics.count_llm_call(estimate_tokens(prompt), estimate_tokens(raw_text))
+                    analysis = self._accept_gemini_response(prompt, raw_text)
             return analysis
         except Exception as e:
-            print(f"Error in Gemini parsing: {str(e)}")
-            # Return a default structure if parsing fails
-            return {
-                "strengths": ["Unable to analyze strengths at this time"],
-                "improvements": ["Unable to analyze areas for improvement at this time"],
-                "time_management": ["Unable to analyze time management at this time"],
-                "recommendations": ["Please review the raw performance data for insights"]
-            }
+            return self._default_gemini_analysis(e)
+            
+    async def _parse_with_gemini_async(self, data: Dict, dispatcher) -> Dict:
+        """Like _parse_with_gemini, but sent through an AsyncLLMDispatcher."""
+        prompt = self._build_gemini_prompt(data)
+        try:
+            with metrics.stage('llm_insights'):
+                analysis = self._cached_gemini_analysis(prompt)
+                if analysis is None:
+                    raw_text = await dispatcher.generate(prompt, model=self.model, task=INSIGHTS,
+                                                         context=data)
+                    analysis = self._accept_gemini_response(prompt, raw_text)
+            return analysis
+        except Exception as e:
+            return self._default_gemini_analysis(e)
 
-    def process_data(self) -> Dict[str, Any]:
-        """Process all data and return a structured format for the LLM."""
-        # First get the basic structured data
-        processed_data = {
-            'test_info': {
-                'total_time': self.data['test']['totalTime'],
-                'total_questions': self.data['test']['totalQuestions'],
-                'total_marks': self.data['test']['totalMarks'],
-                'syllabus': self._parse_syllabus()
-            },
-            'overall_performance': {
-                'total_time_taken': self.data['totalTimeTaken'],
-                'total_marks_scored': self.data['totalMarkScored'],
-                'total_attempted': self.data['totalAttempted'],
-                'total_correct': self.data['totalCorrect'],
-                'accuracy': self.data['accuracy']
-            },
-            'subject_wise': {},
-            'section_wise': {}
-        }
+    def get_syllabus(self) -> Dict[str, List[str]]:
+        """Parsed syllabus (memoized)."""
+        return self._stage('syllabus', self._parse_syllabus)
+        
+    def get_subject_wise(self) -> Dict[str, Dict[str, Any]]:
+        """Subject-wise performance (memoized)."""
+        return self._stage('subject_wise', self._process_subject_wise)
+        
+    def get_section_wise(self) -> Dict[str, Dict[str, Any]]:
+        """Section-wise question analysis (memoized)."""
+        return self._stage('section_wise', self._process_section_wise)
+        
+    def get_pacing(self) -> Dict[str, Any]:
+        """Accuracy and time per phase of the test, rushes and fatigue (memoized)."""
+        return self._stage('pacing', self._process_pacing)
         
-        # Process subject-wise data
+    def get_gemini_analysis(self) -> Dict[str, List[str]]:
+        """Gemini insights (memoized, so the model is only called once per submission)."""
+        return self._stage('gemini_analysis', lambda: self._parse_with_gemini(self._get_base_data()))
+        
+    def _process_subject_wise(self) -> Dict[str, Dict[str, Any]]:
+        subject_wise = {}
         for subject in self.data['subjects']:
             subject_name = self._get_subject_name(str(subject['subjectId']['$oid']))
-            processed_data['subject_wise'][subject_name] = {
+            subject_wise[subject_name] = {
                 'time_taken': subject['totalTimeTaken'],
                 'marks_scored': subject['totalMarkScored'],
                 'questions_attempted': subject['totalAttempted'],
                 'correct_answers': subject['totalCorrect'],
                 'accuracy': subject['accuracy']
             }
+        return subject_wise
+        
+    def _process_section_wise(self) -> Dict[str, Dict[str, Any]]:
+        with metrics.stage('section_analysis'):
+            return self._analyze_sections()
+            
+    def _analyze_sections(self) -> Dict[str, Dict[str, Any]]:
+        if self.engine == 'columnar':
+            return analyze_submissions([self.data])[0]
             
-        # Process section-wise data
+        section_wise = {}
         for section in self.data['sections']:
             section_name = section['sectionId']['title']
-            processed_data['section_wise'][section_name] = self._analyze_question_performance(section['questions'])
+            section_wise[section_name] = self._analyze_question_performance(section['questions'])
+        return section_wise
         
-        # Use Gemini to get deeper insights
-        gemini_analysis = self._parse_with_gemini(processed_data)
-        processed_data['gemini_analysis'] = gemini_analysis
+    def _process_pacing(self) -> Dict[str, Any]:
+        with metrics.stage('pacing'):
+            return pacing_for_submissions([self.data]).report(0)
             
-        return processed_data
+    def _get_base_data(self) -> Dict[str, Any]:
+        """Everything process_data returns except the Gemini insights."""
+        return self._stage('base', self._build_base_data)
         
-    def get_llm_prompt(self) -> str:
-        """Generate a comprehensive prompt for the LLM."""
-        data = self.process_data()
-        
-        prompt = f"""Generate a detailed student performance report based on the following test data:
-
-TEST OVERVIEW:
-- Total Duration: {data['test_info']['total_time']} minutes
-- Total Questions: {data['test_info']['total_questions']}
-- Total Marks: {data['test_info']['total_marks']}
-
-OVERALL PERFORMANCE:
-- Total Time Taken: {data['overall_performance']['total_time_taken']} seconds
-- Total Marks Scored: {data['overall_performance']['total_marks_scored']}
-- Questions Attempted: {data['overall_performance']['total_attempted']}
-- Correct Answers: {data['overall_performance']['total_correct']}
-- Overall Accuracy: {data['overall_performance']['accuracy']}%
-
-SUBJECT-WISE PERFORMANCE:
-"""
-        
-        # Add subject-wise performance
-        for subject, performance in data['subject_wise'].items():
-            prompt += f"""
-{subject}:
-- Time Taken: {performance['time_taken']} seconds
-- Marks Scored: {performance['marks_scored']}
-- Questions Attempted: {performance['questions_attempted']}
-- Correct Answers: {performance['correct_answers']}
-- Accuracy: {performance['accuracy']}%
-"""
-            
-        # Add section-wise analysis
-        prompt += "\nDETAILED SECTION ANALYSIS:\n"
-        for section, analysis in data['section_wise'].items():
-            prompt += f"""
-{section}:
-- Total Questions: {analysis['total_questions']}
-- Correct Answers: {analysis['correct_answers']}
-- Incorrect Answers: {analysis['incorrect_answers']}
-- Unattempted: {analysis['unattempted']}
-- Average Time per Question: {analysis['time_analysis']['avg_time_per_question']:.2f} seconds
+    def _build_base_data(self) -> Dict[str, Any]:
+        base_data = {
+            'test_info': {
+                'total_time': self.data['test']['totalTime'],
+                'total_questions': self.data['test']['totalQuestions'],
+                'total_marks': self.data['test']['totalMarks'],
+                'syllabus': self.get_syllabus()
+            },
+            'overall_performance': {
+                'total_time_taken': self.data['totalTimeTaken'],
+                'total_marks_scored': self.data['totalMarkScored'],
+                'total_attempted': self.data['totalAttempted'],
+                'total_correct': self.data['totalCorrect'],
+                'accuracy': self.data['accuracy']
+            },
+            'subject_wise': self.get_subject_wise(),
+            'section_wise': self.get_section_wise(),
+            'pacing': self.get_pacing()
+        }
+        if self.cohort is not None:
+            base_data['cohort_comparison'] = self.cohort.compare(self.data)
+        return base_data
 
-Difficulty-wise Performance:
-"""
-            
-            for difficulty, stats in analysis['difficulty_analysis'].items():
-                if stats['total'] > 0:
-                    accuracy = (stats['correct'] / stats['total']) * 100
-                    prompt += f"- {difficulty.capitalize()}: {stats['correct']}/{stats['total']} correct ({accuracy:.1f}%)\n"
-                    
-            prompt += "\nChapter-wise Performance:\n"
-            for chapter, stats in analysis['chapter_wise'].items():
-                if stats['total'] > 0:
-                    accuracy = (stats['correct'] / stats['total']) * 100
-                    prompt += f"- {chapter}: {stats['correct']}/{stats['total']} correct ({accuracy:.1f}%)\n"
-                    
-            prompt += "\nTopic-wise Performance:\n"
-            for topic, stats in analysis['topic_wise'].items():
-                if stats['total'] > 0:
-                    accuracy = (stats['correct'] / stats['total']) * 100
-                    prompt += f"- {topic}: {stats['correct']}/{stats['total']} correct ({accuracy:.1f}%)\n"
+    def process_data(self) -> Dict[str, Any]:
+        """Process all data and return a structured format for the LLM.
 
-        # Add Gemini's analysis
-        if 'gemini_analysis' in data:
-            prompt += "\nAI ANALYSIS AND RECOMMENDATIONS:\n"
-            gemini_data = data['gemini_analysis']
+        The result is computed once per submission and shared by later calls
+        (including get_llm_prompt), so treat it as read-only.
+        """
+        def build():
+            processed_data = dict(self._get_base_data())
+            # Use Gemini to get deeper insights
+            processed_data['gemini_analysis'] = self.get_gemini_analysis()
+            return processed_data
             
-            if 'strengths' in gemini_data:
-                prompt += "\nKey Strengths:\n"
-                for strength in gemini_data['strengths']:
-                    prompt += f"- {strength}\n"
-            
-            if 'improvements' in gemini_data:
-                prompt += "\nAreas for Improvement:\n"
-                for improvement in gemini_data['improvements']:
-                    prompt += f"- {improvement}\n"
-            
-            if 'time_management' in gemini_data:
-                prompt += "\nTime Management Analysis:\n"
-                for point in gemini_data['time_management']:
-                    prompt += f"- {point}\n"
-            
-            if 'recommendations' in gemini_data:
-                prompt += "\nRecommendations:\n"
-                for recommendation in gemini_data['recommendations']:
-                    prompt += f"- {recommendation}\n"
-                    
-        prompt += """
-Based on this data, generate a comprehensive performance report that:
-1. Provides an overall assessment of the student's performance
-2. Highlights strengths and areas for improvement
-3. Analyzes time management and question selection strategy
-4. Gives specific recommendations for improvement
-5. Maintains an encouraging and positive tone throughout
-
-Format the report with clear sections, bullet points, and bold headers for better readability.
-"""
+        return self._stage('processed', build)
+        
+    async def process_data_async(self, dispatcher) -> Dict[str, Any]:
+        """process_data with the Gemini call awaited on an AsyncLLMDispatcher."""
+        if 'gemini_analysis' not in self._stages:
+            self._stages['gemini_analysis'] = await self._parse_with_gemini_async(
+                self._get_base_data(), dispatcher)
+        return self.process_data()
         
+    def get_llm_prompt(self) -> str:
+        """Generate a comprehensive prompt for the LLM."""
+        return self._stage('prompt', self._build_llm_prompt)
+        
+    def _build_llm_prompt(self) -> str:
+        data = self.process_data()
+        with metrics.stage('prompt'):
+            prompt, self._stages['prompt_stats'] = build_report_prompt(data, self.prompt_budget)
         return prompt
+        
+    def get_prompt_stats(self) -> Dict[str, int]:
+        """Estimated prompt tokens before and after the budget, and rows dropped."""
+        self.get_llm_prompt()
+        return self._stages['prompt_stats']
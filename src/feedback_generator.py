@@ -1,16 +1,52 @@
-import google.generativeai as genai
+from src import metrics
+from src.llm_async import estimate_tokens
+from src.llm_backends import FEEDBACK, create_model
+from src.llm_cache import model_name, model_settings
 
-def generate_feedback(prompt, api_key):
-    """Generate feedback using the Gemini model."""
-    # Configure the API key
-    genai.configure(api_key=api_key)
-    
-    # Initialize the model
-    model = genai.GenerativeModel('gemini-2.0-flash')
+# Returned instead of raising when the feedback call fails
+FALLBACK_FEEDBACK = "Unable to generate feedback at this time. Please try again later."
+
+def generate_feedback(prompt, api_key, model=None, cache=None, context=None):
+    """Generate feedback using the Gemini model or any other LLMBackend.
+
+    ``context`` is the processed data behind the prompt, which rule-based
+    backends use instead of the prompt text. When an LLMCache is given,
+    identical prompts are answered from disk.
+    """
+    if model is None:
+        # Shared client: configured once per API key, model built once per name
+        model = create_model(api_key)
     
+    def call():
+        feedback = model.generate(prompt, task=FEEDBACK, context=context)
+        metrics.count_llm_call(estimate_tokens(prompt), estimate_tokens(feedback))
+        return feedback
+        
+    try:
+        with metrics.stage('llm_feedback'):
+            if cache is not None and model.cacheable:
+                return cache.cached_call(model_name(model), prompt, call, model_settings(model))
+            return call()
+    except Exception as e:
+        print(f"Error generating feedback: {str(e)}")
+        return FALLBACK_FEEDBACK
+
+async def generate_feedback_async(prompt, dispatcher, cache=None, model=None, context=None):
+    """Generate feedback through an AsyncLLMDispatcher (see src/llm_async.py)."""
+    model = model if model is not None else dispatcher.model
+    if not model.cacheable:
+        cache = None
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        with metrics.stage('llm_feedback'):
+            name = model_name(model)
+            settings = model_settings(model)
+            feedback = cache.get(name, prompt, settings) if cache is not None else None
+            if feedback is None:
+                feedback = await dispatcher.generate(prompt, model=model, task=FEEDBACK,
+                                                     context=context)
+                if cache is not None:
+                    cache.put(name, prompt, feedback, settings)
+        return feedback
     except Exception as e:
         print(f"Error generating feedback: {str(e)}")
-        return "Unable to generate feedback at this time. Please try again later."
+        return FALLBACK_FEEDBACK
@@ -0,0 +1,220 @@
+import html
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src import metrics
+from src.charts import chart_inputs, render_performance_charts
+from src.pdf_generator import BODY, BULLET, SECTION, create_pdf, parse_feedback
+
+# Lightweight report output: the process_data metrics as compact JSON and a
+# self-contained HTML page with inline SVG charts, written with string
+# formatting only. Neither matplotlib nor ReportLab is imported, so this is
+# much cheaper than the PDF path; the PDF can still be built later from the
+# JSON with pdf_from_json.
+
+# Bump whenever the HTML or JSON layout changes so build manifests rebuild existing reports
+HTML_VERSION = 1
+
+HTML_NAME = 'report.html'
+JSON_NAME = 'report.json'
+
+# Floats in the JSON are rounded to this many decimals
+JSON_DECIMALS = 2
+
+WIDTH, HEIGHT = 640, 340
+LEFT, RIGHT, TOP, BOTTOM = 56, 56, 48, 84
+
+# Same colours as the matplotlib charts
+BAR_COLOR = '#1f77b4'
+PACING_COLORS = {'': 'steelblue', 'rush': 'orange', 'fatigue': 'firebrick'}
+
+STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; max-width: 760px; margin: 2em auto;
+       padding: 0 1em; color: #222; line-height: 1.45; }
+h1 { color: #2E4053; text-align: center; }
+h2 { color: #2874A6; margin: 1.2em 0 0.4em; }
+p { margin: 0 0 0.4em; }
+p.bullet { padding-left: 1.2em; }
+.overview { text-align: center; color: #555; }
+figure { margin: 1.5em 0; }
+svg { width: 100%; height: auto; font-size: 12px; }
+"""
+
+
+def compact(value: Any) -> Any:
+    """``value`` with floats rounded and NaN/inf replaced by None, for small JSON."""
+    if isinstance(value, float):
+        return round(value, JSON_DECIMALS) if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact(item) for item in value]
+    return value
+
+
+def report_json(data: Dict[str, Any], feedback: str) -> str:
+    """process_data output and the feedback markdown as one line of compact JSON."""
+    report = {'version': HTML_VERSION, 'metrics': compact(data), 'feedback': feedback}
+    return json.dumps(report, ensure_ascii=False, separators=(',', ':'))
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and math.isfinite(value)
+
+
+def _nice_max(value: float) -> float:
+    """Smallest 1/2/2.5/5 x 10^n at or above ``value``, for round axis ticks."""
+    if value <= 0:
+        return 1.0
+    magnitude = 10 ** math.floor(math.log10(value))
+    return next(step * magnitude for step in (1, 2, 2.5, 5, 10) if step * magnitude >= value)
+
+
+def svg_chart(title: str, labels: Sequence[str], series: List[Tuple[str, Sequence, Any]],
+              y_label: str, y_max: Optional[float] = None, overlap: bool = False,
+              value_labels: bool = False, line: Optional[Tuple[str, Sequence]] = None) -> str:
+    """Bar chart as an inline SVG element.
+
+    ``series`` holds (name, values, colour) with one colour or one per bar;
+    with ``overlap`` the series are drawn on top of each other instead of side
+    by side. ``line`` is an optional (name, values) series on a right-hand axis.
+    Missing (None/NaN) values leave a gap.
+    """
+    plot_w = WIDTH - LEFT - RIGHT
+    plot_h = HEIGHT - TOP - BOTTOM
+    bottom = TOP + plot_h
+    slot = plot_w / max(len(labels), 1)
+    top = y_max or _nice_max(max((v for _, values, _ in series for v in values if _is_number(v)),
+                                 default=0))
+    bar_w = slot * 0.7 / (1 if overlap else len(series))
+    
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" '
+             f'role="img" aria-label="{html.escape(title)}">',
+             f'<text x="{WIDTH / 2}" y="20" text-anchor="middle" font-size="15" '
+             f'font-weight="bold">{html.escape(title)}</text>']
+    for i in range(5):
+        y = bottom - plot_h * i / 4
+        parts.append(f'<line x1="{LEFT}" y1="{y:.1f}" x2="{LEFT + plot_w}" y2="{y:.1f}" '
+                     f'stroke="#ddd"/><text x="{LEFT - 6}" y="{y + 4:.1f}" '
+                     f'text-anchor="end">{top * i / 4:g}</text>')
+    parts.append(f'<text transform="translate(14 {TOP + plot_h / 2}) rotate(-90)" '
+                 f'text-anchor="middle">{html.escape(y_label)}</text>')
+    
+    for n, (name, values, color) in enumerate(series):
+        for i, value in enumerate(values):
+            if not _is_number(value):
+                continue
+            x = LEFT + slot * i + slot * 0.15 + (0 if overlap else n * bar_w)
+            h = plot_h * min(max(value, 0), top) / top
+            fill = color[i] if isinstance(color, (list, tuple)) else color
+            parts.append(f'<rect x="{x:.1f}" y="{bottom - h:.1f}" width="{bar_w:.1f}" '
+                         f'height="{h:.1f}" fill="{fill}"><title>{html.escape(name)}: '
+                         f'{value:.1f}</title></rect>')
+            if value_labels:
+                parts.append(f'<text x="{x + bar_w / 2:.1f}" y="{bottom - h - 4:.1f}" '
+                             f'text-anchor="middle">{value:.1f}</text>')
+                
+    if line is not None:
+        name, values = line
+        line_top = _nice_max(max((v for v in values if _is_number(v)), default=0))
+        points = [(LEFT + slot * (i + 0.5), bottom - plot_h * value / line_top)
+                  for i, value in enumerate(values) if _is_number(value)]
+        parts.append('<polyline fill="none" stroke="black" stroke-width="1.5" points="'
+                     + ' '.join(f'{x:.1f},{y:.1f}' for x, y in points) + '"/>')
+        parts.extend(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3"/>' for x, y in points)
+        parts.append(f'<text x="{LEFT + plot_w + 6}" y="{TOP + 4}">{line_top:g}</text>'
+                     f'<text x="{LEFT + plot_w + 6}" y="{bottom + 4}">0</text>'
+                     f'<text transform="translate({WIDTH - 12} {TOP + plot_h / 2}) rotate(90)" '
+                     f'text-anchor="middle">{html.escape(name)}</text>')
+        
+    for i, label in enumerate(labels):
+        x = LEFT + slot * (i + 0.5)
+        parts.append(f'<text transform="translate({x:.1f} {bottom + 14}) rotate(-30)" '
+                     f'text-anchor="end">{html.escape(str(label))}</text>')
+    if len(series) > 1:
+        for n, (name, _, color) in enumerate(series):
+            x = LEFT + 8 + n * 150
+            parts.append(f'<rect x="{x}" y="30" width="10" height="10" fill="{color}"/>'
+                         f'<text x="{x + 14}" y="39">{html.escape(name)}</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def render_svg_charts(inputs: Dict[str, Any]) -> List[str]:
+    """The report charts as SVG strings; accepts process_data output or chart_inputs."""
+    with metrics.stage('svg_charts'):
+        inputs = inputs if 'subjects' in inputs else chart_inputs(inputs)
+        charts = [
+            svg_chart('Subject-wise Performance', inputs['subjects'],
+                      [('Accuracy', inputs['accuracies'], BAR_COLOR)], 'Accuracy (%)',
+                      y_max=100, value_labels=True),
+            svg_chart('Section-wise Performance', inputs['sections'],
+                      [('Total Questions', inputs['total'], 'lightgray'),
+                       ('Correct Answers', inputs['correct'], 'green')],
+                      'Number of Questions', overlap=True)
+        ]
+        if 'pacing' in inputs:
+            pacing = inputs['pacing']
+            charts.append(svg_chart('Pacing Through the Test', pacing['labels'],
+                                    [('Accuracy', pacing['accuracy'],
+                                      [PACING_COLORS[flag] for flag in pacing['flags']])],
+                                    'Accuracy (%)', y_max=100,
+                                    line=('Average Time per Answer (s)', pacing['avg_time'])))
+        if 'cohort' in inputs:
+            cohort = inputs['cohort']
+            charts.append(svg_chart('Chapter Accuracy vs. Cohort', cohort['chapters'],
+                                    [('Student', cohort['accuracy'], 'steelblue'),
+                                     ('Cohort Average', cohort['cohort_mean'], 'lightgray')],
+                                    'Accuracy (%)', y_max=100))
+        return charts
+
+
+def render_html(feedback: str, data: Dict[str, Any], charts: Optional[List[str]] = None,
+                title: str = "Student Performance Report") -> str:
+    """Self-contained HTML report: the feedback as parsed for the PDF, then the charts."""
+    # Escape first; parse_feedback's markers (*, **) and <b> tags survive untouched
+    body = []
+    for kind, markup in parse_feedback(html.escape(feedback, quote=False)):
+        if kind == SECTION:
+            body.append(f'<h2>{markup}</h2>')
+        elif kind == BULLET:
+            body.append(f'<p class="bullet">{markup}</p>')
+        elif kind == BODY:
+            body.append(f'<p>{markup}</p>')
+    overall = data['overall_performance']
+    test_info = data['test_info']
+    overview = (f"Score {overall['total_marks_scored']}/{test_info['total_marks']} · "
+                f"Accuracy {overall['accuracy']:.1f}% · "
+                f"Attempted {overall['total_attempted']}/{test_info['total_questions']}")
+    figures = [f'<figure>{chart}</figure>' for chart in (charts or render_svg_charts(data))]
+    return ''.join([
+        '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f'<title>{html.escape(title)}</title><style>{STYLE}</style></head><body>',
+        f'<h1>{html.escape(title)}</h1><p class="overview">{overview}</p>',
+        '\n'.join(body),
+        '\n'.join(figures),
+        '</body></html>\n'
+    ])
+
+
+def create_html(feedback: str, data: Dict[str, Any], output_path: str,
+                charts: Optional[List[str]] = None):
+    """Write the HTML report to ``output_path`` and its report.json next to it."""
+    with metrics.stage('html'):
+        page = render_html(feedback, data, charts)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(page)
+        with open(os.path.join(os.path.dirname(output_path), JSON_NAME), 'w', encoding='utf-8') as f:
+            f.write(report_json(data, feedback))
+
+
+def pdf_from_json(json_path: str, output_path: Optional[str] = None) -> str:
+    """Build the PDF of a report written in HTML mode from its report.json; returns its path."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    output_path = output_path or os.path.join(os.path.dirname(json_path), 'report.pdf')
+    create_pdf(report['feedback'], render_performance_charts(report['metrics']), output_path)
+    return output_path
@@ -0,0 +1,94 @@
+import json
+from typing import Any, Iterator, TextIO
+
+_WHITESPACE = ' \t\n\r'
+
+# A decode error further than this from the end of the buffer can't be fixed
+# by reading more (the longest token cut at the end is an escape or a literal)
+_TRUNCATION_SLACK = 16
+
+
+def _skip(buffer: str, pos: int, chars: str) -> int:
+    """Advance pos past any of the given characters."""
+    while pos < len(buffer) and buffer[pos] in chars:
+        pos += 1
+    return pos
+
+
+def _is_truncated(error: json.JSONDecodeError) -> bool:
+    """Whether a decode error may only mean the element continues past the buffer."""
+    return (error.msg.startswith('Unterminated string')
+            or error.pos >= len(error.doc) - _TRUNCATION_SLACK)
+
+
+def iter_json_array(f: TextIO, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """Incrementally decode the elements of a top-level JSON array.
+
+    Only the element currently being decoded is held in memory, so peak usage
+    is proportional to the largest element rather than the whole file. A
+    top-level object is yielded as a single element. A malformed element
+    (including an empty one, as in ``[1,,2]``) raises JSONDecodeError as soon
+    as it is read, without buffering the rest of the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    eof = not buffer
+    pos = _skip(buffer, 0, _WHITESPACE)
+    
+    # Make sure we can see the opening token
+    while pos >= len(buffer) and not eof:
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = _skip(buffer, 0, _WHITESPACE)
+    if pos >= len(buffer):
+        return
+        
+    if buffer[pos] != '[':
+        # Not an array: fall back to decoding the whole document
+        yield json.loads(buffer[pos:] + f.read())
+        return
+    pos += 1
+    first = True
+    
+    while True:
+        pos = _skip(buffer, pos, _WHITESPACE)
+        # Only an empty array may close right after the bracket; after a comma
+        # an element is required
+        if first and pos < len(buffer) and buffer[pos] == ']':
+            return
+            
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("Incomplete element", buffer, pos)
+            element, end = decoder.raw_decode(buffer, pos)
+            # The element is only complete once its delimiter is in view;
+            # otherwise a scalar such as a number may have been cut mid-chunk
+            after = _skip(buffer, end, _WHITESPACE)
+            if after >= len(buffer) or buffer[after] not in ',]':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, after)
+        except json.JSONDecodeError as e:
+            if eof or not _is_truncated(e):
+                raise
+            # Drop what has been consumed and pull in more of the file
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+            
+        yield element
+        if buffer[after] == ']':
+            return
+        pos = after + 1
+        first = False
+        # Release consumed text once it dominates the buffer
+        if pos > chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def iter_json_file(json_path: str, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """Stream the elements of the top-level array stored in a JSON file."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        yield from iter_json_array(f, chunk_size)
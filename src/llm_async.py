@@ -0,0 +1,169 @@
+import asyncio
+import random
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from src import metrics
+from src.metrics import Timings
+
+# A full bucket holds this many seconds of its rate, so requests can burst a
+# little after an idle spell but are otherwise spread evenly over the minute
+BURST_SECONDS = 1.0
+
+
+class TransientLLMError(Exception):
+    """A retryable LLM failure such as HTTP 429 or 503."""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting."""
+    return len(text) // 4 + 1
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an error from the model is worth retrying."""
+    if isinstance(error, (TransientLLMError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    # Gemini errors can only come from an already imported SDK; don't import it to check
+    google_exceptions = sys.modules.get('google.api_core.exceptions')
+    if google_exceptions is None:
+        return False
+    return isinstance(error, (google_exceptions.TooManyRequests,
+                              google_exceptions.ResourceExhausted,
+                              google_exceptions.ServiceUnavailable,
+                              google_exceptions.InternalServerError,
+                              google_exceptions.DeadlineExceeded))
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``rate_per_minute``.
+
+    It holds BURST_SECONDS of the rate (at least one token) unless ``capacity``
+    is given.
+    """
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        
+    async def acquire(self, amount: float = 1.0):
+        """Wait until ``amount`` tokens are available and take them."""
+        # Requests larger than the bucket wait for a full bucket and leave it in
+        # debt, so later requests pay for the excess
+        needed = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+                
+    def debit(self, amount: float):
+        """Charge tokens after the fact (e.g. response tokens); may go negative."""
+        self._refill()
+        self.tokens -= amount
+
+
+class AsyncLLMDispatcher:
+    """Keep several LLM requests in flight within rate budgets.
+
+    ``model`` is an LLMBackend (src/llm_backends.py); its ``agenerate`` is
+    awaited for each request. Transient errors are retried with full-jitter
+    exponential backoff. Latencies are kept per backend ``model_name``.
+    """
+    
+    def __init__(self, model, max_in_flight: int = 8,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._semaphore = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latencies = Timings()
+        self.model_latencies: Dict[str, Timings] = {}
+        
+    async def generate(self, prompt: str, model=None, **kwargs) -> str:
+        """Send one prompt, waiting for a free slot and rate budget.
+
+        ``model`` overrides the default backend while sharing the same budgets;
+        extra keyword arguments (task, context) are passed to the backend.
+        """
+        model = model if model is not None else self.model
+        # Created lazily so the semaphore binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        prompt_tokens = estimate_tokens(prompt)
+        
+        for attempt in range(self.max_retries + 1):
+            if self._requests:
+                await self._requests.acquire()
+            if self._tokens:
+                await self._tokens.acquire(prompt_tokens)
+                
+            async with self._semaphore:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                self.requests += 1
+                start = time.perf_counter()
+                try:
+                    text = await model.agenerate(prompt, **kwargs)
+                except Exception as e:
+                    if not is_transient(e) or attempt == self.max_retries:
+                        self.failures += 1
+                        raise
+                    error = e
+                else:
+                    elapsed = time.perf_counter() - start
+                    self.latencies.add(elapsed)
+                    name = getattr(model, 'model_name', type(model).__name__)
+                    self.model_latencies.setdefault(name, Timings()).add(elapsed)
+                    response_tokens = estimate_tokens(text)
+                    if self._tokens:
+                        self._tokens.debit(response_tokens)
+                    metrics.count_llm_call(prompt_tokens, response_tokens)
+                    return text
+                finally:
+                    self.in_flight -= 1
+                    
+            # Back off outside the semaphore so other requests can proceed
+            self.retries += 1
+            metrics.count('llm_retries')
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            retry_after = getattr(error, 'retry_after', None)
+            await asyncio.sleep(max(delay, retry_after or 0))
+            
+    def stats(self) -> Dict[str, Any]:
+        latencies = self.latencies.stats()
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'failures': self.failures,
+            'peak_in_flight': self.peak_in_flight,
+            'avg_latency': latencies['avg'],
+            'p95_latency': latencies['p95'],
+            'models': {name: timings.stats() for name, timings in self.model_latencies.items()}
+        }
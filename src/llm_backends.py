@@ -0,0 +1,302 @@
+import asyncio
+import functools
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src import llm_client
+from src.llm_async import TransientLLMError
+
+# Tasks the pipeline asks a backend to perform
+INSIGHTS = 'insights'  # JSON with strengths/improvements/time_management/recommendations
+FEEDBACK = 'feedback'  # Narrative markdown report
+
+
+class LLMBackend:
+    """Text generation backend used by DataProcessor and generate_feedback.
+
+    ``context`` is the processed data the prompt was built from; backends
+    that talk to a real model ignore it, rule-based ones work from it alone.
+    """
+    
+    model_name = 'base'
+    # Whether responses are worth storing in the on-disk LLMCache
+    cacheable = True
+    # Generation settings that change the responses; part of every LLMCache key
+    settings: Dict[str, Any] = {}
+    
+    def generate(self, prompt: str, task: str = FEEDBACK,
+                 context: Optional[Dict[str, Any]] = None) -> str:
+        raise NotImplementedError
+        
+    async def agenerate(self, prompt: str, task: str = FEEDBACK,
+                        context: Optional[Dict[str, Any]] = None) -> str:
+        """Async variant; by default runs generate() in a worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.generate, prompt, task, context))
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through the shared client in src/llm_client.py.
+
+    Every call's latency is recorded in llm_client.latency_stats().
+    ``generation_config`` (temperature, max_output_tokens, ...) is sent with
+    every request; without one the SDK defaults apply.
+    """
+    
+    def __init__(self, model, generation_config: Optional[Dict[str, Any]] = None):
+        self.model = model
+        self.model_name = model.model_name
+        self.settings = dict(generation_config or {})
+        
+    def generate(self, prompt, task=FEEDBACK, context=None):
+        with llm_client.timed_call(self.model_name):
+            return self.model.generate_content(prompt, generation_config=self.settings or None).text
+        
+    async def agenerate(self, prompt, task=FEEDBACK, context=None):
+        with llm_client.timed_call(self.model_name):
+            response = await self.model.generate_content_async(
+                prompt, generation_config=self.settings or None)
+        return response.text
+
+
+class FakeBackend(LLMBackend):
+    """Offline stand-in for Gemini in tests and benchmarks.
+
+    Simulates latency and rate-limit (429) failures and returns canned
+    responses for each task.
+    """
+    
+    cacheable = False
+    INSIGHTS_RESPONSE = {
+        "strengths": ["Consistent accuracy on easy questions"],
+        "improvements": ["Accuracy on tough questions"],
+        "time_management": ["Time spent per question varies widely between sections"],
+        "recommendations": ["Practise timed sets of tough questions"]
+    }
+    FEEDBACK_RESPONSE = (
+        "**Overall Assessment**\n"
+        "The student shows a solid foundation with room to grow.\n"
+        "**Recommendations**\n"
+        "* Review **tough** questions from weaker chapters\n"
+    )
+    
+    def __init__(self, latency: float = 0.5, jitter: float = 0.1,
+                 rate_limit_probability: float = 0.0, seed: Optional[int] = None,
+                 model_name: str = 'fake-model'):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.model_name = model_name
+        self.calls = 0
+        self._random = random.Random(seed)
+        
+    def _respond(self, task: str) -> str:
+        self.calls += 1
+        if self._random.random() < self.rate_limit_probability:
+            raise TransientLLMError("429 Resource has been exhausted (fake)")
+        if task == INSIGHTS:
+            return json.dumps(self.INSIGHTS_RESPONSE)
+        return self.FEEDBACK_RESPONSE
+        
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        
+    def generate(self, prompt, task=FEEDBACK, context=None):
+        time.sleep(self._delay())
+        return self._respond(task)
+        
+    async def agenerate(self, prompt, task=FEEDBACK, context=None):
+        await asyncio.sleep(self._delay())
+        return self._respond(task)
+
+
+def _accuracy(stats: Dict[str, int]) -> float:
+    return stats['correct'] / stats['total'] * 100 if stats['total'] else 0.0
+
+
+def _combine(section_wise: Dict[str, Dict], key: str) -> Dict[str, Dict[str, int]]:
+    """Sum {'total', 'correct'} counters for ``key`` across all sections."""
+    combined = {}
+    for analysis in section_wise.values():
+        for label, stats in analysis[key].items():
+            entry = combined.setdefault(label, {'total': 0, 'correct': 0})
+            entry['total'] += stats['total']
+            entry['correct'] += stats['correct']
+    return combined
+
+
+class TemplateBackend(LLMBackend):
+    """Deterministic rule-based backend that never calls a model.
+
+    Builds the insights JSON and the narrative report directly from the
+    processed metrics (weak chapters, slow answers, difficulty accuracy),
+    so reports render without an API key at local CPU speed.
+    """
+    
+    model_name = 'template'
+    cacheable = False
+    # Chapters need at least this many questions before they are judged
+    MIN_QUESTIONS = 2
+    
+    def generate(self, prompt, task=FEEDBACK, context=None):
+        if context is None:
+            raise ValueError("TemplateBackend needs the processed data as context")
+        if task == INSIGHTS:
+            return json.dumps(self.build_insights(context))
+        return self.build_feedback(context)
+        
+    async def agenerate(self, prompt, task=FEEDBACK, context=None):
+        # Pure CPU work measured in microseconds; no point in a thread hop
+        return self.generate(prompt, task, context)
+        
+    def _chapters(self, data: Dict) -> List[Tuple[str, Dict[str, int]]]:
+        """Chapters with enough questions to judge, weakest first."""
+        chapters = _combine(data['section_wise'], 'chapter_wise')
+        judged = [(name, stats) for name, stats in chapters.items()
+                  if stats['total'] >= self.MIN_QUESTIONS]
+        return sorted(judged, key=lambda item: (_accuracy(item[1]), -item[1]['total'], item[0]))
+        
+    @staticmethod
+    def _difficulty(data: Dict) -> Dict[str, Dict[str, int]]:
+        return _combine(data['section_wise'], 'difficulty_analysis')
+        
+    @staticmethod
+    def _time_stats(data: Dict) -> Dict[str, Any]:
+        section_wise = data['section_wise']
+        slowest = max(section_wise.items(),
+                      key=lambda item: item[1]['time_analysis']['avg_time_per_question'],
+                      default=None)
+        total = sum(a['total_questions'] for a in section_wise.values())
+        slow = sum(a['time_analysis']['time_distribution']['slow'] for a in section_wise.values())
+        return {
+            'total_questions': total,
+            'slow': slow,
+            'slow_share': slow / total if total else 0.0,
+            'unattempted': sum(a['unattempted'] for a in section_wise.values()),
+            'slowest_section': slowest
+        }
+        
+    def build_insights(self, data: Dict) -> Dict[str, List[str]]:
+        """Strengths, improvements, time management and recommendations."""
+        subjects = sorted(data['subject_wise'].items(), key=lambda item: item[1]['accuracy'])
+        chapters = self._chapters(data)
+        difficulty = self._difficulty(data)
+        timing = self._time_stats(data)
+        
+        strengths = []
+        if subjects:
+            name, stats = subjects[-1]
+            strengths.append(f"Strongest subject is {name} with {stats['accuracy']:.1f}% accuracy")
+        for name, stats in reversed(chapters[-2:]):
+            if _accuracy(stats) >= 70:
+                strengths.append(f"Solid grasp of {name} ({stats['correct']}/{stats['total']} correct)")
+        best_level = max(difficulty.items(), key=lambda item: _accuracy(item[1]), default=None)
+        if best_level and _accuracy(best_level[1]) > 0:
+            strengths.append(f"Handles {best_level[0]} questions best "
+                             f"({_accuracy(best_level[1]):.1f}% correct)")
+            
+        weak_chapters = [(name, stats) for name, stats in chapters if _accuracy(stats) < 50][:3]
+        improvements = []
+        if len(subjects) > 1:
+            name, stats = subjects[0]
+            improvements.append(f"{name} needs the most work at {stats['accuracy']:.1f}% accuracy")
+        for name, stats in weak_chapters:
+            improvements.append(f"{name}: only {stats['correct']}/{stats['total']} questions correct")
+        tough = difficulty.get('tough')
+        if tough and tough['total'] and _accuracy(tough) < 40:
+            improvements.append(f"Tough questions: {_accuracy(tough):.1f}% accuracy")
+            
+        time_management = []
+        overall = data['overall_performance']
+        if timing['total_questions']:
+            avg = overall['total_time_taken'] / timing['total_questions']
+            time_management.append(f"Averaged {avg:.0f} seconds per question overall")
+        if timing['slowest_section']:
+            section, analysis = timing['slowest_section']
+            time_management.append(f"{section} took the longest at "
+                                   f"{analysis['time_analysis']['avg_time_per_question']:.0f}s per question")
+        for segment in data.get('pacing', {}).get('segments', [])[:1]:
+            what = 'Answers were rushed' if segment['kind'] == 'rush' else 'Accuracy dropped'
+            time_management.append(f"{what} between minutes {segment['from_minute']:.0f} and "
+                                   f"{segment['to_minute']:.0f} ({segment['accuracy']:.0f}% correct)")
+        if timing['slow']:
+            time_management.append(f"{timing['slow']} questions took more than a minute")
+        if timing['unattempted']:
+            time_management.append(f"{timing['unattempted']} questions were left unattempted")
+            
+        recommendations = [f"Revise {name} and practise its standard question types"
+                           for name, _ in weak_chapters[:2]]
+        if timing['slow_share'] > 0.3:
+            recommendations.append("Practise timed question sets to bring more answers under a minute")
+        if tough and tough['total'] and _accuracy(tough) < 40:
+            recommendations.append("Work up to tough problems once medium-level accuracy is consistent")
+        if timing['unattempted']:
+            recommendations.append("Make a first pass through every section so no easy marks are left behind")
+        recommendations.append("Review every incorrect answer to find the underlying concept gap")
+        
+        return {
+            "strengths": strengths[:3] or [f"Attempted {overall['total_attempted']} questions"],
+            "improvements": improvements[:3] or ["Keep accuracy consistent across all chapters"],
+            "time_management": time_management[:3],
+            "recommendations": recommendations[:4]
+        }
+        
+    def build_feedback(self, data: Dict) -> str:
+        """Narrative markdown report in the format create_pdf understands."""
+        insights = data.get('gemini_analysis') or self.build_insights(data)
+        test_info = data['test_info']
+        overall = data['overall_performance']
+        
+        lines = [
+            "**Overall Assessment**",
+            f"The student scored {overall['total_marks_scored']} out of {test_info['total_marks']} "
+            f"marks, attempting {overall['total_attempted']} of {test_info['total_questions']} "
+            f"questions with an overall accuracy of {overall['accuracy']:.1f}%.",
+            "",
+            "**Subject-wise Performance**"
+        ]
+        for name, stats in data['subject_wise'].items():
+            lines.append(f"* **{name}**: {stats['accuracy']:.1f}% accuracy, {stats['marks_scored']} "
+                         f"marks, {stats['questions_attempted']} questions attempted")
+            
+        for title, key in (("Strengths", 'strengths'),
+                           ("Areas for Improvement", 'improvements'),
+                           ("Time Management", 'time_management'),
+                           ("Recommendations", 'recommendations')):
+            if insights.get(key):
+                lines.append("")
+                lines.append(f"**{title}**")
+                lines.extend(f"* {point}" for point in insights[key])
+                
+        lines.extend([
+            "",
+            "**Keep Going**",
+            "Every test is a chance to learn. Focus on the areas above one at a time "
+            "and the results will follow."
+        ])
+        return '\n'.join(lines)
+
+
+BACKENDS = ('gemini', 'template', 'fake')
+
+
+def create_model(api_key: Optional[str] = None, model_name: Optional[str] = None) -> GeminiBackend:
+    """Gemini backend over the shared, configured-once model client."""
+    return GeminiBackend(llm_client.get_model(model_name, api_key=api_key))
+
+
+def create_backends(name: str, api_key: Optional[str] = None,
+                    model_name: Optional[str] = None) -> Tuple[LLMBackend, LLMBackend]:
+    """Return the (analysis, feedback) backends for a backend name."""
+    if name == 'gemini':
+        backend = create_model(api_key, model_name)
+        return backend, backend
+    if name == 'template':
+        backend = TemplateBackend()
+        return backend, backend
+    if name == 'fake':
+        backend = FakeBackend(latency=0.0, jitter=0.0)
+        return backend, backend
+    raise ValueError(f"Unknown LLM backend: {name}")
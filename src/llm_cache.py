@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src import metrics
+
+
+class LLMCache:
+    """On-disk, content-addressed cache of LLM responses.
+
+    Entries are keyed by a SHA-256 of model name, prompt and generation
+    settings, stored one JSON file each, evicted least-recently-used once the
+    directory grows past ``max_bytes`` and ignored once older than ``ttl``
+    seconds. ``mode`` is 'use' (read and write), 'refresh' (skip reads but
+    store fresh responses) or 'bypass' (don't touch the cache at all).
+    """
+    
+    MODES = ('use', 'refresh', 'bypass')
+    
+    def __init__(self, cache_dir: str = '.llm_cache', max_bytes: int = 256 * 1024 * 1024,
+                 ttl: Optional[float] = 30 * 24 * 3600, mode: str = 'use'):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size = None  # Bytes on disk, computed lazily on first write
+        
+    @staticmethod
+    def make_key(model: str, prompt: str, settings: Optional[Dict[str, Any]] = None) -> str:
+        payload = json.dumps({'model': model, 'prompt': prompt, 'settings': settings or {}},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+        
+    def get(self, model: str, prompt: str, settings: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Return the cached response text, or None on a miss."""
+        if self.mode != 'use':
+            return None
+            
+        path = self._path(self.make_key(model, prompt, settings))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            metrics.count('llm_cache_misses')
+            return None
+            
+        if self.ttl is not None and time.time() - entry['created'] > self.ttl:
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            metrics.count('llm_cache_misses')
+            return None
+            
+        # Touch the file so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        metrics.count('llm_cache_hits')
+        return entry['text']
+        
+    def put(self, model: str, prompt: str, text: str,
+            settings: Optional[Dict[str, Any]] = None):
+        """Store a response, evicting old entries if the cache is over budget."""
+        if self.mode == 'bypass':
+            return
+            
+        path = self._path(self.make_key(model, prompt, settings))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({'model': model, 'created': time.time(), 'text': text},
+                          ensure_ascii=False).encode('utf-8')
+        
+        # Write atomically so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        
+        with self._lock:
+            self.writes += 1
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+                
+    def cached_call(self, model: str, prompt: str, generate: Callable[[], str],
+                    settings: Optional[Dict[str, Any]] = None) -> str:
+        """Return a cached response or call ``generate`` and store its result.
+
+        Exceptions from ``generate`` propagate and nothing is cached.
+        """
+        text = self.get(model, prompt, settings)
+        if text is None:
+            text = generate()
+            self.put(model, prompt, text, settings)
+        return text
+        
+    def clear(self):
+        """Delete every cached entry."""
+        with self._lock:
+            for path, _, _ in self._entries():
+                self._remove(path)
+            self._size = 0
+            
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+        
+    def _entries(self):
+        """Yield (path, size, last_used) for every entry on disk."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith('.json'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.path, st.st_size, st.st_mtime
+                    
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+        
+    def _evict(self):
+        """Remove least-recently-used entries until under 90% of the budget."""
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        size = sum(e[1] for e in entries)
+        for path, entry_size, _ in entries:
+            if size <= target:
+                break
+            if self._remove(path):
+                size -= entry_size
+                self.evictions += 1
+        self._size = size
+        
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+def model_name(model) -> str:
+    """Best-effort name of a model object for use in cache keys."""
+    return getattr(model, 'model_name', None) or type(model).__name__
+
+
+def model_settings(model) -> Dict[str, Any]:
+    """A model object's generation settings (temperature etc.) for use in cache keys."""
+    return getattr(model, 'settings', None) or {}
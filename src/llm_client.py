@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from src.metrics import Timings
+
+DEFAULT_MODEL = 'gemini-2.0-flash'
+
+# Process-wide client state. genai.configure() rebuilds its transport, so it is
+# only called again when the API key actually changes; models are cached per
+# name so every caller shares the same warm connection.
+_lock = threading.Lock()
+_configured_key: Optional[str] = None
+_default_model_name = os.getenv('GEMINI_MODEL', DEFAULT_MODEL)
+_models: Dict[str, Any] = {}
+_latencies: Dict[str, Timings] = {}
+
+
+def _genai():
+    # The SDK takes about a second to import, so only Gemini runs pay for it
+    import google.generativeai as genai
+    return genai
+
+
+def configure(api_key: Optional[str]):
+    """Configure the Gemini client once per API key."""
+    global _configured_key
+    with _lock:
+        if api_key != _configured_key:
+            _genai().configure(api_key=api_key)
+            _configured_key = api_key
+            # Models bound to the previous client must not be reused
+            _models.clear()
+
+
+def set_default_model(model_name: str):
+    """Choose the model used whenever callers don't ask for a specific one."""
+    global _default_model_name
+    with _lock:
+        _default_model_name = model_name
+
+
+def default_model_name() -> str:
+    return _default_model_name
+
+
+def get_model(model_name: Optional[str] = None, api_key: Optional[str] = None):
+    """Return the shared GenerativeModel for ``model_name`` (default model if None)."""
+    if api_key is not None and api_key != _configured_key:
+        configure(api_key)
+    name = model_name or _default_model_name
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            model = _models[name] = _genai().GenerativeModel(name)
+        return model
+
+
+@contextmanager
+def timed_call(model_name: str):
+    """Record the wall time of one model call under ``model_name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            timings = _latencies.get(model_name)
+            if timings is None:
+                timings = _latencies[model_name] = Timings()
+            timings.add(elapsed)
+
+
+def latency_stats() -> Dict[str, Dict[str, float]]:
+    """Per-model call count and latency summary in seconds (percentiles over recent calls)."""
+    with _lock:
+        snapshot = {name: timings.copy() for name, timings in _latencies.items()}
+    return {name: timings.stats() for name, timings in snapshot.items()}
+
+
+def reset_latency_stats():
+    with _lock:
+        _latencies.clear()
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from src.charts import CHARTS_VERSION
+from src.pdf_generator import RENDERER_VERSION
+from src.prompt_builder import ANALYSIS_VERSION
+
+
+def content_hash(value: Any) -> str:
+    """SHA-256 of a string or of any JSON-serializable value (key order ignored)."""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+    """Record of what each report in an output directory was built from.
+
+    Every entry holds hashes of the input submission (plus anything else the
+    report depends on, such as the cohort), the model names, the analysis
+    and renderer versions and the prompt that was sent. A re-run skips a
+    report whose inputs, models and versions match its entry and whose
+    output file still exists; the prompt hash is only kept for inspection,
+    as the prompt isn't known until the report has been analysed.
+    """
+    
+    FILENAME = '.manifest.json'
+    
+    def __init__(self, output_dir: str, force: bool = False, filename: Optional[str] = None):
+        # Writers that run side by side (e.g. shard workers) each keep their own file
+        self.path = os.path.join(output_dir, filename or self.FILENAME)
+        # force: rebuild everything, but still record the new entries
+        self.force = force
+        self.rebuilt = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries: Dict[str, Dict[str, str]] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+            
+    @staticmethod
+    def fingerprint(submission: Dict, analysis_model: str, feedback_model: str,
+                    extra: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """Everything known about a report before any work is done on it."""
+        return {
+            'input': content_hash({'submission': submission, 'extra': extra or {}}),
+            'analysis_model': analysis_model,
+            'feedback_model': feedback_model,
+            'analysis': str(ANALYSIS_VERSION),
+            'renderer': f'{CHARTS_VERSION}/{RENDERER_VERSION}'
+        }
+        
+    def is_current(self, report_id: str, fingerprint: Dict[str, str], output_path: str) -> bool:
+        """True if the report can be skipped; counts it as skipped."""
+        if self.force:
+            return False
+        entry = self.entries.get(report_id)
+        if entry is None or not os.path.exists(output_path):
+            return False
+        if any(entry.get(key) != value for key, value in fingerprint.items()):
+            return False
+        with self._lock:
+            self.skipped += 1
+        return True
+        
+    def record(self, report_id: str, fingerprint: Dict[str, str], prompt: str, output_path: str):
+        with self._lock:
+            self.entries[report_id] = dict(fingerprint, prompt=content_hash(prompt),
+                                           output=os.path.basename(output_path))
+            self.rebuilt += 1
+            
+    def save(self):
+        """Write the manifest atomically next to the reports."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            
+    def stats(self) -> Dict[str, int]:
+        return {'rebuilt': self.rebuilt, 'skipped': self.skipped}
@@ -0,0 +1,218 @@
+import contextvars
+import json
+import math
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Stage timers and counters for one process. Every timing goes into the
+# process-wide totals; while a report is active (see ``report``) it is also
+# charged to that report, so a batch can export one JSON line per report and
+# an aggregated summary at the end. The active report is a context variable,
+# so concurrent asyncio tasks each see their own. Work done in worker
+# processes (chart or PDF pools) is not visible here.
+
+# Percentiles come from this many most recent timings of each stage, so a
+# long-running process (the report service) keeps a fixed amount of them
+TIMING_WINDOW = 10000
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank ``q``th percentile (0-100) of already sorted values; 0.0 when empty."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered) / 100) - 1))]
+
+
+class Timings:
+    """Exact call count, total and max of a stream of durations, plus a recent window."""
+    
+    def __init__(self, window: int = TIMING_WINDOW):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+        
+    def add(self, seconds: float):
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+        
+    def copy(self) -> 'Timings':
+        copy = Timings(self.recent.maxlen)
+        copy.calls, copy.total, copy.max = self.calls, self.total, self.max
+        copy.recent.extend(self.recent)
+        return copy
+        
+    def stats(self) -> Dict[str, float]:
+        """calls, total, avg and max over every timing; p50/p95 over the recent window."""
+        recent = sorted(self.recent)
+        return {
+            'calls': self.calls,
+            'total': self.total,
+            'avg': self.total / self.calls if self.calls else 0.0,
+            'p50': percentile(recent, 50),
+            'p95': percentile(recent, 95),
+            'max': self.max
+        }
+
+
+_lock = threading.Lock()
+_stage_times: Dict[str, Timings] = {}
+_counters: Dict[str, int] = {}
+_current: contextvars.ContextVar = contextvars.ContextVar('report_metrics', default=None)
+
+
+class ReportMetrics:
+    """Stage seconds and counters charged to one report."""
+    
+    def __init__(self, report_id: str):
+        self.report_id = report_id
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.peak_rss_mb: Optional[float] = None
+        self._start = time.perf_counter()
+        self.elapsed = 0.0
+        
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'report_id': self.report_id,
+            'elapsed': round(self.elapsed, 6),
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            'counters': dict(self.counters),
+            'peak_rss_mb': self.peak_rss_mb
+        }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as stage ``name`` (nested stages are each counted in full)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            timings = _stage_times.get(name)
+            if timings is None:
+                timings = _stage_times[name] = Timings()
+            timings.add(elapsed)
+        current = _current.get()
+        if current is not None:
+            current.stages[name] = current.stages.get(name, 0.0) + elapsed
+
+
+def count(name: str, amount: int = 1):
+    """Add to counter ``name``, e.g. llm_calls or cache_hits."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+    current = _current.get()
+    if current is not None:
+        current.counters[name] = current.counters.get(name, 0) + amount
+
+
+def count_llm_call(prompt_tokens: int, response_tokens: int):
+    """Record one completed LLM call with its estimated token counts."""
+    count('llm_calls')
+    count('llm_prompt_tokens', prompt_tokens)
+    count('llm_response_tokens', response_tokens)
+
+
+@contextmanager
+def use(report_metrics: ReportMetrics):
+    """Charge stages and counters inside the block to ``report_metrics``."""
+    token = _current.set(report_metrics)
+    try:
+        yield report_metrics
+    finally:
+        _current.reset(token)
+        report_metrics.elapsed = time.perf_counter() - report_metrics._start
+        report_metrics.peak_rss_mb = peak_rss_mb()
+
+
+def report(report_id: str):
+    """Start collecting metrics for a new report; use as ``with report(id) as m:``."""
+    return use(ReportMetrics(report_id))
+
+
+def summary() -> Dict[str, Any]:
+    """Process-wide per-stage timing summary (seconds), counters and peak memory."""
+    with _lock:
+        snapshot = {name: timings.copy() for name, timings in _stage_times.items()}
+        counters = dict(_counters)
+    # Sort outside the lock so recording stages isn't held up
+    stages = {name: timings.stats() for name, timings in snapshot.items()}
+    return {'stages': stages, 'counters': counters, 'peak_rss_mb': peak_rss_mb()}
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine summary() results of several processes (e.g. shard workers).
+
+    Calls, totals and counters add up; p95 becomes the largest of the parts'
+    p95s, an upper bound since the raw timings are gone.
+    """
+    stages: Dict[str, Dict[str, float]] = {}
+    counters: Dict[str, int] = {}
+    peaks = []
+    for part in summaries:
+        for name, stats in part['stages'].items():
+            merged = stages.setdefault(name, {'calls': 0, 'total': 0.0, 'p95': 0.0, 'max': 0.0})
+            merged['calls'] += stats['calls']
+            merged['total'] += stats['total']
+            merged['p95'] = max(merged['p95'], stats['p95'])
+            merged['max'] = max(merged['max'], stats['max'])
+        for name, value in part['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+        if part.get('peak_rss_mb') is not None:
+            peaks.append(part['peak_rss_mb'])
+    for merged in stages.values():
+        merged['avg'] = merged['total'] / merged['calls'] if merged['calls'] else 0.0
+    return {'stages': stages, 'counters': counters, 'peak_rss_mb': max(peaks, default=None)}
+
+
+def reset():
+    with _lock:
+        _stage_times.clear()
+        _counters.clear()
+
+
+class MetricsWriter:
+    """Append one JSON line per report to ``path``."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        
+    def write(self, report_metrics: ReportMetrics):
+        line = json.dumps(report_metrics.to_dict(), separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            
+    def close(self):
+        self._file.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
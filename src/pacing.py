@@ -0,0 +1,224 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.columnar import LEVELS, QuestionTable, build_question_table
+
+# Pacing analytics rebuilt from each question's timeLeftWhenAttempted (minutes
+# left on the test clock). Every student's working span, from the start of the
+# test to their last timed attempt, is cut into PHASES equal slices; accuracy
+# and seconds per answer are tallied per slice with one bincount over the whole
+# question table, so a 100k-submission batch costs a few array passes.
+
+PHASES = 6
+
+# A phase is a rush when answers take under this share of the student's usual time
+# and come out less accurate than usual
+RUSH_TIME_RATIO = 0.5
+
+# A phase shows fatigue when accuracy falls this many percentage points below usual
+FATIGUE_DROP = 25.0
+
+# Phases with fewer answers than this are never flagged
+MIN_PHASE_ANSWERS = 5
+
+RUSH, FATIGUE = 'rush', 'fatigue'
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    """numerator / denominator * scale, NaN where the denominator is zero."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, numerator / denominator * scale, np.nan)
+
+
+def _float(value) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class PacingStats:
+    """Per-submission pacing columns (one row per submission).
+    
+    ``phase_*`` arrays are submissions x PHASES; ``level_time`` is
+    submissions x LEVELS mean seconds per answered question (NaN where a
+    student answered none of a level).
+    """
+    
+    def __init__(self, span: np.ndarray, phase_answered: np.ndarray, phase_correct: np.ndarray,
+                 phase_time: np.ndarray, wrong_time: np.ndarray, unanswered_time: np.ndarray,
+                 time_taken: np.ndarray, level_time: np.ndarray, untimed: np.ndarray):
+        # Minutes from the start of the test to the last timed attempt
+        self.span = span
+        self.phase_answered = phase_answered
+        self.phase_correct = phase_correct
+        self.phase_time = phase_time
+        self.wrong_time = wrong_time
+        self.unanswered_time = unanswered_time
+        self.time_taken = time_taken
+        self.level_time = level_time
+        # Questions without timeLeftWhenAttempted, left out of the phases
+        self.untimed = untimed
+        
+    def __len__(self) -> int:
+        return len(self.span)
+        
+    @property
+    def phase_accuracy(self) -> np.ndarray:
+        return _ratio(self.phase_correct, self.phase_answered, 100)
+        
+    @property
+    def phase_avg_time(self) -> np.ndarray:
+        return _ratio(self.phase_time, self.phase_answered)
+        
+    @property
+    def accuracy(self) -> np.ndarray:
+        return _ratio(self.phase_correct.sum(axis=1), self.phase_answered.sum(axis=1), 100)
+        
+    @property
+    def avg_time(self) -> np.ndarray:
+        return _ratio(self.phase_time.sum(axis=1), self.phase_answered.sum(axis=1))
+        
+    def flags(self) -> np.ndarray:
+        """Submissions x PHASES of '', RUSH or FATIGUE; only the second half is flagged."""
+        accuracy = self.phase_accuracy
+        baseline = self.accuracy[:, None]
+        eligible = (self.phase_answered >= MIN_PHASE_ANSWERS) & (np.arange(PHASES) >= PHASES // 2)
+        with np.errstate(invalid='ignore'):
+            rush = (eligible & (accuracy < baseline)
+                    & (self.phase_avg_time < RUSH_TIME_RATIO * self.avg_time[:, None]))
+            fatigue = eligible & ~rush & (accuracy < baseline - FATIGUE_DROP)
+        flags = np.full(accuracy.shape, '', dtype=object)
+        flags[rush] = RUSH
+        flags[fatigue] = FATIGUE
+        return flags
+        
+    def report(self, i: int, flags: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Pacing of submission ``i`` as plain Python values (``flags`` row may be precomputed)."""
+        if flags is None:
+            flags = self.flags()[i]
+        span = float(self.span[i])
+        answered = self.phase_answered[i].tolist()
+        correct = self.phase_correct[i].tolist()
+        seconds = self.phase_time[i].tolist()
+        phases = []
+        for k in range(PHASES):
+            phases.append({
+                'from_minute': span * k / PHASES,
+                'to_minute': span * (k + 1) / PHASES,
+                'answered': answered[k],
+                'correct': correct[k],
+                'accuracy': correct[k] / answered[k] * 100 if answered[k] else None,
+                'avg_time': seconds[k] / answered[k] if answered[k] else None,
+                'flag': flags[k] or None
+            })
+            
+        # Runs of equally flagged phases become one segment
+        segments: List[Dict[str, Any]] = []
+        for k, phase in enumerate(phases):
+            if not phase['flag']:
+                continue
+            previous = segments[-1] if segments else None
+            if previous and previous['kind'] == phase['flag'] and previous['last_phase'] == k - 1:
+                previous['to_minute'] = phase['to_minute']
+                previous['answered'] += answered[k]
+                previous['correct'] += correct[k]
+                previous['seconds'] += seconds[k]
+                previous['last_phase'] = k
+            else:
+                segments.append({'kind': phase['flag'], 'from_minute': phase['from_minute'],
+                                 'to_minute': phase['to_minute'], 'answered': answered[k],
+                                 'correct': correct[k], 'seconds': seconds[k], 'last_phase': k})
+        for segment in segments:
+            del segment['last_phase']
+            segment['accuracy'] = segment['correct'] / segment['answered'] * 100
+            segment['avg_time'] = segment.pop('seconds') / segment['answered']
+            
+        total_answered = sum(answered)
+        time_taken = float(self.time_taken[i])
+        wrong_time = float(self.wrong_time[i])
+        return {
+            'span_minutes': span,
+            'accuracy': sum(correct) / total_answered * 100 if total_answered else None,
+            'avg_time': sum(seconds) / total_answered if total_answered else None,
+            'phases': phases,
+            'segments': segments,
+            'wrong_answer_time': wrong_time,
+            'wrong_answer_share': wrong_time / time_taken * 100 if time_taken else 0.0,
+            'unanswered_time': float(self.unanswered_time[i]),
+            'level_times': {level: _float(value)
+                            for level, value in zip(LEVELS, self.level_time[i].tolist())},
+            'untimed_questions': int(self.untimed[i])
+        }
+        
+    def reports(self) -> List[Dict[str, Any]]:
+        """report() for every submission, flagging all of them in one pass."""
+        flags = self.flags()
+        return [self.report(i, flags[i]) for i in range(len(self))]
+        
+    def summary(self) -> Dict[str, Any]:
+        """Batch-wide accuracy per phase and how often each pattern shows up."""
+        flags = self.flags()
+        students = max(len(self), 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            wrong_share = self.wrong_time / self.time_taken * 100
+        return {
+            'students': len(self),
+            'phase_accuracy': _ratio(self.phase_correct.sum(axis=0),
+                                     self.phase_answered.sum(axis=0), 100).tolist(),
+            'rush_share': float((flags == RUSH).any(axis=1).sum() / students * 100),
+            'fatigue_share': float((flags == FATIGUE).any(axis=1).sum() / students * 100),
+            'median_wrong_answer_share': _float(np.nanmedian(wrong_share)) if len(self) else None,
+            'median_level_times': {level: _float(np.nanmedian(self.level_time[:, k]))
+                                   if np.any(~np.isnan(self.level_time[:, k])) else None
+                                   for k, level in enumerate(LEVELS)}
+        }
+
+
+def analyze_pacing(table: QuestionTable, total_times: Sequence[float]) -> PacingStats:
+    """PacingStats for every submission of ``table``; ``total_times`` is each test's length in minutes."""
+    n = len(total_times)
+    submission = np.array([submission_index for submission_index, _ in table.groups],
+                          dtype=np.int64)[table.group]
+    answered = table.answered
+    correct = answered & table.correct
+    seconds = table.time_taken
+    
+    # Minutes into the test at each attempt; the span is the latest of them
+    timed = ~np.isnan(table.time_left)
+    elapsed = np.asarray(total_times, dtype=np.float64)[submission] - table.time_left
+    elapsed = np.clip(np.where(timed, elapsed, 0.0), 0.0, None)
+    span = np.zeros(n)
+    np.maximum.at(span, submission[timed], elapsed[timed])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        phase = np.nan_to_num(elapsed / span[submission] * PHASES).astype(np.int64)
+    phase = np.minimum(phase, PHASES - 1)
+    
+    key = submission * PHASES + phase
+    size = n * PHASES
+    counted = timed & answered
+    phase_answered = np.bincount(key, weights=counted, minlength=size).reshape(n, PHASES)
+    phase_correct = np.bincount(key, weights=counted & correct, minlength=size).reshape(n, PHASES)
+    phase_time = np.bincount(key, weights=seconds * counted, minlength=size).reshape(n, PHASES)
+    
+    level_key = submission * len(LEVELS) + table.level
+    level_size = n * len(LEVELS)
+    level_count = np.bincount(level_key, weights=answered, minlength=level_size)
+    level_seconds = np.bincount(level_key, weights=seconds * answered, minlength=level_size)
+    
+    return PacingStats(
+        span=span,
+        phase_answered=phase_answered.astype(np.int32),
+        phase_correct=phase_correct.astype(np.int32),
+        phase_time=phase_time,
+        wrong_time=np.bincount(submission, weights=seconds * (answered & ~correct), minlength=n),
+        unanswered_time=np.bincount(submission, weights=seconds * ~answered, minlength=n),
+        time_taken=np.bincount(submission, weights=seconds, minlength=n),
+        level_time=_ratio(level_seconds, level_count).reshape(n, len(LEVELS)),
+        untimed=np.bincount(submission, weights=~timed, minlength=n).astype(np.int32)
+    )
+
+
+def pacing_for_submissions(submissions: Iterable[Dict]) -> PacingStats:
+    """PacingStats straight from submission dicts."""
+    submissions = list(submissions)
+    return analyze_pacing(build_question_table(submissions),
+                          [submission['test']['totalTime'] for submission in submissions])
@@ -1,23 +1,73 @@
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+import os
 import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from typing import Callable, List, Optional, Tuple
 
-def create_pdf(feedback, chart_paths, output_path):
-    # Create the PDF document
-    doc = SimpleDocTemplate(
-        output_path,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-
-    # Create styles
+from src import metrics
+
+# Compiled once; feedback lines are split on bold markers (and bullets)
+_BULLET_PARTS = re.compile(r'(\*\*.*?\*\*|\*)')
+_BOLD_PARTS = re.compile(r'(\*\*.*?\*\*)')
+
+# Block kinds produced by parse_feedback
+SPACER = 'spacer'
+SECTION = 'section'
+BULLET = 'bullet'
+BODY = 'body'
+
+# ReportLab is imported by the first renderer, not with this module, so code
+# that only needs parse_feedback (or never builds a PDF) starts faster.
+
+# Bump whenever the PDF layout changes so build manifests rebuild existing reports
+RENDERER_VERSION = 1
+
+
+def _format_parts(parts: List[str]) -> str:
+    formatted_parts = []
+    for part in parts:
+        if part.startswith('**') and part.endswith('**'):
+            # Bold text
+            formatted_parts.append(f'<b>{part[2:-2]}</b>')
+        elif part == '*':
+            # Bullet point
+            formatted_parts.append('•')
+        else:
+            # Regular text
+            formatted_parts.append(part)
+    return ' '.join(formatted_parts)
+
+
+def parse_feedback(feedback: str) -> List[Tuple[str, str]]:
+    """Split the feedback markdown into (kind, markup) blocks.
+
+    Section headers are lines wrapped in ``**``, bullets start with ``*`` and
+    bold spans become ``<b>`` tags; blank lines become spacers.
+    """
+    blocks = []
+    for line in feedback.split('\n'):
+        line = line.strip()
+        if not line:
+            blocks.append((SPACER, ''))
+        elif line.startswith('**') and line.endswith('**'):
+            # Handle section headers (text between **)
+            blocks.append((SECTION, line[2:-2]))
+        elif line.startswith('*'):
+            # Handle bullet points and bold text in the same line
+            blocks.append((BULLET, _format_parts(_BULLET_PARTS.split(line))))
+        else:
+            # Handle regular text with potential bold sections
+            blocks.append((BODY, _format_parts(_BOLD_PARTS.split(line))))
+    return blocks
+
+
+def _build_styles():
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
     styles = getSampleStyleSheet()
     
     # Create custom styles with unique names
@@ -56,75 +106,156 @@ def create_pdf(feedback, chart_paths, output_path):
         leading=14
     ))
 
-    # Process the feedback text
-    story = []
-    
-    # Add title
-    story.append(Paragraph("Student Performance Report", styles['ReportTitle']))
-    story.append(Spacer(1, 20))
+    return styles
+
 
-    # Process the feedback text
-    lines = feedback.split('\n')
-    current_section = None
+class ReportRenderer:
+    """Reusable PDF report template: styles are built once per renderer."""
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            story.append(Spacer(1, 6))
-            continue
-
-        # Handle section headers (text between **)
-        if line.startswith('**') and line.endswith('**'):
-            header_text = line[2:-2]  # Remove **
-            story.append(Paragraph(header_text, styles['ReportSection']))
-            current_section = header_text
-            continue
-
-        # Handle bullet points and bold text in the same line
-        if line.startswith('*'):
-            # Split the line into parts based on bold markers and bullet points
-            parts = re.split(r'(\*\*.*?\*\*|\*)', line)
-            formatted_parts = []
-            
-            for part in parts:
-                if part.startswith('**') and part.endswith('**'):
-                    # Bold text
-                    text = part[2:-2]
-                    formatted_parts.append(f'<b>{text}</b>')
-                elif part == '*':
-                    # Bullet point
-                    formatted_parts.append('•')
-                else:
-                    # Regular text
-                    formatted_parts.append(part)
-            
-            # Join the parts and create the paragraph
-            text = ' '.join(formatted_parts)
-            story.append(Paragraph(text, styles['ReportBullet']))
-        else:
-            # Handle regular text with potential bold sections
-            parts = re.split(r'(\*\*.*?\*\*)', line)
-            formatted_parts = []
-            
-            for part in parts:
-                if part.startswith('**') and part.endswith('**'):
-                    # Bold text
-                    text = part[2:-2]
-                    formatted_parts.append(f'<b>{text}</b>')
-                else:
-                    # Regular text
-                    formatted_parts.append(part)
-            
-            # Join the parts and create the paragraph
-            text = ' '.join(formatted_parts)
-            story.append(Paragraph(text, styles['ReportBody']))
-
-    # Add charts
-    story.append(Spacer(1, 20))
-    for chart in chart_paths:
-        img = Image(chart, width=6*inch, height=4*inch)
-        story.append(img)
+    BLOCK_STYLES = {SECTION: 'ReportSection', BULLET: 'ReportBullet', BODY: 'ReportBody'}
+    
+    def __init__(self, title: str = "Student Performance Report"):
+        self.title = title
+        self.styles = _build_styles()
+        
+    def build_story(self, feedback: str, charts) -> list:
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Image, Paragraph, Spacer
+        
+        story = []
+        
+        # Add title
+        story.append(Paragraph(self.title, self.styles['ReportTitle']))
         story.append(Spacer(1, 20))
+        
+        # Process the feedback text
+        for kind, markup in parse_feedback(feedback):
+            if kind == SPACER:
+                story.append(Spacer(1, 6))
+            else:
+                story.append(Paragraph(markup, self.styles[self.BLOCK_STYLES[kind]]))
+                
+        # Add charts
+        story.append(Spacer(1, 20))
+        for chart in charts:
+            # Charts may be file paths, file-like objects or raw PNG bytes
+            if isinstance(chart, bytes):
+                chart = BytesIO(chart)
+            img = Image(chart, width=6*inch, height=4*inch)
+            story.append(img)
+            story.append(Spacer(1, 20))
+        return story
+        
+    def render(self, feedback: str, charts, output_path) -> float:
+        """Build one PDF and return the seconds it took."""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate
+        
+        start = time.perf_counter()
+        # Create the PDF document
+        doc = SimpleDocTemplate(
+            output_path,
+            pagesize=letter,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=72
+        )
+        # Build the PDF
+        doc.build(self.build_story(feedback, charts))
+        return time.perf_counter() - start
+
+
+_default_renderer: Optional[ReportRenderer] = None
+
+
+def get_renderer() -> ReportRenderer:
+    """The process-wide renderer shared by create_pdf and worker processes."""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = ReportRenderer()
+    return _default_renderer
+
+
+def create_pdf(feedback, chart_paths, output_path):
+    with metrics.stage('pdf'):
+        return get_renderer().render(feedback, chart_paths, output_path)
+
+
+class ParallelPDFRenderer:
+    """Build PDFs across worker processes with a bounded queue of pending jobs.
+
+    ``submit`` blocks once ``max_pending`` builds are queued, so producers
+    can't run arbitrarily far ahead of ReportLab layout. Each worker keeps its
+    own ReportRenderer for its whole lifetime.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = threading.BoundedSemaphore(max_pending or self.workers * 2)
+        self._lock = threading.Lock()
+        self.timings: List[float] = []
+        self.failed = 0
+        self._start = time.perf_counter()
+        
+    def submit(self, feedback: str, charts, output_path: str,
+               on_built: Optional[Callable[[], None]] = None) -> Future:
+        """Queue one PDF; ``on_built`` is called once it has been written successfully."""
+        # Paths and file objects can't cross processes reliably; send bytes
+        charts = [chart if isinstance(chart, bytes) else _read_chart(chart) for chart in charts]
+        self._slots.acquire()
+        future = self._pool.submit(create_pdf, feedback, charts, output_path)
+        future.add_done_callback(lambda f, path=output_path: self._done(f, path, on_built))
+        return future
+        
+    def _done(self, future: Future, output_path: str, on_built: Optional[Callable[[], None]]):
+        self._slots.release()
+        with self._lock:
+            if future.exception() is not None:
+                self.failed += 1
+                print(f"Error building {output_path}: {future.exception()}")
+                return
+            self.timings.append(future.result())
+        if on_built is not None:
+            try:
+                on_built()
+            except Exception as e:
+                print(f"Error after building {output_path}: {str(e)}")
+                
+    def close(self):
+        """Wait for every queued PDF and shut the workers down."""
+        self._pool.shutdown(wait=True)
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+        
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self._start
+        timings = sorted(self.timings)
+        return {
+            'pdfs': len(timings),
+            'failed': self.failed,
+            'workers': self.workers,
+            'avg_seconds_per_pdf': sum(timings) / len(timings) if timings else 0.0,
+            'p95_seconds_per_pdf': metrics.percentile(timings, 95),
+            'pdfs_per_second': len(timings) / elapsed if elapsed > 0 else 0.0
+        }
+
+
+def _read_chart(chart) -> bytes:
+    if hasattr(chart, 'read'):
+        return chart.read()
+    with open(chart, 'rb') as f:
+        return f.read()
+
 
-    # Build the PDF
-    doc.build(story)
+def render_pdfs(jobs, workers: Optional[int] = None, max_pending: Optional[int] = None) -> dict:
+    """Build many (feedback, charts, output_path) jobs in parallel; returns stats."""
+    with ParallelPDFRenderer(workers, max_pending) as renderer:
+        for feedback, charts, output_path in jobs:
+            renderer.submit(feedback, charts, output_path)
+    return renderer.stats()
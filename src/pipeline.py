@@ -0,0 +1,322 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src import metrics
+from src.batch import (_add_prompt_stats, _summarize, expand_inputs, is_complete, iter_processors,
+                       report_fingerprint, report_path, submission_id)
+from src.charts import chart_inputs, render_performance_charts
+from src.cohort import CohortStats
+from src.feedback_generator import generate_feedback
+from src.html_report import create_html, render_svg_charts
+from src.llm_backends import LLMBackend, create_backends
+from src.llm_cache import LLMCache
+from src.manifest import BuildManifest
+from src.metrics import MetricsWriter
+from src.pdf_generator import create_pdf
+
+# A batch run as a chain of stages joined by bounded queues:
+#
+#   load -> analyze -> feedback -> charts -> pdf
+#
+# load reads submissions and skips unchanged reports; analyze runs
+# process_data (including the insights LLM call); feedback builds the prompt
+# and waits for the narrative; charts and pdf hand their work to process pools
+# (in HTML mode both run in-thread, as SVG charts and an HTML page are cheap).
+# Every stage has its own worker count, and a worker blocks when the queue in
+# front of the next stage is full, so a slow stage throttles everything
+# upstream of it, down to ingestion, instead of letting finished work pile up
+# in memory. Queue depths are sampled while the run goes on; the stage whose
+# workers are busiest is the bottleneck.
+
+# Between samples of the queue depths
+SAMPLE_SECONDS = 0.05
+
+# Put once per downstream worker when a stage has drained
+_DONE = object()
+
+
+class Job:
+    """One report on its way through the pipeline."""
+    
+    def __init__(self, path: str, index: int, report_id: str, processor, output_path: str,
+                 fingerprint: Dict[str, str]):
+        self.path = path
+        self.index = index
+        self.report_id = report_id
+        self.processor = processor
+        self.output_path = output_path
+        self.fingerprint = fingerprint
+        self.data: Optional[Dict[str, Any]] = None
+        self.prompt: Optional[str] = None
+        self.feedback: Optional[str] = None
+        self.charts: Optional[List[bytes]] = None
+        self.complete = False
+        self.metrics = metrics.ReportMetrics(report_id)
+
+
+class Stage:
+    """A pool of threads taking jobs from ``inbox`` and passing them to ``outbox``."""
+    
+    def __init__(self, name: str, workers: int, handle: Callable[[Job], None], queue_size: int):
+        self.name = name
+        self.workers = workers
+        self.handle = handle
+        self.inbox: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.outbox: Optional[queue.Queue] = None
+        self.downstream_workers = 0
+        self.processed = 0
+        self.failed = 0
+        # Seconds summed over workers: running jobs, waiting for one, waiting to hand one on
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self._lock = threading.Lock()
+        self._running = 0
+        self._threads: List[threading.Thread] = []
+        
+    def start(self):
+        self._running = self.workers
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'{self.name}-{n}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            
+    def alive(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+        
+    def sample(self):
+        depth = self.inbox.qsize()
+        self.depth_samples += 1
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+        
+    def _worker(self):
+        busy = idle = blocked = 0.0
+        while True:
+            start = time.perf_counter()
+            job = self.inbox.get()
+            idle += time.perf_counter() - start
+            if job is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                with metrics.use(job.metrics):
+                    self.handle(job)
+                ok = True
+            except Exception as e:
+                print(f"Error processing submission {job.index} of {job.path}: {str(e)}")
+                ok = False
+            busy += time.perf_counter() - start
+            with self._lock:
+                if ok:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+            if ok and self.outbox is not None:
+                start = time.perf_counter()
+                self.outbox.put(job)
+                blocked += time.perf_counter() - start
+                
+        with self._lock:
+            self.busy += busy
+            self.idle += idle
+            self.blocked += blocked
+            self._running -= 1
+            last = self._running == 0
+        # The last worker out tells every downstream worker to stop
+        if last and self.outbox is not None:
+            for _ in range(self.downstream_workers):
+                self.outbox.put(_DONE)
+                
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        capacity = self.workers * elapsed
+        return {
+            'workers': self.workers,
+            'processed': self.processed,
+            'failed': self.failed,
+            'per_second': self.processed / elapsed if elapsed > 0 else 0.0,
+            'busy_seconds': self.busy,
+            'blocked_seconds': self.blocked,
+            'utilization': self.busy / capacity if capacity > 0 else 0.0,
+            'queue_max': self.depth_max,
+            'queue_avg': self.depth_total / self.depth_samples if self.depth_samples else 0.0
+        }
+
+
+def print_pipeline_stats(pipeline: Dict[str, Any]):
+    for name, stage in pipeline['stages'].items():
+        print(f"Pipeline {name}: {stage['workers']} workers, {stage['processed']} done "
+              f"({stage['per_second']:.2f}/sec), {stage['utilization']:.0%} busy, "
+              f"{stage['blocked_seconds']:.1f}s blocked downstream, "
+              f"queue avg {stage['queue_avg']:.1f} max {stage['queue_max']}")
+    print(f"Bottleneck: {pipeline['bottleneck'] or 'none'} (queue size {pipeline['queue_size']})")
+
+
+def run_pipeline(inputs: List[str], api_key: Optional[str], output_dir: str = 'output',
+                 engine: str = 'python', cache: Optional[LLMCache] = None,
+                 backend: str = 'gemini', llm_workers: int = 4, chart_workers: int = 0,
+                 pdf_workers: int = 0, queue_size: int = 8,
+                 analysis_model: Optional[LLMBackend] = None,
+                 feedback_model: Optional[LLMBackend] = None,
+                 cohort: Optional[CohortStats] = None, table_cache_dir: Optional[str] = None,
+                 force: bool = False, prompt_budget: Optional[int] = None,
+                 metrics_writer: Optional[MetricsWriter] = None,
+                 progress: Optional[float] = None,
+                 output_format: str = 'pdf') -> Dict[str, Any]:
+    """Like run_batch, but with every stage running concurrently behind bounded queues.
+
+    ``llm_workers`` threads each run the analyze and feedback stages. With
+    ``chart_workers`` / ``pdf_workers`` > 0 that many threads feed a process
+    pool of the same size; at 0 the stage runs in one thread of this
+    process. At most ``queue_size`` jobs wait in front of each stage. With
+    ``progress``, queue depths and counts are printed every that many seconds.
+    With ``output_format`` 'html' the last stage is called html instead of pdf.
+    """
+    paths = expand_inputs(inputs)
+    
+    if analysis_model is None or feedback_model is None:
+        default_analysis, default_feedback = create_backends(backend, api_key)
+        analysis_model = analysis_model or default_analysis
+        feedback_model = feedback_model or default_feedback
+    if not feedback_model.cacheable:
+        cache = None
+    html = output_format == 'html'
+    if html:
+        chart_workers = pdf_workers = 0
+    chart_pool = ProcessPoolExecutor(chart_workers) if chart_workers else None
+    pdf_pool = ProcessPoolExecutor(pdf_workers) if pdf_workers else None
+    manifest = BuildManifest(output_dir, force=force)
+    prompt_totals: Dict[str, int] = {}
+    lock = threading.Lock()
+    
+    def analyze(job: Job):
+        job.data = job.processor.process_data()
+        
+    def feedback(job: Job):
+        job.prompt = job.processor.get_llm_prompt()
+        with lock:
+            _add_prompt_stats(prompt_totals, job.processor.get_prompt_stats())
+        job.feedback = generate_feedback(job.prompt, api_key, model=feedback_model, cache=cache,
+                                         context=job.data)
+        job.complete = is_complete(job.data, job.feedback)
+        job.processor = None
+        
+    def charts(job: Job):
+        if html:
+            # The HTML page still needs the data for report.json
+            job.charts = render_svg_charts(job.data)
+            return
+        if chart_pool:
+            job.charts = chart_pool.submit(render_performance_charts, chart_inputs(job.data)).result()
+        else:
+            job.charts = render_performance_charts(job.data)
+        job.data = None
+        
+    def write(job: Job):
+        os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+        if html:
+            create_html(job.feedback, job.data, job.output_path, job.charts)
+        elif pdf_pool:
+            pdf_pool.submit(create_pdf, job.feedback, job.charts, job.output_path).result()
+        else:
+            create_pdf(job.feedback, job.charts, job.output_path)
+        job.data = job.charts = None
+        if metrics_writer:
+            metrics_writer.write(job.metrics)
+        if job.complete:
+            manifest.record(job.report_id, job.fingerprint, job.prompt, job.output_path)
+            
+    stages = [
+        Stage('analyze', llm_workers, analyze, queue_size),
+        Stage('feedback', llm_workers, feedback, queue_size),
+        Stage('charts', chart_workers or 1, charts, queue_size),
+        Stage(output_format, pdf_workers or 1, write, queue_size)
+    ]
+    for stage, following in zip(stages, stages[1:]):
+        stage.outbox = following.inbox
+        stage.downstream_workers = following.workers
+        
+    loaded = 0
+    load_blocked = load_seconds = 0.0
+    load_error: List[Exception] = []
+    
+    def load():
+        nonlocal loaded, load_blocked, load_seconds
+        inbox = stages[0].inbox
+        load_start = time.perf_counter()
+        try:
+            processors = iter_processors(paths, api_key, analysis_model, engine=engine, cache=cache,
+                                         cohort=cohort, table_cache_dir=table_cache_dir,
+                                         prompt_budget=prompt_budget)
+            for path, index, processor in processors:
+                report_id = submission_id(processor.data, path, index)
+                output_path = report_path(output_dir, report_id, output_format)
+                fingerprint = report_fingerprint(processor.data, analysis_model, feedback_model,
+                                                 cohort, prompt_budget, output_format)
+                if manifest.is_current(report_id, fingerprint, output_path):
+                    continue
+                start = time.perf_counter()
+                # Blocks while analyze is behind: this is where backpressure reaches ingestion
+                inbox.put(Job(path, index, report_id, processor, output_path, fingerprint))
+                load_blocked += time.perf_counter() - start
+                loaded += 1
+        except Exception as e:
+            load_error.append(e)
+        finally:
+            load_seconds = time.perf_counter() - load_start
+            for _ in range(stages[0].workers):
+                inbox.put(_DONE)
+                
+    start = time.perf_counter()
+    for stage in stages:
+        stage.start()
+    loader = threading.Thread(target=load, name='load', daemon=True)
+    loader.start()
+    try:
+        last_progress = start
+        while loader.is_alive() or any(stage.alive() for stage in stages):
+            time.sleep(SAMPLE_SECONDS)
+            for stage in stages:
+                stage.sample()
+            if progress and time.perf_counter() - last_progress >= progress:
+                last_progress = time.perf_counter()
+                queues = ', '.join(f"{stage.name} {stage.inbox.qsize()}/{queue_size}"
+                                   for stage in stages)
+                print(f"[{last_progress - start:.0f}s] loaded {loaded}, built {stages[-1].processed}; "
+                      f"queued: {queues}")
+    finally:
+        if chart_pool:
+            chart_pool.shutdown(cancel_futures=True)
+        if pdf_pool:
+            pdf_pool.shutdown(cancel_futures=True)
+        # Keep what was built even if the run is interrupted
+        manifest.save()
+    elapsed = time.perf_counter() - start
+    if load_error:
+        raise load_error[0]
+        
+    failed = sum(stage.failed for stage in stages)
+    stats = _summarize(paths, stages[-1].processed, failed, elapsed, cache, manifest=manifest,
+                       prompt_totals=prompt_totals)
+    load_busy = load_seconds - load_blocked
+    stage_stats = {'load': {'workers': 1, 'processed': loaded, 'failed': 0,
+                            'per_second': loaded / elapsed if elapsed > 0 else 0.0,
+                            'busy_seconds': load_busy, 'blocked_seconds': load_blocked,
+                            'utilization': load_busy / elapsed if elapsed > 0 else 0.0,
+                            'queue_max': 0, 'queue_avg': 0.0}}
+    stage_stats.update((stage.name, stage.stats(elapsed)) for stage in stages)
+    busiest = max(stages, key=lambda stage: stage.busy / stage.workers)
+    stats['pipeline'] = {
+        'queue_size': queue_size,
+        'stages': stage_stats,
+        'bottleneck': busiest.name if busiest.busy > 0 else None
+    }
+    print_pipeline_stats(stats['pipeline'])
+    return stats
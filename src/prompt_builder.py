@@ -0,0 +1,271 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.llm_async import estimate_tokens
+
+# Bump whenever the analysis, the prompt or the feedback instructions change so
+# build manifests rebuild existing reports
+ANALYSIS_VERSION = 1
+
+# A prompt is assembled from rows: (text, score). Rows scored None are always
+# kept; the rest are optional detail that is dropped, lowest score first, when
+# the prompt would exceed its token budget. Headers of optional rows (scored
+# HEADER) go with the last of their rows. Prompts without a budget join the
+# same rows, so an unlimited budget reproduces them exactly.
+Row = Tuple[str, Optional[float]]
+HEADER = -math.inf
+
+# Tokens set aside for the note saying rows were omitted
+NOTE_TOKENS = 16
+
+# Share of a section's questions in the slow (>60s) bucket that is worth flagging
+SLOW_SHARE = 0.3
+
+CLOSING = """
+Based on this data, generate a comprehensive performance report that:
+1. Provides an overall assessment of the student's performance
+2. Highlights strengths and areas for improvement
+3. Analyzes time management and question selection strategy
+4. Gives specific recommendations for improvement
+5. Maintains an encouraging and positive tone throughout
+
+Format the report with clear sections, bullet points, and bold headers for better readability.
+"""
+
+
+def _accuracy(stats: Dict[str, int]) -> float:
+    return (stats['correct'] / stats['total']) * 100
+
+
+def _label_rows(breakdown: Dict[str, Dict[str, int]], baseline: float, weight: float) -> List[Row]:
+    """Chapter or topic rows scored by how far they sit from the section's accuracy.
+    
+    The weakest and strongest labels with the most questions score highest.
+    """
+    rows = []
+    for label, stats in breakdown.items():
+        if stats['total'] > 0:
+            accuracy = _accuracy(stats)
+            rows.append((f"- {label}: {stats['correct']}/{stats['total']} correct ({accuracy:.1f}%)\n",
+                         weight * abs(accuracy - baseline) * math.sqrt(stats['total'])))
+    return rows
+
+
+def _time_rows(analysis: Dict[str, Any]) -> List[Row]:
+    """A time distribution row for sections where many questions ran slow."""
+    total = analysis['total_questions']
+    distribution = analysis['time_analysis']['time_distribution']
+    if total == 0 or distribution['slow'] / total < SLOW_SHARE:
+        return []
+    return [(f"- Time Distribution: {distribution['quick']} quick (<30s), "
+             f"{distribution['moderate']} moderate, {distribution['slow']} slow (>60s)\n",
+             100 * distribution['slow'] / total)]
+
+
+def _section_rows(section: str, analysis: Dict[str, Any]) -> List[Row]:
+    rows: List[Row] = [(f"""
+{section}:
+- Total Questions: {analysis['total_questions']}
+- Correct Answers: {analysis['correct_answers']}
+- Incorrect Answers: {analysis['incorrect_answers']}
+- Unattempted: {analysis['unattempted']}
+- Average Time per Question: {analysis['time_analysis']['avg_time_per_question']:.2f} seconds
+""", None)]
+    rows.extend(_time_rows(analysis))
+    rows.append(("\nDifficulty-wise Performance:\n", None))
+    
+    for difficulty, stats in analysis['difficulty_analysis'].items():
+        if stats['total'] > 0:
+            rows.append((f"- {difficulty.capitalize()}: {stats['correct']}/{stats['total']} correct "
+                         f"({_accuracy(stats):.1f}%)\n", None))
+    
+    total = analysis['total_questions']
+    baseline = analysis['correct_answers'] / total * 100 if total else 0.0
+    rows.append(("\nChapter-wise Performance:\n", HEADER))
+    rows.extend(_label_rows(analysis['chapter_wise'], baseline, 1.0))
+    rows.append(("\nTopic-wise Performance:\n", HEADER))
+    # Topics repeat what their chapter says at a finer grain, so rank them a bit lower
+    rows.extend(_label_rows(analysis['topic_wise'], baseline, 0.8))
+    return rows
+
+
+def _pacing_rows(pacing: Dict[str, Any]) -> List[Row]:
+    """Pacing summary, flagged segments and per-phase detail (see src/pacing.py)."""
+    if pacing['accuracy'] is None:
+        return []
+    rows: List[Row] = [
+        (f"\nPACING ({pacing['span_minutes']:.0f} minutes from start to last attempt"
+         + (f"; {pacing['untimed_questions']} questions without timing left out"
+            if pacing['untimed_questions'] else '') + "):\n", None),
+        (f"- Accuracy {pacing['accuracy']:.1f}%, {pacing['avg_time']:.0f}s per answer on average\n", None),
+        (f"- Time on Wrong Answers: {pacing['wrong_answer_time']:.0f}s "
+         f"({pacing['wrong_answer_share']:.1f}% of time taken); "
+         f"on unanswered questions: {pacing['unanswered_time']:.0f}s\n", None)
+    ]
+    level_times = [f"{level} {seconds:.0f}s" for level, seconds in pacing['level_times'].items()
+                   if seconds is not None]
+    rows.append((f"- Time per Answer by Difficulty: {', '.join(level_times)}\n", None))
+    for segment in pacing['segments']:
+        kind = 'Rushed answers' if segment['kind'] == 'rush' else 'Fatigue'
+        rows.append((f"- {kind} from minute {segment['from_minute']:.0f} to {segment['to_minute']:.0f}: "
+                     f"{segment['correct']}/{segment['answered']} correct ({segment['accuracy']:.1f}%), "
+                     f"{segment['avg_time']:.0f}s per answer\n", None))
+    
+    rows.append(("\nAccuracy by Phase of the Test:\n", HEADER))
+    for phase in pacing['phases']:
+        if phase['answered']:
+            rows.append((f"- Minutes {phase['from_minute']:.0f}-{phase['to_minute']:.0f}: "
+                         f"{phase['correct']}/{phase['answered']} correct ({phase['accuracy']:.1f}%), "
+                         f"{phase['avg_time']:.0f}s per answer\n",
+                         abs(phase['accuracy'] - pacing['accuracy']) * math.sqrt(phase['answered'])))
+    return rows
+
+
+def _cohort_rows(cohort: Dict[str, Any]) -> List[Row]:
+    total = cohort['total_marks']
+    rows: List[Row] = [
+        (f"\nCOHORT COMPARISON ({cohort['students']} students):\n", None),
+        (f"- Total Marks: {total['score']} (percentile {total['percentile']:.1f}, "
+         f"cohort median {total['median']:.1f})\n", None)
+    ]
+    for subject, stats in cohort['subjects'].items():
+        rows.append((f"- {subject}: {stats['score']} marks (percentile {stats['percentile']:.1f}, "
+                     f"cohort median {stats['median']:.1f})\n", None))
+    
+    rows.append(("\nChapter Accuracy vs Cohort:\n", HEADER))
+    for chapter, stats in cohort['chapters'].items():
+        if 'cohort_mean' in stats:
+            rows.append((f"- {chapter}: {stats['accuracy']:.1f}% vs cohort {stats['cohort_mean']:.1f}% "
+                         f"(percentile {stats['percentile']:.1f})\n",
+                         abs(stats['accuracy'] - stats['cohort_mean'])))
+    
+    if cohort.get('level_times'):
+        rows.append(("\nTime per Answer vs Cohort:\n", HEADER))
+        for level, stats in cohort['level_times'].items():
+            rows.append((f"- {level.capitalize()}: {stats['avg_time']:.0f}s vs cohort median "
+                         f"{stats['cohort_median']:.0f}s (slower than {stats['percentile']:.0f}% of peers)\n",
+                         abs(stats['percentile'] - 50)))
+    
+    if cohort['missed_common_questions']:
+        rows.append(("\nMissed Questions Most Peers Answered Correctly:\n", HEADER))
+        for question in cohort['missed_common_questions'][:10]:
+            rows.append((f"- {question['chapter']}: {question['p_value'] * 100:.0f}% of students correct, "
+                         f"avg {question['avg_time']:.0f}s (student: {question['time_taken']}s)\n",
+                         question['p_value'] * 100))
+    return rows
+
+
+def _analysis_rows(gemini_data: Dict[str, List[str]]) -> List[Row]:
+    rows: List[Row] = [("\nAI ANALYSIS AND RECOMMENDATIONS:\n", None)]
+    for key, heading in (('strengths', 'Key Strengths'),
+                         ('improvements', 'Areas for Improvement'),
+                         ('time_management', 'Time Management Analysis'),
+                         ('recommendations', 'Recommendations')):
+        if key in gemini_data:
+            rows.append((f"\n{heading}:\n", None))
+            rows.extend((f"- {point}\n", None) for point in gemini_data[key])
+    return rows
+
+
+def report_rows(data: Dict[str, Any]) -> List[Row]:
+    """Every row of the feedback prompt for process_data output, in prompt order."""
+    rows: List[Row] = [(f"""Generate a detailed student performance report based on the following test data:
+
+TEST OVERVIEW:
+- Total Duration: {data['test_info']['total_time']} minutes
+- Total Questions: {data['test_info']['total_questions']}
+- Total Marks: {data['test_info']['total_marks']}
+
+OVERALL PERFORMANCE:
+- Total Time Taken: {data['overall_performance']['total_time_taken']} seconds
+- Total Marks Scored: {data['overall_performance']['total_marks_scored']}
+- Questions Attempted: {data['overall_performance']['total_attempted']}
+- Correct Answers: {data['overall_performance']['total_correct']}
+- Overall Accuracy: {data['overall_performance']['accuracy']}%
+
+SUBJECT-WISE PERFORMANCE:
+""", None)]
+
+    for subject, performance in data['subject_wise'].items():
+        rows.append((f"""
+{subject}:
+- Time Taken: {performance['time_taken']} seconds
+- Marks Scored: {performance['marks_scored']}
+- Questions Attempted: {performance['questions_attempted']}
+- Correct Answers: {performance['correct_answers']}
+- Accuracy: {performance['accuracy']}%
+""", None))
+
+    rows.append(("\nDETAILED SECTION ANALYSIS:\n", None))
+    for section, analysis in data['section_wise'].items():
+        rows.extend(_section_rows(section, analysis))
+        
+    if 'pacing' in data:
+        rows.extend(_pacing_rows(data['pacing']))
+    if 'cohort_comparison' in data:
+        rows.extend(_cohort_rows(data['cohort_comparison']))
+    if 'gemini_analysis' in data:
+        rows.extend(_analysis_rows(data['gemini_analysis']))
+    rows.append((CLOSING, None))
+    return rows
+
+
+def select_rows(rows: List[Row], token_budget: int) -> Tuple[List[str], int]:
+    """Keep required rows and the best-scoring optional rows that fit, in order.
+    
+    Returns the kept texts and how many optional rows were dropped.
+    """
+    tokens = [estimate_tokens(text) for text, _ in rows]
+    remaining = token_budget - sum(t for t, (_, score) in zip(tokens, rows) if score is None)
+    # Each optional row carries the cost of its header until one of its siblings is kept
+    header_of: Dict[int, int] = {}
+    header = None
+    for i, (_, score) in enumerate(rows):
+        if score == HEADER:
+            header = i
+        elif score is None:
+            header = None
+        elif header is not None:
+            header_of[i] = header
+            
+    optional = sorted((i for i, (_, score) in enumerate(rows) if score is not None and score != HEADER),
+                      key=lambda i: rows[i][1], reverse=True)
+    keep = set()
+    for i in optional:
+        cost = tokens[i]
+        if i in header_of and header_of[i] not in keep:
+            cost += tokens[header_of[i]]
+        if cost <= remaining:
+            keep.add(i)
+            keep.add(header_of.get(i, i))
+            remaining -= cost
+    kept = [text for i, (text, score) in enumerate(rows) if score is None or i in keep]
+    return kept, len(optional) - len(keep - set(header_of.values()))
+
+
+def build_report_prompt(data: Dict[str, Any],
+                        token_budget: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
+    """Feedback prompt for process_data output and metrics on its size.
+    
+    With a ``token_budget`` the least informative chapter, topic, pacing and cohort rows
+    are dropped until the estimated prompt size fits (required rows always stay).
+    """
+    rows = report_rows(data)
+    # Rows the budget may drop, counted the same way with or without one
+    optional = sum(1 for _, score in rows if score is not None and score != HEADER)
+    if token_budget is None:
+        prompt = ''.join(text for text, _ in rows)
+        tokens = estimate_tokens(prompt)
+        return prompt, {'rows': optional, 'dropped_rows': 0, 'full_tokens': tokens, 'tokens': tokens}
+        
+    full_tokens = estimate_tokens(''.join(text for text, _ in rows))
+    kept, dropped = select_rows(rows, token_budget - NOTE_TOKENS)
+    if dropped:
+        kept.insert(len(kept) - 1, f"\n(Note: {dropped} lower-signal rows were omitted for brevity.)\n")
+    prompt = ''.join(kept)
+    return prompt, {
+        'rows': optional,
+        'dropped_rows': dropped,
+        'full_tokens': full_tokens,
+        'tokens': estimate_tokens(prompt)
+    }
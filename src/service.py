@@ -0,0 +1,364 @@
+import json
+import os
+import queue
+import re
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional
+
+from src import metrics
+from src.charts import chart_inputs, render_performance_charts
+from src.data_processor import DataProcessor
+from src.feedback_generator import generate_feedback
+from src.html_report import HTML_NAME, JSON_NAME, create_html
+from src.llm_backends import LLMBackend
+from src.llm_cache import LLMCache
+from src.pdf_generator import create_pdf
+
+# A long-running report service: POST a submission, get a job id, poll the job
+# and download its report. Backends, the LLM cache and the syllabus/renderer caches
+# are created once and stay warm across jobs; a fixed pool of worker threads
+# drains a bounded queue, so a full queue answers 503 instead of piling up work.
+# The worker threads mostly wait on the LLM; chart drawing and PDF layout hold
+# the GIL, so they run in process pools shared by all workers.
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# Largest accepted request body; a real submission is about 100 KB
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+# Fields every submission needs; checked before queueing so bad requests get a 400
+REQUIRED_FIELDS = ('test', 'sections', 'subjects')
+
+# Files a job can serve, by output format, and their content types
+REPORT_FILES = {'pdf': ('report.pdf',), 'html': (HTML_NAME, JSON_NAME)}
+CONTENT_TYPES = {'.pdf': 'application/pdf', '.html': 'text/html; charset=utf-8',
+                 '.json': 'application/json'}
+
+# Latencies of this many most recent jobs feed the percentiles in /stats
+LATENCY_WINDOW = 1000
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p90/p99 and max of ``values`` (seconds), zeros when empty."""
+    values = sorted(values)
+    return {
+        'p50': metrics.percentile(values, 50),
+        'p90': metrics.percentile(values, 90),
+        'p99': metrics.percentile(values, 99),
+        'max': values[-1] if values else 0.0
+    }
+
+
+class Job:
+    """One submitted report and its progress."""
+    
+    def __init__(self, submission: Dict[str, Any], output_dir: str, output_format: str = 'pdf'):
+        self.id = uuid.uuid4().hex
+        self.submission: Optional[Dict[str, Any]] = submission
+        self.output_format = output_format
+        self.output_path = os.path.join(output_dir, self.id, REPORT_FILES[output_format][0])
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.metrics: Optional[metrics.ReportMetrics] = None
+        
+    def to_dict(self) -> Dict[str, Any]:
+        job = {
+            'job_id': self.id,
+            'status': self.status,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished
+        }
+        if self.started is not None:
+            job['wait_seconds'] = self.started - self.submitted
+        if self.finished is not None:
+            job['run_seconds'] = self.finished - self.started
+        if self.status == DONE:
+            job['report'] = f'/jobs/{self.id}/{os.path.basename(self.output_path)}'
+        if self.error:
+            job['error'] = self.error
+        if self.metrics is not None:
+            job['stages'] = self.metrics.to_dict()['stages']
+        return job
+
+
+class ReportService:
+    """Queue of report jobs run by a pool of warm worker threads.
+
+    Charts and PDFs are built in ``chart_workers`` and ``pdf_workers``
+    processes (one per worker thread when None, in the worker thread when 0).
+    """
+    
+    def __init__(self, output_dir: str, analysis_model: LLMBackend, feedback_model: LLMBackend,
+                 workers: int = 2, max_queue: int = 100, engine: str = 'python',
+                 cache: Optional[LLMCache] = None, cohort=None,
+                 prompt_budget: Optional[int] = None, max_jobs: int = 10000,
+                 output_format: str = 'pdf', chart_workers: Optional[int] = None,
+                 pdf_workers: Optional[int] = None):
+        self.output_dir = output_dir
+        self.output_format = output_format
+        pdf = output_format == 'pdf'
+        self.chart_workers = (workers if chart_workers is None else chart_workers) if pdf else 0
+        self.pdf_workers = (workers if pdf_workers is None else pdf_workers) if pdf else 0
+        self._chart_pool: Optional[ProcessPoolExecutor] = None
+        self._pdf_pool: Optional[ProcessPoolExecutor] = None
+        self.analysis_model = analysis_model
+        self.feedback_model = feedback_model
+        self.workers = workers
+        self.engine = engine
+        self.cache = cache if feedback_model.cacheable else None
+        self.cohort = cohort
+        self.prompt_budget = prompt_budget
+        self.max_jobs = max_jobs
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._waits: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._runs: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._totals: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._start = time.perf_counter()
+        
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.chart_workers:
+            self._chart_pool = ProcessPoolExecutor(self.chart_workers)
+        if self.pdf_workers:
+            self._pdf_pool = ProcessPoolExecutor(self.pdf_workers)
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'report-worker-{n}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            
+    def close(self):
+        """Finish the queued jobs and stop the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+        for pool in (self._chart_pool, self._pdf_pool):
+            if pool is not None:
+                pool.shutdown()
+        self._chart_pool = self._pdf_pool = None
+        
+    def submit(self, submission: Dict[str, Any]) -> Optional[Job]:
+        """Queue a report; returns None when the queue is full."""
+        job = Job(submission, self.output_dir, self.output_format)
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                return None
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        return job
+        
+    def _forget_old_jobs(self):
+        # Oldest finished jobs go first; their PDFs stay on disk
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].status in (DONE, FAILED):
+                del self._jobs[job_id]
+                
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+            
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self.running += 1
+                job.status = RUNNING
+                job.started = time.time()
+            try:
+                with metrics.report(job.id) as job.metrics:
+                    self._run(job)
+                status, error = DONE, None
+            except Exception as e:
+                status, error = FAILED, str(e)
+                print(f"Error in job {job.id}: {str(e)}")
+            with self._lock:
+                job.status, job.error = status, error
+                job.finished = time.time()
+                job.submission = None
+                self.running -= 1
+                if status == DONE:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._waits.append(job.started - job.submitted)
+                self._runs.append(job.finished - job.started)
+                self._totals.append(job.finished - job.submitted)
+                
+    def _run(self, job: Job):
+        processor = DataProcessor(None, None, data=job.submission, model=self.analysis_model,
+                                  engine=self.engine, cache=self.cache, cohort=self.cohort,
+                                  prompt_budget=self.prompt_budget)
+        data = processor.process_data()
+        feedback = generate_feedback(processor.get_llm_prompt(), None, model=self.feedback_model,
+                                     cache=self.cache, context=data)
+        os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+        if job.output_format == 'html':
+            create_html(feedback, data, job.output_path)
+            return
+        if self._chart_pool:
+            charts = self._chart_pool.submit(render_performance_charts, chart_inputs(data)).result()
+        else:
+            charts = render_performance_charts(data)
+        if self._pdf_pool:
+            self._pdf_pool.submit(create_pdf, feedback, charts, job.output_path).result()
+        else:
+            create_pdf(feedback, charts, job.output_path)
+        
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, job counts and latency percentiles for sizing the pool."""
+        with self._lock:
+            waits, runs, totals = list(self._waits), list(self._runs), list(self._totals)
+            stats = {
+                'workers': self.workers,
+                'queue_depth': self._queue.qsize(),
+                'running': self.running,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected
+            }
+        elapsed = time.perf_counter() - self._start
+        stats['jobs_per_second'] = (stats['completed'] + stats['failed']) / elapsed if elapsed > 0 else 0.0
+        stats['latency'] = {'wait': percentiles(waits), 'run': percentiles(runs),
+                            'total': percentiles(totals)}
+        stats['stages'] = metrics.summary()['stages']
+        return stats
+
+
+_JOB_PATH = re.compile(r'^/jobs/([0-9a-f]{32})(?:/(report\.(?:pdf|html|json)))?$')
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a ReportService (set as the ``service`` class attribute)."""
+    
+    service: ReportService = None
+    
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        
+    def do_POST(self):
+        if self.path != '/jobs':
+            self._send_json(404, {'error': 'not found'})
+            return
+        if self.headers.get('Content-Length') is None:
+            self._send_json(411, {'error': 'Content-Length required'})
+            return
+        try:
+            length = int(self.headers['Content-Length'])
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {'error': 'invalid Content-Length'})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {'error': 'submission too large'})
+            return
+        try:
+            submission = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self._send_json(400, {'error': f'invalid JSON: {str(e)}'})
+            return
+        # Accept the sample-file layout too: an array holding one submission
+        if isinstance(submission, list) and len(submission) == 1:
+            submission = submission[0]
+        if not isinstance(submission, dict):
+            self._send_json(400, {'error': 'expected one submission object'})
+            return
+        missing = [field for field in REQUIRED_FIELDS if field not in submission]
+        if missing:
+            self._send_json(400, {'error': f"submission is missing {', '.join(missing)}"})
+            return
+            
+        job = self.service.submit(submission)
+        if job is None:
+            self._send_json(503, {'error': 'queue full, retry later'}, {'Retry-After': '1'})
+            return
+        self._send_json(202, job.to_dict(), {'Location': f'/jobs/{job.id}'})
+        
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+            return
+        if self.path == '/stats':
+            self._send_json(200, self.service.stats())
+            return
+        match = _JOB_PATH.match(self.path)
+        job = self.service.get(match.group(1)) if match else None
+        if job is None:
+            self._send_json(404, {'error': 'no such job'})
+            return
+        if not match.group(2):
+            self._send_json(200, job.to_dict())
+            return
+        if match.group(2) not in REPORT_FILES[job.output_format]:
+            self._send_json(404, {'error': f'this job writes {job.output_format} reports'})
+            return
+        if job.status != DONE:
+            self._send_json(409, {'error': f'report not ready (job is {job.status})'})
+            return
+        with open(os.path.join(os.path.dirname(job.output_path), match.group(2)), 'rb') as f:
+            data = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES[os.path.splitext(match.group(2))[1]])
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        
+    def log_message(self, format, *args):
+        # Polling would flood the console with one line per request
+        pass
+
+
+def make_server(service: ReportService, host: str = '127.0.0.1',
+                port: int = 8080) -> ThreadingHTTPServer:
+    """HTTP server for ``service`` (port 0 picks a free one); the service isn't started."""
+    handler = type('Handler', (ServiceHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(service: ReportService, host: str = '127.0.0.1', port: int = 8080):
+    """Run the HTTP service until interrupted, then drain the queue."""
+    server = make_server(service, host, port)
+    service.start()
+    # Stop the same way on SIGTERM (e.g. from a process manager) as on Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Serving reports on http://{host}:{server.server_address[1]} "
+          f"with {service.workers} workers (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
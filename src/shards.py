@@ -0,0 +1,422 @@
+import json
+import os
+import socket
+import time
+from itertools import islice
+from typing import Any, Dict, List, Optional, Set
+
+from src import metrics
+from src.batch import (build_report, expand_inputs, is_complete, report_fingerprint, report_path,
+                       submission_id, write_cohort_outputs)
+from src.cohort import CohortBuilder, CohortStats, merge_cohorts
+from src.data_processor import DataProcessor, stream_submissions
+from src.llm_backends import LLMBackend, create_backends
+from src.llm_cache import LLMCache
+from src.manifest import BuildManifest
+from src.metrics import MetricsWriter
+
+# Sharded batch runs: any number of worker processes, on any hosts that share
+# the run directory, cooperate on one batch. The first worker splits the inputs
+# into shard files and writes the plan; every worker then claims shards through
+# O_EXCL lock files, checkpoints each finished report so a crashed shard resumes
+# where it stopped, and leaves per-shard aggregates behind. Whoever finds every
+# shard done merges those into one summary. Run directory layout:
+#
+#   shards.json              the plan: shard id, source file, first index, count
+#   shards/<id>.json         the shard's submissions, split out of its source file
+#   locks/<id>.lock          held by the worker building the shard
+#   checkpoints/<id>.txt     report ids finished so far, one per line
+#   done/<id>.json           shard counts and stage metrics (written last)
+#   done/<id>.cohort.npz     CohortStats of the shard's submissions
+#   summary.json             merged aggregates, once every shard is done
+
+PLAN_VERSION = 1
+DEFAULT_SHARD_SIZE = 500
+
+# A lock whose holder hasn't renewed it for this many seconds is taken over;
+# holders renew after every report, so keep it well above one report's time
+DEFAULT_LEASE = 600.0
+
+# Seconds between looks at shards other workers still hold
+POLL_SECONDS = 2.0
+
+# Submissions held at once while building a shard's cohort aggregate
+COHORT_CHUNK = 500
+
+
+class LeaseLost(Exception):
+    """Another worker took over a lock this worker held."""
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path: str, value: Any):
+    """Write atomically, so other workers never read a partial file."""
+    tmp_path = f'{path}.{worker_name()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ShardLock:
+    """Exclusive claim on a shard (or on the plan or merge step) held as a lock file.
+    
+    Creating the file with O_EXCL is atomic, also on shared filesystems. The
+    file's mtime is the lease: ``refresh`` renews it, and a lock left alone
+    for longer than the lease (its worker crashed) may be taken over. A
+    takeover is serialized by a second O_EXCL file next to the lock, under
+    which the lock is checked again before it is overwritten.
+    """
+    
+    def __init__(self, path: str, owner: str):
+        self.path = path
+        self.owner = owner
+        
+    @staticmethod
+    def _is_stale(path: str, lease: float) -> bool:
+        """True if ``path`` exists and was last touched more than ``lease`` seconds ago."""
+        try:
+            return time.time() - os.stat(path).st_mtime >= lease
+        except FileNotFoundError:
+            return False
+            
+    @staticmethod
+    def _create(path: str) -> Optional[int]:
+        try:
+            return os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+            
+    @classmethod
+    def acquire(cls, path: str, owner: str, lease: float = DEFAULT_LEASE) -> Optional['ShardLock']:
+        """The lock, or None while another worker holds it."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        content = {'owner': owner, 'acquired': time.time()}
+        fd = cls._create(path)
+        if fd is not None:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(content, f)
+            return cls(path, owner)
+        if not cls._is_stale(path, lease):
+            return None
+            
+        # Only the worker holding the takeover marker may replace a stale lock
+        marker = f'{path}.takeover'
+        fd = cls._create(marker)
+        if fd is None:
+            if cls._is_stale(marker, lease):
+                # Left behind by a worker that died mid-takeover; the next attempt may retry
+                try:
+                    os.remove(marker)
+                except FileNotFoundError:
+                    pass
+            return None
+        os.close(fd)
+        try:
+            # Another worker may have taken the lock over (or it was released and
+            # claimed afresh) between our first look and the marker
+            if not cls._is_stale(path, lease):
+                return None
+            _write_json(path, content)
+        finally:
+            os.remove(marker)
+        lock = cls(path, owner)
+        try:
+            # Confirm, in case the lock changed hands again while we wrote it
+            lock.refresh()
+        except LeaseLost:
+            return None
+        return lock
+        
+    def refresh(self):
+        """Renew the lease; raises LeaseLost if the lock was taken over meanwhile."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                owner = json.load(f)['owner']
+        except (OSError, ValueError, KeyError):
+            raise LeaseLost(self.path)
+        if owner != self.owner:
+            raise LeaseLost(self.path)
+        os.utime(self.path)
+        
+    def release(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _split_inputs(paths: List[str], run_dir: str, shard_size: int,
+                  lock: ShardLock) -> List[Dict[str, Any]]:
+    """Copy the submissions into shard files of ``shard_size``; shards never span source files."""
+    os.makedirs(os.path.join(run_dir, 'shards'), exist_ok=True)
+    shards = []
+    for path in paths:
+        submissions = stream_submissions(path)
+        start = 0
+        while True:
+            chunk = list(islice(submissions, shard_size))
+            if not chunk:
+                break
+            shard_id = f'{len(shards):05d}'
+            shard_file = os.path.join('shards', f'{shard_id}.json')
+            with open(os.path.join(run_dir, shard_file), 'w', encoding='utf-8') as f:
+                json.dump(chunk, f, ensure_ascii=False)
+            shards.append({'id': shard_id, 'file': shard_file, 'source': path,
+                           'start': start, 'count': len(chunk)})
+            start += len(chunk)
+            lock.refresh()
+    return shards
+
+
+def plan_run(inputs: List[str], run_dir: str, shard_size: int = DEFAULT_SHARD_SIZE,
+             owner: Optional[str] = None, lease: float = DEFAULT_LEASE) -> Dict[str, Any]:
+    """The run's shard plan, created by whichever worker gets there first."""
+    owner = owner or worker_name()
+    plan_path = os.path.join(run_dir, 'shards.json')
+    while True:
+        plan = _read_json(plan_path)
+        if plan is None:
+            lock = ShardLock.acquire(os.path.join(run_dir, 'locks', 'plan.lock'), owner, lease)
+            if lock is not None:
+                try:
+                    # Another worker may have finished the plan just before we got the lock
+                    plan = _read_json(plan_path)
+                    if plan is None:
+                        paths = expand_inputs(inputs)
+                        plan = {'version': PLAN_VERSION, 'created': time.time(), 'inputs': paths,
+                                'shard_size': shard_size,
+                                'shards': _split_inputs(paths, run_dir, shard_size, lock)}
+                        _write_json(plan_path, plan)
+                        print(f"Planned {len(plan['shards'])} shards of up to {shard_size} "
+                              f"submissions in {run_dir}")
+                finally:
+                    lock.release()
+        if plan is not None:
+            if plan['version'] != PLAN_VERSION:
+                raise ValueError(f"{plan_path} has plan version {plan['version']}, "
+                                 f"expected {PLAN_VERSION}")
+            return plan
+        time.sleep(POLL_SECONDS)
+
+
+def _done_path(run_dir: str, shard_id: str, suffix: str = '.json') -> str:
+    return os.path.join(run_dir, 'done', shard_id + suffix)
+
+
+def _read_checkpoint(path: str) -> Set[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            # A crash can leave the last line unfinished; that report is simply rebuilt
+            return {line[:-1] for line in f if line.endswith('\n')}
+    except FileNotFoundError:
+        return set()
+
+
+def run_shard(run_dir: str, shard: Dict[str, Any], lock: ShardLock, api_key: Optional[str],
+              analysis_model: LLMBackend, feedback_model: LLMBackend, output_dir: str = 'output',
+              engine: str = 'python', cache: Optional[LLMCache] = None,
+              cohort: Optional[CohortStats] = None, force: bool = False,
+              prompt_budget: Optional[int] = None,
+              metrics_writer: Optional[MetricsWriter] = None,
+              output_format: str = 'pdf') -> Dict[str, Any]:
+    """Build the reports of one claimed shard, skipping those already checkpointed.
+    
+    Writes the shard's aggregates to done/ and returns its counts.
+    """
+    shard_id = shard['id']
+    metrics.reset()
+    started = time.time()
+    checkpoint_path = os.path.join(run_dir, 'checkpoints', f'{shard_id}.txt')
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    finished = _read_checkpoint(checkpoint_path)
+    # Each shard keeps its own build manifest, so workers never overwrite each other's
+    manifest = BuildManifest(output_dir, force=force, filename=f'.manifest-{shard_id}.json')
+    builder = CohortBuilder()
+    chunk: List[Dict] = []
+    counts = {'submissions': 0, 'succeeded': 0, 'failed': 0, 'resumed': 0}
+    prompt_totals: Dict[str, int] = {}
+    
+    processors = DataProcessor.from_submissions(
+        stream_submissions(os.path.join(run_dir, shard['file'])), api_key, model=analysis_model,
+        json_path=shard['source'], engine=engine, cache=cache, cohort=cohort,
+        prompt_budget=prompt_budget)
+    with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        for offset, processor in enumerate(processors):
+            counts['submissions'] += 1
+            # Every submission counts towards the shard's cohort, rebuilt or not
+            chunk.append(processor.data)
+            if len(chunk) >= COHORT_CHUNK:
+                builder.add(chunk)
+                chunk = []
+            report_id = submission_id(processor.data, shard['source'], shard['start'] + offset)
+            if report_id in finished:
+                counts['resumed'] += 1
+                continue
+            output_path = report_path(output_dir, report_id, output_format)
+            fingerprint = report_fingerprint(processor.data, analysis_model, feedback_model, cohort,
+                                             prompt_budget, output_format)
+            if not manifest.is_current(report_id, fingerprint, output_path):
+                try:
+                    with metrics.report(report_id) as report_metrics:
+                        data, prompt, feedback = build_report(processor, api_key, feedback_model,
+                                                              output_path, cache,
+                                                              prompt_totals=prompt_totals,
+                                                              output_format=output_format)
+                    if metrics_writer:
+                        metrics_writer.write(report_metrics)
+                    if is_complete(data, feedback):
+                        manifest.record(report_id, fingerprint, prompt, output_path)
+                    counts['succeeded'] += 1
+                except Exception as e:
+                    print(f"Error processing submission {shard['start'] + offset} of "
+                          f"{shard['source']}: {str(e)}")
+                    counts['failed'] += 1
+                    lock.refresh()
+                    continue
+            checkpoint.write(report_id + '\n')
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+            lock.refresh()
+    builder.add(chunk)
+    manifest.save()
+    
+    lock.refresh()
+    os.makedirs(os.path.join(run_dir, 'done'), exist_ok=True)
+    builder.finish().save(_done_path(run_dir, shard_id, '.cohort.npz'))
+    # The .json marker goes last: once it exists the shard counts as done
+    result = dict(counts, shard=shard_id, worker=lock.owner, started=started,
+                  finished=time.time(), skipped=manifest.skipped, prompt=prompt_totals,
+                  metrics=metrics.summary())
+    _write_json(_done_path(run_dir, shard_id), result)
+    return result
+
+
+def merge_run(run_dir: str, output_dir: str = 'output', owner: Optional[str] = None,
+              lease: float = DEFAULT_LEASE) -> Optional[Dict[str, Any]]:
+    """Merge the shard aggregates once every shard is done; None while shards remain.
+    
+    Writes run_summary.json plus the cohort summary and heatmap to ``output_dir``.
+    """
+    summary_path = os.path.join(run_dir, 'summary.json')
+    summary = _read_json(summary_path)
+    if summary is not None:
+        return summary
+    plan = _read_json(os.path.join(run_dir, 'shards.json'))
+    if plan is None or not all(os.path.exists(_done_path(run_dir, shard['id']))
+                               for shard in plan['shards']):
+        return None
+    lock = ShardLock.acquire(os.path.join(run_dir, 'locks', 'merge.lock'), owner or worker_name(),
+                             lease)
+    if lock is None:
+        return None
+    try:
+        summary = _read_json(summary_path)
+        if summary is not None:
+            return summary
+        parts = [_read_json(_done_path(run_dir, shard['id'])) for shard in plan['shards']]
+        cohort = merge_cohorts([CohortStats.load(_done_path(run_dir, shard['id'], '.cohort.npz'))
+                                for shard in plan['shards']])
+        prompt_totals: Dict[str, int] = {}
+        for part in parts:
+            for key, value in part['prompt'].items():
+                prompt_totals[key] = prompt_totals.get(key, 0) + value
+        summary = {
+            'shards': len(parts),
+            'workers': sorted({part['worker'] for part in parts}),
+            'wall_seconds': max(part['finished'] for part in parts) - plan['created'],
+            'prompt': prompt_totals,
+            'metrics': metrics.merge_summaries([part['metrics'] for part in parts]),
+            'cohort': {'students': len(cohort), 'chapters': len(cohort.chapter_names),
+                       'questions': len(cohort.question_keys)}
+        }
+        for key in ('submissions', 'succeeded', 'failed', 'resumed', 'skipped'):
+            summary[key] = sum(part[key] for part in parts)
+        write_cohort_outputs(cohort, output_dir)
+        _write_json(os.path.join(output_dir, 'run_summary.json'), summary)
+        _write_json(summary_path, summary)
+        return summary
+    finally:
+        lock.release()
+
+
+def run_worker(inputs: List[str], run_dir: str, api_key: Optional[str], output_dir: str = 'output',
+               engine: str = 'python', cache: Optional[LLMCache] = None, backend: str = 'gemini',
+               cohort: Optional[CohortStats] = None, force: bool = False,
+               prompt_budget: Optional[int] = None, shard_size: int = DEFAULT_SHARD_SIZE,
+               lease: float = DEFAULT_LEASE, worker: Optional[str] = None,
+               metrics_writer: Optional[MetricsWriter] = None,
+               output_format: str = 'pdf') -> Dict[str, Any]:
+    """Claim and build shards of ``run_dir`` until every shard is done, then merge.
+    
+    Start as many workers as wanted, on any host that sees ``run_dir`` and
+    ``output_dir``. A worker only waits on shards others hold, taking them
+    over if their lease runs out, so the run finishes even if workers crash.
+    """
+    worker = worker or worker_name()
+    os.makedirs(output_dir, exist_ok=True)
+    plan = plan_run(inputs, run_dir, shard_size, worker, lease)
+    analysis_model, feedback_model = create_backends(backend, api_key)
+    if not feedback_model.cacheable:
+        cache = None
+        
+    built: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    while True:
+        remaining = [shard for shard in plan['shards']
+                     if not os.path.exists(_done_path(run_dir, shard['id']))]
+        if not remaining:
+            break
+        claimed = False
+        for shard in remaining:
+            lock = ShardLock.acquire(os.path.join(run_dir, 'locks', f"{shard['id']}.lock"), worker, lease)
+            if lock is None:
+                continue
+            if os.path.exists(_done_path(run_dir, shard['id'])):
+                # Finished by the previous holder between our look and the claim
+                lock.release()
+                continue
+            claimed = True
+            try:
+                result = run_shard(run_dir, shard, lock, api_key, analysis_model, feedback_model,
+                                   output_dir, engine=engine, cache=cache, cohort=cohort, force=force,
+                                   prompt_budget=prompt_budget, metrics_writer=metrics_writer,
+                                   output_format=output_format)
+            except LeaseLost:
+                print(f"Shard {shard['id']}: lease taken over by another worker, leaving it")
+                continue
+            except BaseException:
+                # Hand the shard back now rather than after the lease runs out; its
+                # checkpoint keeps the reports already built
+                lock.release()
+                raise
+            lock.release()
+            built.append(result)
+            print(f"Shard {shard['id']} ({shard['source']} from {shard['start']}): "
+                  f"{result['succeeded']} built, {result['failed']} failed, "
+                  f"{result['resumed']} resumed from checkpoint, {result['skipped']} unchanged")
+        if not claimed:
+            time.sleep(POLL_SECONDS)
+            
+    summary = merge_run(run_dir, output_dir, worker, lease)
+    stats = {'worker': worker, 'shards': len(built), 'elapsed_seconds': time.perf_counter() - start,
+             'succeeded': sum(result['succeeded'] for result in built),
+             'failed': sum(result['failed'] for result in built)}
+    print(f"Worker {worker}: {stats['shards']} shards, {stats['succeeded']} reports built, "
+          f"{stats['failed']} failed in {stats['elapsed_seconds']:.2f}s")
+    if summary is not None:
+        stats['run'] = summary
+        print(f"Run: {summary['submissions']} submissions in {summary['shards']} shards by "
+              f"{len(summary['workers'])} workers ({summary['succeeded']} built, "
+              f"{summary['failed']} failed, {summary['resumed']} resumed, {summary['skipped']} unchanged)")
+    return stats
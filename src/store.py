@@ -0,0 +1,213 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.data_processor import DataProcessor
+from src.llm_backends import TemplateBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    submission_id TEXT PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    total_marks REAL,
+    max_marks REAL,
+    accuracy REAL,
+    total_time REAL,
+    attempted INTEGER,
+    correct INTEGER,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_by_student ON submissions (student_id, seq);
+
+CREATE TABLE IF NOT EXISTS subject_scores (
+    submission_id TEXT NOT NULL REFERENCES submissions (submission_id) ON DELETE CASCADE,
+    subject TEXT NOT NULL,
+    marks REAL,
+    accuracy REAL,
+    attempted INTEGER,
+    correct INTEGER,
+    time_taken REAL,
+    PRIMARY KEY (submission_id, subject)
+);
+
+CREATE TABLE IF NOT EXISTS section_scores (
+    submission_id TEXT NOT NULL REFERENCES submissions (submission_id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    total_questions INTEGER,
+    correct INTEGER,
+    incorrect INTEGER,
+    unattempted INTEGER,
+    total_time REAL,
+    avg_time REAL,
+    PRIMARY KEY (submission_id, section)
+);
+
+CREATE TABLE IF NOT EXISTS chapter_scores (
+    submission_id TEXT NOT NULL REFERENCES submissions (submission_id) ON DELETE CASCADE,
+    student_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    chapter TEXT NOT NULL,
+    total INTEGER,
+    correct INTEGER,
+    PRIMARY KEY (submission_id, chapter)
+);
+CREATE INDEX IF NOT EXISTS chapters_by_student ON chapter_scores (student_id, chapter, seq);
+"""
+
+
+class PerformanceStore:
+    """SQLite store of per-submission aggregates for trends across tests.
+
+    Holds what process_data derives (overall, subject, section and chapter
+    totals) keyed by submission ``_id`` and student, so a student's trend is
+    an indexed lookup instead of re-analyzing every historical file.
+    """
+    
+    def __init__(self, path: str = 'performance.db'):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        
+    def close(self):
+        self._conn.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+        
+    def has_submission(self, submission_id: str) -> bool:
+        row = self._conn.execute("SELECT 1 FROM submissions WHERE submission_id = ?",
+                                 (submission_id,)).fetchone()
+        return row is not None
+        
+    def record(self, processor: DataProcessor, submission_id: str, student_id: str,
+               test_id: str):
+        """Upsert one submission's aggregates; re-recording replaces the old rows."""
+        data = processor.data
+        subject_wise = processor.get_subject_wise()
+        section_wise = processor.get_section_wise()
+        
+        # Chapters appear in several sections (single correct, numerical), so sum them
+        chapters: Dict[str, List[int]] = {}
+        for analysis in section_wise.values():
+            for chapter, stats in analysis['chapter_wise'].items():
+                totals = chapters.setdefault(chapter, [0, 0])
+                totals[0] += stats['total']
+                totals[1] += stats['correct']
+                
+        with self._lock, self._conn:
+            # A submission keeps its place in the student's sequence when re-recorded
+            row = self._conn.execute(
+                "SELECT seq FROM submissions WHERE submission_id = ?", (submission_id,)).fetchone()
+            if row is not None:
+                seq = row['seq']
+            else:
+                seq = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM submissions WHERE student_id = ?",
+                    (student_id,)).fetchone()[0]
+            self._conn.execute("DELETE FROM submissions WHERE submission_id = ?", (submission_id,))
+            self._conn.execute(
+                "INSERT INTO submissions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (submission_id, student_id, test_id, seq, data['totalMarkScored'],
+                 data['test']['totalMarks'], data['accuracy'], data['totalTimeTaken'],
+                 data['totalAttempted'], data['totalCorrect'], time.time()))
+            self._conn.executemany(
+                "INSERT INTO subject_scores VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(submission_id, subject, stats['marks_scored'], stats['accuracy'],
+                  stats['questions_attempted'], stats['correct_answers'], stats['time_taken'])
+                 for subject, stats in subject_wise.items()])
+            self._conn.executemany(
+                "INSERT INTO section_scores VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(submission_id, section, analysis['total_questions'], analysis['correct_answers'],
+                  analysis['incorrect_answers'], analysis['unattempted'],
+                  analysis['time_analysis']['total_time'],
+                  analysis['time_analysis']['avg_time_per_question'])
+                 for section, analysis in section_wise.items()])
+            self._conn.executemany(
+                "INSERT INTO chapter_scores VALUES (?, ?, ?, ?, ?, ?)",
+                [(submission_id, student_id, seq, chapter, total, correct)
+                 for chapter, (total, correct) in chapters.items()])
+            
+    def ingest(self, submissions: Iterable[Tuple[str, Dict]], student_id: str,
+               test_id: Optional[str] = None, engine: str = 'python',
+               refresh: bool = False) -> Tuple[int, int]:
+        """Record (submission_id, submission) pairs that aren't stored yet.
+
+        Only new submissions are analyzed (no LLM calls are made); pass
+        ``refresh`` to re-record existing ones. Returns (recorded, skipped).
+        """
+        model = TemplateBackend()
+        recorded = skipped = 0
+        for submission_id, submission in submissions:
+            if not refresh and self.has_submission(submission_id):
+                skipped += 1
+                continue
+            processor = DataProcessor(None, None, data=submission, model=model, engine=engine)
+            self.record(processor, submission_id, student_id, test_id or submission_id)
+            recorded += 1
+        return recorded, skipped
+        
+    def trend(self, student_id: str) -> List[Dict[str, Any]]:
+        """The student's submissions in the order they were recorded, with subject marks."""
+        rows = self._conn.execute(
+            "SELECT * FROM submissions WHERE student_id = ? ORDER BY seq", (student_id,)).fetchall()
+        subjects = self._conn.execute(
+            "SELECT s.submission_id, s.subject, s.marks, s.accuracy FROM subject_scores s "
+            "JOIN submissions USING (submission_id) WHERE student_id = ?", (student_id,)).fetchall()
+        by_submission: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for row in subjects:
+            by_submission.setdefault(row['submission_id'], {})[row['subject']] = {
+                'marks': row['marks'], 'accuracy': row['accuracy']}
+        return [dict(row, subjects=by_submission.get(row['submission_id'], {})) for row in rows]
+        
+    def chapter_progress(self, student_id: str,
+                         chapter: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """{chapter: [{'seq', 'total', 'correct', 'accuracy'}, ...]} across the student's tests."""
+        query = "SELECT chapter, seq, total, correct FROM chapter_scores WHERE student_id = ?"
+        params: Tuple = (student_id,)
+        if chapter is not None:
+            query += " AND chapter = ?"
+            params += (chapter,)
+        progress: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self._conn.execute(query + " ORDER BY chapter, seq", params):
+            progress.setdefault(row['chapter'], []).append({
+                'seq': row['seq'],
+                'total': row['total'],
+                'correct': row['correct'],
+                'accuracy': row['correct'] / row['total'] * 100 if row['total'] else 0.0
+            })
+        return progress
+        
+    def students(self) -> List[str]:
+        return [row[0] for row in self._conn.execute(
+            "SELECT DISTINCT student_id FROM submissions ORDER BY student_id")]
+
+
+def print_trend(store: PerformanceStore, student_id: str):
+    """Print a student's score trend and per-chapter progress."""
+    trend = store.trend(student_id)
+    if not trend:
+        print(f"No submissions recorded for student {student_id}")
+        return
+        
+    print(f"Trend for {student_id} ({len(trend)} tests):")
+    for row in trend:
+        subjects = ", ".join(f"{subject} {stats['marks']:g}" for subject, stats in row['subjects'].items())
+        print(f"  {row['seq']:>3}. {row['test_id']}: {row['total_marks']:g}/{row['max_marks']:g} "
+              f"marks, {row['accuracy']:.1f}% accuracy ({subjects})")
+        
+    print("Chapter progress (accuracy per test):")
+    for chapter, points in store.chapter_progress(student_id).items():
+        print(f"  {chapter}: " + " -> ".join(f"{point['accuracy']:.0f}%" for point in points))
@@ -0,0 +1,123 @@
+import hashlib
+import html as html_lib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+Syllabus = Dict[str, List[str]]
+
+# Every tag in the simple <h1>/<h2>/<ul>/<li> markup the tests export
+_TAG = re.compile(r'<[^>]*>')
+_SIMPLE_TAG = re.compile(r'</?(?:h1|h2|ul|li)>')
+_HEADING = re.compile(r'<h2>([^<]*)</h2>')
+_LIST = re.compile(r'<ul>(.*?)</ul>', re.S)
+_ITEM = re.compile(r'<li>([^<]*)</li>')
+
+# Parsed syllabi keyed by a hash of their HTML; every student who sat the same
+# test shares one syllabus, so a batch parses each test's syllabus only once.
+_cache: Dict[str, Syllabus] = {}
+_lock = threading.Lock()
+_cache_dir: Optional[str] = None
+stats = {'memory_hits': 0, 'disk_hits': 0, 'fast_parses': 0, 'soup_parses': 0}
+
+
+def set_cache_dir(cache_dir: Optional[str]):
+    """Also persist parsed syllabi as JSON files in ``cache_dir`` (None disables)."""
+    global _cache_dir
+    _cache_dir = cache_dir
+
+
+def parse_with_soup(html: str) -> Syllabus:
+    """Parse the syllabus HTML into a structured format with BeautifulSoup."""
+    # Only needed when the regex fast path gives up, so imported here
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html, 'html.parser')
+    syllabus = {}
+    
+    # Extract subject sections
+    for subject in soup.find_all('h2'):
+        subject_name = subject.text.strip()
+        topics = [li.text.strip() for li in subject.find_next('ul').find_all('li')]
+        syllabus[subject_name] = topics
+        
+    return syllabus
+
+
+def parse_simple(html: str) -> Optional[Syllabus]:
+    """Regex parse of plain <h2>/<ul>/<li> markup without building a tree.
+
+    Returns None when the markup has anything else (attributes, other or
+    nested tags, unclosed items) so the caller can fall back to the soup.
+    """
+    tags = _TAG.findall(html)
+    if not all(_SIMPLE_TAG.fullmatch(tag) for tag in tags):
+        return None
+    if tags.count('<li>') != tags.count('</li>') or tags.count('<ul>') != tags.count('</ul>'):
+        return None
+        
+    syllabus = {}
+    for heading in _HEADING.finditer(html):
+        topic_list = _LIST.search(html, heading.end())
+        if topic_list is None or '<ul>' in topic_list.group(1):
+            return None
+        body = topic_list.group(1)
+        items = _ITEM.findall(body)
+        if len(items) != body.count('<li>'):
+            return None
+        syllabus[html_lib.unescape(heading.group(1)).strip()] = [
+            html_lib.unescape(item).strip() for item in items
+        ]
+    return syllabus
+
+
+def _count(name: str):
+    # Parses run outside the lock, possibly in several threads at once
+    with _lock:
+        stats[name] += 1
+
+
+def _parse(html: str) -> Syllabus:
+    syllabus = parse_simple(html)
+    if syllabus is not None:
+        _count('fast_parses')
+        return syllabus
+    _count('soup_parses')
+    return parse_with_soup(html)
+
+
+def parse_syllabus(html: str) -> Syllabus:
+    """Parse a syllabus, cached in memory (and on disk if configured) by HTML hash."""
+    key = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    with _lock:
+        syllabus = _cache.get(key)
+        if syllabus is not None:
+            stats['memory_hits'] += 1
+            
+    if syllabus is None:
+        path = os.path.join(_cache_dir, key + '.json') if _cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                syllabus = json.load(f)
+            _count('disk_hits')
+        else:
+            syllabus = _parse(html)
+            if path:
+                os.makedirs(_cache_dir, exist_ok=True)
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(syllabus, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+        with _lock:
+            _cache[key] = syllabus
+            
+    # Hand out copies so callers can't mutate the shared entry
+    return {subject: list(topics) for subject, topics in syllabus.items()}
+
+
+def clear_cache():
+    """Forget every syllabus parsed in this process (the disk cache is kept)."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,203 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from src.data_processor import SUBJECT_NAMES
+
+# Seeded synthetic submissions in the schema of data/sample_submission_analysis_*.json,
+# for benchmarks and load tests. All submissions of a seed sit the same test
+# (same syllabus and questions), like a real cohort. Submission ``i`` depends
+# only on (seed, i), so any slice can be regenerated independently.
+
+SUBJECT_IDS = {name: subject_id for subject_id, name in SUBJECT_NAMES.items()}
+
+# Chapters of the sample tests and a few neighbours, with their topics
+CATALOG = {
+    'Physics': {
+        'Electrostatics': ["Electric Charge and Coulomb's law", 'Electric Dipole',
+                           'Electric Field and Electric Field Lines', 'Electric Flux and Gauss Law',
+                           'Electric Potential and Potential Energy'],
+        'Capacitance': ['Capacitors with Dielectric', 'Charging and Discarging of capacitors',
+                        'Force and Energy stored in capacitor', 'Grouping of capacitors'],
+        'Current Electricity': ["Ohm's Law", "Kirchhoff's Laws", 'Meter Bridge and Potentiometer']
+    },
+    'Chemistry': {
+        'Solutions': ['Colligative Properties and Abnormal Molecular Masses', "Henry's law",
+                      "Vapour pressure and raoult's law"],
+        'Electrochemistry': ['Cells and Electrode Potential, Nernst Equation',
+                             'Conductance and Conductivity', 'Corrosion'],
+        'Chemical Kinetics': ['Rate Law and Order', 'Arrhenius Equation', 'Half-life']
+    },
+    'Mathematics': {
+        'Sets and Relations': ['Questions on Symmetric Transitive and Reflexive Properties',
+                               'Questions on Venn Diagram', 'Questions on number of relations and sets'],
+        'Functions': ['Composite Function', 'Domain', 'Inverse of a Function', 'Periodicity', 'Range'],
+        'Limits': ['Indeterminate Forms', "L'Hospital's Rule", 'Standard Limits']
+    }
+}
+
+LEVELS = ('easy', 'medium', 'tough')
+LEVEL_DIFFICULTY = np.array([-1.0, 0.0, 1.0])
+# Median seconds spent on a question of each level
+LEVEL_SECONDS = np.array([45.0, 80.0, 130.0])
+SECTIONS = (('Single Correct', 20), ('Numerical', 5))
+FILLER = ("Consider the arrangement described above and determine the required quantity, "
+          "giving your answer in SI units where applicable. ")
+
+
+def _oid(*parts: int) -> Dict[str, str]:
+    return {'$oid': ''.join(f'{part & 0xffffffff:08x}' for part in parts)[:24].ljust(24, '0')}
+
+
+class SyntheticTest:
+    """One test (syllabus and questions) and a seeded stream of its submissions."""
+    
+    def __init__(self, seed: int = 0, chapters_per_subject: int = 2, total_time: int = 180):
+        self.seed = seed
+        self.total_time = total_time
+        rng = np.random.default_rng([seed, 0])
+        self.chapters: Dict[str, List[str]] = {}
+        # (subject, section title, numerical, [(chapter, topic, level index, text)])
+        self.sections: List[Tuple[str, str, bool, List[Tuple[str, str, int, str]]]] = []
+        for subject, chapters in CATALOG.items():
+            names = list(chapters)
+            picked = [names[i] for i in sorted(rng.choice(len(names), chapters_per_subject,
+                                                          replace=False))]
+            self.chapters[subject] = picked
+            for kind, count in SECTIONS:
+                questions = []
+                for n in range(count):
+                    chapter = picked[rng.integers(len(picked))]
+                    topics = chapters[chapter]
+                    topic = topics[rng.integers(len(topics))]
+                    level = int(rng.choice(3, p=[0.35, 0.4, 0.25]))
+                    text = (f"[{subject} {kind} {n + 1}] A {LEVELS[level]} question on {topic}. "
+                            + FILLER * int(rng.integers(0, 3)))
+                    questions.append((chapter, topic, level, text))
+                self.sections.append((subject, f'{subject} {kind}', kind == 'Numerical', questions))
+        self.levels = np.array([q[2] for _, _, _, questions in self.sections for q in questions])
+        self._test_info = {
+            'syllabus': self.syllabus,
+            'totalTime': self.total_time,
+            'totalQuestions': len(self.levels),
+            'totalMarks': 4 * len(self.levels)
+        }
+        
+    @property
+    def syllabus(self) -> str:
+        parts = [f'<h1>Synthetic Test {self.seed} Syllabus</h1>']
+        for subject, chapters in self.chapters.items():
+            items = '\n'.join(f'  <li>{chapter}</li>' for chapter in chapters)
+            parts.append(f'<h2>{subject}</h2>\n<ul>\n{items}\n</ul>')
+        return '\n'.join(parts)
+        
+    def test_info(self) -> Dict[str, Any]:
+        return dict(self._test_info)
+        
+    def submission(self, index: int) -> Dict[str, Any]:
+        """Submission ``index``: a student of random ability answering every question."""
+        rng = np.random.default_rng([self.seed, index + 1])
+        n = len(self.levels)
+        ability = rng.normal()
+        difficulty = LEVEL_DIFFICULTY[self.levels]
+        attempt_p = 1 / (1 + np.exp(-(1.2 + ability - 0.8 * difficulty)))
+        correct_p = 1 / (1 + np.exp(-(0.8 + 1.5 * ability - 1.2 * difficulty)))
+        attempted = rng.random(n) < attempt_p
+        correct = attempted & (rng.random(n) < correct_p)
+        marked_review = ~attempted & (rng.random(n) < 0.85)
+        seconds = np.maximum(5, LEVEL_SECONDS[self.levels] * rng.lognormal(0, 0.6, n)).astype(int)
+        # Questions are visited in a random order; time left is read off the running clock
+        order = rng.permutation(n)
+        elapsed = np.empty(n)
+        elapsed[order] = np.cumsum(seconds[order])
+        time_left = np.maximum(0, self.total_time - elapsed // 60).astype(int)
+        answers = rng.integers(1, 100, n).tolist()
+        option_ids = rng.integers(1 << 24, size=n).tolist()
+        # Plain lists: indexing NumPy arrays per question is several times slower
+        seconds, time_left = seconds.tolist(), time_left.tolist()
+        attempted, correct, marked_review = attempted.tolist(), correct.tolist(), marked_review.tolist()
+        
+        test_info = self.test_info()
+        sections = []
+        subjects: Dict[str, Dict[str, int]] = {}
+        i = 0
+        for subject, title, numerical, questions in self.sections:
+            records = []
+            totals = subjects.setdefault(subject, {'time': 0, 'marks': 0, 'attempted': 0, 'correct': 0})
+            for chapter, topic, level, text in questions:
+                record = {
+                    'questionId': {
+                        'chapters': [{'title': chapter}],
+                        'topics': [{'title': topic}],
+                        'concepts': [{'title': f'{topic} basics'}],
+                        'level': LEVELS[level],
+                        'question': {'text': text}
+                    },
+                    'markedOptions': [],
+                    'inputValue': {'value': None, 'isCorrect': False},
+                    'timeTaken': seconds[i],
+                    'timeLeftWhenAttempted': time_left[i],
+                    'status': ('answered' if attempted[i] else
+                               'markedReview' if marked_review[i] else 'notAnswered')
+                }
+                if attempted[i]:
+                    if numerical:
+                        record['inputValue'] = {'value': str(answers[i]),
+                                                'isCorrect': correct[i]}
+                    else:
+                        record['markedOptions'] = [{'_id': _oid(self.seed, index, i),
+                                                    'optionId': f'{option_ids[i]:06x}',
+                                                    'isCorrect': correct[i]}]
+                    totals['attempted'] += 1
+                    totals['correct'] += correct[i]
+                    totals['marks'] += 4 if correct[i] else -1
+                totals['time'] += seconds[i]
+                records.append(record)
+                i += 1
+            sections.append({
+                'sectionId': {'sectionType': 'normal', 'title': title,
+                              'maximumAttemptLimit': len(questions)},
+                'questions': records
+            })
+            
+        subject_records = [{
+            '_id': _oid(self.seed, index, 1000 + k),
+            'subjectId': {'$oid': SUBJECT_IDS[subject]},
+            'totalTimeTaken': totals['time'],
+            'totalMarkScored': totals['marks'],
+            'totalAttempted': totals['attempted'],
+            'totalCorrect': totals['correct'],
+            'accuracy': totals['correct'] / totals['attempted'] * 100 if totals['attempted'] else 0
+        } for k, (subject, totals) in enumerate(subjects.items())]
+        total_attempted = sum(attempted)
+        total_correct = sum(correct)
+        return {
+            '_id': _oid(self.seed, index),
+            'test': test_info,
+            'subjects': subject_records,
+            'totalTimeTaken': sum(seconds),
+            'totalMarkScored': sum(totals['marks'] for totals in subjects.values()),
+            'totalAttempted': total_attempted,
+            'totalCorrect': total_correct,
+            'accuracy': total_correct / total_attempted * 100 if total_attempted else 0,
+            'sections': sections
+        }
+
+
+def generate_submissions(count: int, seed: int = 0, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield submissions ``start`` .. ``start + count - 1`` of the test for ``seed``."""
+    test = SyntheticTest(seed)
+    for index in range(start, start + count):
+        yield test.submission(index)
+
+
+def write_submissions(path: str, count: int, seed: int = 0) -> int:
+    """Write ``count`` submissions as a JSON array, one at a time; returns the file size."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for index, submission in enumerate(generate_submissions(count, seed)):
+            f.write((',\n' if index else '\n') + json.dumps(submission, ensure_ascii=False))
+        f.write('\n]\n')
+    return os.path.getsize(path)
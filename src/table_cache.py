@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from src.columnar import QuestionTable, analyze_table, build_question_table
+from src.charts import pacing_chart_inputs
+from src.data_processor import SUBJECT_NAMES, DataProcessor, stream_submissions
+from src.llm_backends import LLMBackend
+from src.llm_cache import LLMCache
+from src.manifest import content_hash
+from src.pacing import analyze_pacing
+
+# Bump whenever the on-disk layout or the columns in it change
+FORMAT_VERSION = 2
+
+# Key of the slim submission dicts holding a hash of the dropped sections, so
+# build manifests (which hash the submission) still see question-level edits
+SECTIONS_HASH = '_sections_hash'
+
+
+class CachedSubmissions:
+    """One submission file read back from the columnar cache.
+
+    ``table`` holds every question as memory-mapped NumPy columns and
+    ``submissions`` the submission dicts without their ``sections`` (question
+    text, options and image HTML are never loaded again); each keeps a hash of
+    its sections under SECTIONS_HASH instead.
+    """
+    
+    def __init__(self, source: str, table: QuestionTable, submissions: List[Dict[str, Any]]):
+        self.source = source
+        self.table = table
+        self.submissions = submissions
+        
+    def __len__(self) -> int:
+        return len(self.submissions)
+        
+    def section_wise(self) -> List[Dict[str, Dict[str, Any]]]:
+        """The section_wise dict of process_data for every submission, computed in one go."""
+        section_wise: List[Dict[str, Dict[str, Any]]] = [{} for _ in self.submissions]
+        for (submission_index, title), analysis in zip(self.table.groups, analyze_table(self.table)):
+            section_wise[submission_index][title] = analysis
+        return section_wise
+        
+    def pacing(self) -> List[Dict[str, Any]]:
+        """The pacing report of process_data for every submission, computed in one go."""
+        return analyze_pacing(self.table, [s['test']['totalTime'] for s in self.submissions]).reports()
+        
+    def chart_inputs(self) -> List[Dict[str, List]]:
+        """charts.chart_inputs for every submission, straight from the columns."""
+        table = self.table
+        totals = np.bincount(table.group, minlength=table.num_groups).tolist()
+        correct = np.bincount(table.group, weights=table.answered & table.correct,
+                              minlength=table.num_groups).astype(np.int64).tolist()
+        inputs = [{
+            'subjects': [SUBJECT_NAMES.get(s['subjectId']['$oid'], 'Unknown') for s in submission['subjects']],
+            'accuracies': [s['accuracy'] for s in submission['subjects']],
+            'sections': [],
+            'correct': [],
+            'total': [],
+            'pacing': pacing_chart_inputs(pacing)
+        } for submission, pacing in zip(self.submissions, self.pacing())]
+        for group_index, (submission_index, title) in enumerate(table.groups):
+            inputs[submission_index]['sections'].append(title)
+            inputs[submission_index]['correct'].append(correct[group_index])
+            inputs[submission_index]['total'].append(totals[group_index])
+        return inputs
+        
+    def processors(self, api_key: Optional[str], model: Optional[LLMBackend] = None,
+                   cache: Optional[LLMCache] = None,
+                   prompt_budget: Optional[int] = None) -> Iterator[DataProcessor]:
+        """A DataProcessor per submission with its section analysis and pacing already filled in."""
+        for submission, section_wise, pacing in zip(self.submissions, self.section_wise(), self.pacing()):
+            yield DataProcessor(self.source, api_key, data=submission, model=model, cache=cache,
+                                section_wise=section_wise, prompt_budget=prompt_budget,
+                                pacing=pacing)
+
+
+def cache_path(json_path: str, cache_dir: str = '.table_cache') -> str:
+    """Directory holding the columnar copy of ``json_path``."""
+    key = hashlib.sha256(os.path.abspath(json_path).encode('utf-8')).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(json_path))[0]
+    return os.path.join(cache_dir, f'{stem}-{key}')
+
+
+def _source_stamp(json_path: str) -> Dict[str, int]:
+    stat = os.stat(json_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _read_meta(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(json_path: str, cache_dir: str = '.table_cache') -> bool:
+    """True when the cached copy exists and matches the file's current size and mtime."""
+    meta = _read_meta(cache_path(json_path, cache_dir))
+    return (meta is not None and meta['version'] == FORMAT_VERSION
+            and meta['source'] == _source_stamp(json_path))
+
+
+def ingest(json_path: str, cache_dir: str = '.table_cache', force: bool = False) -> str:
+    """Convert a submission file to the columnar cache unless an up-to-date copy exists."""
+    directory = cache_path(json_path, cache_dir)
+    if not force and is_fresh(json_path, cache_dir):
+        return directory
+        
+    stamp = _source_stamp(json_path)
+    submissions: List[Dict[str, Any]] = []
+    syllabus_index: Dict[str, int] = {}
+    
+    def slim(stream):
+        # Keep everything but the sections; the syllabus HTML is shared by every
+        # submission of a test, so it is stored once and referenced by index
+        for submission in stream:
+            meta = {key: value for key, value in submission.items() if key != 'sections'}
+            meta[SECTIONS_HASH] = content_hash(submission.get('sections', []))
+            test = dict(meta['test'])
+            test['syllabus'] = syllabus_index.setdefault(test['syllabus'], len(syllabus_index))
+            meta['test'] = test
+            submissions.append(meta)
+            yield submission
+            
+    table = build_question_table(slim(stream_submissions(json_path)))
+    section_index: Dict[str, int] = {}
+    group_sections = [section_index.setdefault(title, len(section_index)) for _, title in table.groups]
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        for name in QuestionTable.COLUMNS:
+            np.save(os.path.join(tmp_dir, name + '.npy'), getattr(table, name))
+        np.save(os.path.join(tmp_dir, 'group_submission.npy'),
+                np.array([index for index, _ in table.groups], dtype=np.int64))
+        np.save(os.path.join(tmp_dir, 'group_section.npy'), np.array(group_sections, dtype=np.int32))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'source': stamp,
+                'section_names': list(section_index),
+                'chapter_names': table.chapter_names,
+                'topic_names': table.topic_names,
+                'concept_names': table.concept_names,
+                'syllabi': list(syllabus_index),
+                'submissions': submissions
+            }, f, ensure_ascii=False)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+def load(json_path: str, cache_dir: str = '.table_cache', mmap: bool = True) -> CachedSubmissions:
+    """Read a submission file through the columnar cache, converting it on first use."""
+    directory = ingest(json_path, cache_dir)
+    meta = _read_meta(directory)
+    mmap_mode = 'r' if mmap else None
+    columns = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode)
+               for name in QuestionTable.COLUMNS}
+    group_submission = np.load(os.path.join(directory, 'group_submission.npy')).tolist()
+    group_section = np.load(os.path.join(directory, 'group_section.npy')).tolist()
+    section_names = meta['section_names']
+    
+    table = QuestionTable(
+        groups=[(index, section_names[code]) for index, code in zip(group_submission, group_section)],
+        chapter_names=meta['chapter_names'],
+        topic_names=meta['topic_names'],
+        concept_names=meta['concept_names'],
+        **columns
+    )
+    syllabi = meta['syllabi']
+    submissions = meta['submissions']
+    for submission in submissions:
+        submission['test']['syllabus'] = syllabi[submission['test']['syllabus']]
+    return CachedSubmissions(json_path, table, submissions)
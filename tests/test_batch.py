@@ -0,0 +1,51 @@
+import json
+import os
+
+from src.batch import run_batch, run_batch_async
+from src.llm_backends import TemplateBackend
+from src.synthetic import write_submissions
+
+
+def _inputs(tmp_path):
+    input_dir = tmp_path / 'inputs'
+    input_dir.mkdir()
+    write_submissions(str(input_dir / 'a_good.json'), 2, 0)
+    write_submissions(str(input_dir / 'c_good.json'), 1, 1)
+    # Cut off inside the second submission
+    with open(input_dir / 'a_good.json', 'r', encoding='utf-8') as f:
+        text = f.read()
+    with open(input_dir / 'b_broken.json', 'w', encoding='utf-8') as f:
+        f.write(text.replace('"_id"', '"_ignored"')[:len(text) * 3 // 4])
+    return str(input_dir)
+
+
+def test_broken_file_is_skipped(tmp_path):
+    output_dir = tmp_path / 'output'
+    stats = run_batch([_inputs(tmp_path)], None, str(output_dir), backend='template',
+                      output_format='html')
+    assert stats['succeeded'] == 4
+    assert stats['failed'] == 1
+    assert os.path.exists(output_dir / '.manifest.json')
+
+
+def test_broken_file_is_skipped_async(tmp_path):
+    backend = TemplateBackend()
+    stats = run_batch_async([_inputs(tmp_path)], None, str(tmp_path / 'output'),
+                            analysis_model=backend, feedback_model=backend, output_format='html')
+    assert stats['succeeded'] == 4
+    assert stats['failed'] == 1
+
+
+def test_malformed_submission_fails_alone_in_columnar_chunk(tmp_path):
+    input_path = str(tmp_path / 'submissions.json')
+    write_submissions(input_path, 5, 0)
+    with open(input_path, 'r', encoding='utf-8') as f:
+        submissions = json.load(f)
+    del submissions[2]['sections']
+    with open(input_path, 'w', encoding='utf-8') as f:
+        json.dump(submissions, f)
+    
+    stats = run_batch([input_path], None, str(tmp_path / 'output'), engine='columnar',
+                      backend='template', output_format='html')
+    assert stats['succeeded'] == 4
+    assert stats['failed'] == 1
@@ -0,0 +1,20 @@
+import numpy as np
+
+from src.cohort import build_cohort
+from src.synthetic import generate_submissions
+
+
+def test_compare_medians_and_fingerprint():
+    submissions = list(generate_submissions(41, 0))
+    cohort = build_cohort(submissions)
+    comparison = cohort.compare(submissions[0])
+    assert comparison['total_marks']['median'] == float(np.median(cohort.total_scores))
+    for i, name in enumerate(cohort.subject_names):
+        if name in comparison['subjects']:
+            assert comparison['subjects'][name]['median'] == float(
+                np.nanmedian(cohort.subject_scores[:, i]))
+    
+    fingerprint = cohort.fingerprint()
+    assert cohort.fingerprint() is fingerprint
+    assert build_cohort(submissions).fingerprint() == fingerprint
+    assert build_cohort(submissions[1:]).fingerprint() != fingerprint
@@ -0,0 +1,58 @@
+import io
+import json
+
+import pytest
+
+from src.json_stream import iter_json_array
+
+VALID = [
+    '[]',
+    ' [ ] ',
+    '[1, -2.5e3, "a,]b\\"c", {"x": [1, {"y": null}]}, true, false, null]',
+    '[{"text": "' + 'x' * 200 + '"}, 12345678901234567890]',
+    '{"a": 1}'
+]
+
+MALFORMED = ['[1,,2]', '[,1]', '[1,]', '[1 2]', '[1, 2', '[{"a": tru}, 1]']
+
+
+class CountingReader(io.StringIO):
+    """StringIO that remembers how much of the text has been read."""
+    
+    read_chars = 0
+    
+    def read(self, size=-1):
+        text = super().read(size)
+        self.read_chars += len(text)
+        return text
+
+
+@pytest.mark.parametrize('text', VALID)
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 20])
+def test_valid_documents(text, chunk_size):
+    expected = json.loads(text)
+    expected = expected if isinstance(expected, list) else [expected]
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == expected
+
+
+@pytest.mark.parametrize('text', MALFORMED)
+@pytest.mark.parametrize('chunk_size', [1, 3, 1 << 20])
+def test_malformed_arrays_raise(text, chunk_size):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+def test_elements_before_an_empty_one_are_yielded():
+    elements = iter_json_array(io.StringIO('[1,,2]'), 2)
+    assert next(elements) == 1
+    with pytest.raises(json.JSONDecodeError):
+        next(elements)
+
+
+def test_bad_element_raises_without_reading_the_rest():
+    good = json.dumps({'text': 'x' * 100})
+    text = '[' + good + ',{"a": tru},' + ','.join([good] * 1000) + ']'
+    f = CountingReader(text)
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(f, 256))
+    assert f.read_chars < 1024
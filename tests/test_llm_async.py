@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from src import llm_async
+from src.llm_async import AsyncLLMDispatcher, TokenBucket, TransientLLMError
+from src.llm_backends import FakeBackend
+
+
+class FlakyBackend(FakeBackend):
+    """Answers 429 to the first ``failures`` calls."""
+    
+    def __init__(self, failures: int, **kwargs):
+        super().__init__(latency=0, jitter=0, **kwargs)
+        self.failures = failures
+        
+    def _respond(self, task):
+        if self.calls < self.failures:
+            self.calls += 1
+            raise TransientLLMError("429 Resource has been exhausted (fake)")
+        return super()._respond(task)
+
+
+def _run_all(dispatcher, prompts, **kwargs):
+    async def run():
+        return await asyncio.gather(*(dispatcher.generate(prompt, **kwargs) for prompt in prompts))
+    return asyncio.run(run())
+
+
+def test_retries_429_with_backoff(monkeypatch):
+    # Always back off the full exponential delay: 0.05s, then 0.1s
+    monkeypatch.setattr(llm_async.random, 'uniform', lambda low, high: high)
+    model = FlakyBackend(failures=2)
+    dispatcher = AsyncLLMDispatcher(model, base_delay=0.05)
+    start = time.perf_counter()
+    assert _run_all(dispatcher, ['prompt']) == [FakeBackend.FEEDBACK_RESPONSE]
+    assert time.perf_counter() - start >= 0.15
+    stats = dispatcher.stats()
+    assert (stats['requests'], stats['retries'], stats['failures']) == (3, 2, 0)
+
+
+def test_gives_up_after_max_retries():
+    dispatcher = AsyncLLMDispatcher(FlakyBackend(failures=10), max_retries=2, base_delay=0)
+    try:
+        _run_all(dispatcher, ['prompt'])
+    except TransientLLMError:
+        pass
+    else:
+        raise AssertionError("expected the last 429 to be raised")
+    assert (dispatcher.stats()['retries'], dispatcher.stats()['failures']) == (2, 1)
+
+
+def test_caps_requests_in_flight():
+    dispatcher = AsyncLLMDispatcher(FakeBackend(latency=0.02, jitter=0), max_in_flight=3)
+    assert len(_run_all(dispatcher, [f'prompt {i}' for i in range(12)])) == 12
+    assert dispatcher.stats()['peak_in_flight'] == 3
+
+
+def test_token_bucket_paces_requests():
+    # 6000/min is 100/s with a one-second burst of 100
+    bucket = TokenBucket(6000)
+    assert bucket.capacity == 100
+    
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire()
+    start = time.perf_counter()
+    asyncio.run(take(150))
+    assert 0.45 <= time.perf_counter() - start < 1.0
+
+
+def test_oversized_request_leaves_bucket_in_debt():
+    bucket = TokenBucket(6000)
+    asyncio.run(bucket.acquire(300))
+    assert bucket.tokens < -150
+
+
+def test_stats_per_model():
+    analysis = FakeBackend(latency=0, jitter=0, model_name='analysis')
+    feedback = FakeBackend(latency=0, jitter=0, model_name='feedback')
+    dispatcher = AsyncLLMDispatcher(analysis)
+    _run_all(dispatcher, ['a', 'b', 'c'])
+    _run_all(dispatcher, ['d', 'e'], model=feedback)
+    models = dispatcher.stats()['models']
+    assert {name: stats['calls'] for name, stats in models.items()} == {'analysis': 3, 'feedback': 2}
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from src import llm_client
+from src.batch import run_batch
+from src.data_processor import DataProcessor
+from src.llm_backends import (FEEDBACK, INSIGHTS, FakeBackend, GeminiBackend, LLMBackend,
+                              TemplateBackend, create_backends)
+from src.llm_cache import LLMCache
+from src.synthetic import generate_submissions, write_submissions
+
+
+class StubModel:
+    model_name = 'models/stub'
+    
+    def __init__(self):
+        self.configs = []
+        
+    def generate_content(self, prompt, generation_config=None):
+        self.configs.append(generation_config)
+        return type('Response', (), {'text': f'echo: {prompt}'})()
+
+
+def _processed():
+    submission = next(generate_submissions(1, seed=3))
+    return DataProcessor(None, None, data=submission, model=TemplateBackend()).process_data()
+
+
+def test_create_backends(monkeypatch):
+    for name, kind in (('template', TemplateBackend), ('fake', FakeBackend)):
+        analysis, feedback = create_backends(name)
+        assert isinstance(analysis, kind)
+        assert analysis is feedback
+    assert create_backends('fake')[0].latency == 0.0
+    
+    stub = StubModel()
+    monkeypatch.setattr(llm_client, 'get_model', lambda model_name=None, api_key=None: stub)
+    analysis, feedback = create_backends('gemini', 'key')
+    assert isinstance(analysis, GeminiBackend)
+    assert analysis is feedback
+    assert analysis.model_name == 'models/stub'
+    assert analysis.generate('hi') == 'echo: hi'
+    assert stub.configs == [None]
+    
+    with pytest.raises(ValueError):
+        create_backends('gpt')
+
+
+def test_cacheable_flags():
+    assert LLMBackend.cacheable
+    assert GeminiBackend(StubModel()).cacheable
+    assert not TemplateBackend.cacheable
+    assert not FakeBackend.cacheable
+
+
+def test_template_backend_is_deterministic():
+    data = _processed()
+    first, second = TemplateBackend(), TemplateBackend()
+    for task in (INSIGHTS, FEEDBACK):
+        assert first.generate('prompt', task, data) == second.generate('other prompt', task, data)
+    insights = json.loads(first.generate('prompt', INSIGHTS, data))
+    assert set(insights) == {'strengths', 'improvements', 'time_management', 'recommendations'}
+    assert first.generate('prompt', FEEDBACK, data).startswith('**Overall Assessment**')
+    
+    with pytest.raises(ValueError):
+        first.generate('prompt', FEEDBACK)
+
+
+def test_uncacheable_backends_bypass_the_cache(tmp_path):
+    cache = LLMCache(str(tmp_path / 'cache'))
+    submission = next(generate_submissions(1))
+    assert DataProcessor(None, None, data=submission, model=TemplateBackend(), cache=cache).cache is None
+    
+    input_path = str(tmp_path / 'submissions.json')
+    write_submissions(input_path, 2)
+    for backend in ('template', 'fake'):
+        stats = run_batch([input_path], None, str(tmp_path / backend), backend=backend,
+                          cache=cache, output_format='html')
+        assert stats['succeeded'] == 2
+    assert cache.stats()['writes'] == 0
+    assert cache.stats()['misses'] == 0
+    assert not list((tmp_path / 'cache').rglob('*.json'))
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+from src.feedback_generator import generate_feedback
+from src.llm_backends import LLMBackend
+from src.llm_cache import LLMCache
+
+
+class EchoBackend(LLMBackend):
+    model_name = 'echo'
+    
+    def generate(self, prompt, task=None, context=None):
+        return f'{prompt} {self.settings}'
+
+
+def _path(cache, model, prompt, settings=None):
+    return cache._path(cache.make_key(model, prompt, settings))
+
+
+def test_round_trip_on_disk(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    assert cache.get('model', 'prompt') is None
+    cache.put('model', 'prompt', 'response')
+    assert cache.get('model', 'prompt') == 'response'
+    # A fresh instance (another run) reads the same entry from disk
+    reopened = LLMCache(str(tmp_path))
+    assert reopened.get('model', 'prompt') == 'response'
+    assert reopened.get('other-model', 'prompt') is None
+    assert (cache.stats()['hits'], cache.stats()['misses'], cache.stats()['writes']) == (1, 1, 1)
+
+
+def test_generation_settings_are_part_of_the_key(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    cache.put('model', 'prompt', 'cold', {'temperature': 0.0})
+    assert cache.get('model', 'prompt', {'temperature': 0.0}) == 'cold'
+    assert cache.get('model', 'prompt', {'temperature': 0.9}) is None
+    assert cache.get('model', 'prompt') is None
+    
+    backend = EchoBackend()
+    assert generate_feedback('prompt', None, model=backend, cache=cache) == 'prompt {}'
+    backend.settings = {'temperature': 0.5}
+    # Same prompt and model, different settings: a miss, not the stored response
+    assert generate_feedback('prompt', None, model=backend, cache=cache) == "prompt {'temperature': 0.5}"
+    assert os.path.exists(_path(cache, 'echo', 'prompt', {'temperature': 0.5}))
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = LLMCache(str(tmp_path), ttl=0.05)
+    cache.put('model', 'prompt', 'response')
+    assert cache.get('model', 'prompt') == 'response'
+    time.sleep(0.1)
+    assert cache.get('model', 'prompt') is None
+    assert not os.path.exists(_path(cache, 'model', 'prompt'))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    text = 'x' * 1000
+    cache = LLMCache(str(tmp_path))
+    cache.put('model', 'a', text)
+    size = os.path.getsize(_path(cache, 'model', 'a'))
+    # Room for three entries; a fourth evicts down to 90% of the budget, i.e. one entry
+    cache = LLMCache(str(tmp_path), max_bytes=int(size * 3.5))
+    cache.put('model', 'b', text)
+    cache.put('model', 'c', text)
+    now = time.time()
+    for age, prompt in ((300, 'a'), (200, 'b'), (100, 'c')):
+        path = _path(cache, 'model', prompt)
+        os.utime(path, (now - age, now - age))
+    # Reading 'a' makes it the most recently used, so 'b' is now the oldest
+    assert cache.get('model', 'a') == text
+    cache.put('model', 'd', text)
+    
+    assert cache.stats()['evictions'] == 1
+    assert cache.get('model', 'b') is None
+    assert all(cache.get('model', prompt) == text for prompt in 'acd')
+
+
+def test_concurrent_access(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    errors = []
+    
+    def work(n):
+        try:
+            for i in range(50):
+                # Half the keys are shared by every thread
+                prompt = f'shared {i}' if i % 2 else f'thread {n} prompt {i}'
+                cache.put('model', prompt, prompt.upper())
+                assert cache.get('model', prompt) == prompt.upper()
+        except Exception as e:
+            errors.append(e)
+            
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.stats()['writes'] == 400
+    assert cache.stats()['hits'] == 400
+    assert not list(tmp_path.rglob('*.tmp'))
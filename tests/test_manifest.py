@@ -0,0 +1,29 @@
+from src import manifest
+from src.batch import run_batch
+from src.synthetic import write_submissions
+
+
+def _run(input_path, tmp_path):
+    return run_batch([input_path], None, str(tmp_path / 'output'), backend='template',
+                     output_format='html')['reports']
+
+
+def test_analysis_version_bump_rebuilds(tmp_path, monkeypatch):
+    input_path = str(tmp_path / 'submissions.json')
+    write_submissions(input_path, 2, 0)
+    
+    assert _run(input_path, tmp_path) == {'rebuilt': 2, 'skipped': 0}
+    assert _run(input_path, tmp_path) == {'rebuilt': 0, 'skipped': 2}
+    monkeypatch.setattr(manifest, 'ANALYSIS_VERSION', manifest.ANALYSIS_VERSION + 1)
+    assert _run(input_path, tmp_path) == {'rebuilt': 2, 'skipped': 0}
+    assert _run(input_path, tmp_path) == {'rebuilt': 0, 'skipped': 2}
+
+
+def test_missing_output_rebuilds(tmp_path):
+    input_path = str(tmp_path / 'submissions.json')
+    write_submissions(input_path, 1, 0)
+    
+    assert _run(input_path, tmp_path) == {'rebuilt': 1, 'skipped': 0}
+    for path in (tmp_path / 'output').rglob('report.html'):
+        path.unlink()
+    assert _run(input_path, tmp_path) == {'rebuilt': 1, 'skipped': 0}
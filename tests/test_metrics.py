@@ -0,0 +1,25 @@
+from src import metrics
+from src.service import percentiles
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 21))
+    assert metrics.percentile(values, 95) == 19
+    assert metrics.percentile(values, 50) == 10
+    assert metrics.percentile(values, 100) == 20
+    assert metrics.percentile([7], 95) == 7
+    assert metrics.percentile([], 95) == 0.0
+
+
+def test_p95_not_below_average_for_skewed_timings():
+    timings = metrics.Timings()
+    for seconds in [0.1] * 18 + [5.0, 5.0]:
+        timings.add(seconds)
+    stats = timings.stats()
+    assert stats['p95'] == 5.0
+    assert stats['p50'] == 0.1
+
+
+def test_service_percentiles():
+    assert percentiles([]) == {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    assert percentiles([3.0, 1.0, 2.0]) == {'p50': 2.0, 'p90': 3.0, 'p99': 3.0, 'max': 3.0}
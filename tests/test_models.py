@@ -0,0 +1,38 @@
+from src.columnar import analyze_submissions
+from src.data_processor import DataProcessor
+from src.llm_backends import TemplateBackend
+from src.models import DROPPED_TEXT, QuestionBank, compact_submissions
+from src.synthetic import generate_submissions
+
+
+def _texts(submission):
+    return [question['questionId']['question']['text']
+            for section in submission['sections'] for question in section['questions']]
+
+
+def test_round_trip_keeps_text():
+    raw = list(generate_submissions(3, 0))
+    bank = QuestionBank()
+    rebuilt = [s.to_dict(bank) for s in compact_submissions(raw, bank)]
+    assert [_texts(s) for s in rebuilt] == [_texts(s) for s in raw]
+    assert [s['test']['syllabus'] for s in rebuilt] == [s['test']['syllabus'] for s in raw]
+    assert analyze_submissions(rebuilt) == analyze_submissions(raw)
+
+
+def test_dropped_text_is_lossy_but_analysable():
+    raw = list(generate_submissions(3, 0))
+    bank = QuestionBank(keep_text=False)
+    rebuilt = [s.to_dict(bank) for s in compact_submissions(raw, bank)]
+    texts = _texts(rebuilt[0])
+    assert all(text.startswith(DROPPED_TEXT.format('')) for text in texts)
+    # Distinct questions keep distinct stand-ins
+    assert len(set(texts)) == len(set(_texts(raw[0])))
+    assert analyze_submissions(rebuilt) == analyze_submissions(raw)
+    # The syllabus maps questions to chapters, so it is kept even without question text
+    assert rebuilt[0]['test']['syllabus'] == raw[0]['test']['syllabus']
+    processor = DataProcessor(None, None, data=rebuilt[0], model=TemplateBackend())
+    syllabus = processor._parse_syllabus()
+    assert syllabus
+    assert syllabus == DataProcessor(None, None, data=raw[0], model=TemplateBackend())._parse_syllabus()
+    data = processor.process_data()
+    assert data['overall_performance']['total_marks_scored'] == raw[0]['totalMarkScored']
@@ -0,0 +1,27 @@
+import json
+import os
+
+from src.batch import report_path, run_batch, submission_id
+from src.synthetic import write_submissions
+
+
+def _run(input_path, tmp_path):
+    return run_batch([input_path], None, str(tmp_path / 'output'), backend='template',
+                     pdf_workers=1)
+
+
+def test_failed_pdf_is_not_recorded(tmp_path):
+    input_path = str(tmp_path / 'submissions.json')
+    write_submissions(input_path, 2, 0)
+    with open(input_path, 'r', encoding='utf-8') as f:
+        submissions = json.load(f)
+    # A directory where the first PDF should go makes its build fail in the worker
+    broken = report_path(str(tmp_path / 'output'), submission_id(submissions[0], input_path, 0))
+    os.makedirs(broken)
+    
+    stats = _run(input_path, tmp_path)
+    assert stats['reports'] == {'rebuilt': 1, 'skipped': 0}
+    assert stats['pdf']['failed'] == 1
+    
+    os.rmdir(broken)
+    assert _run(input_path, tmp_path)['reports'] == {'rebuilt': 1, 'skipped': 1}
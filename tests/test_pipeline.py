@@ -0,0 +1,32 @@
+import json
+import os
+
+from src.batch import report_path, submission_id
+from src.llm_backends import TemplateBackend
+from src.pipeline import run_pipeline
+from src.synthetic import generate_submissions
+
+
+def test_failed_job_does_not_stall_the_pipeline(tmp_path):
+    submissions = list(generate_submissions(5, seed=1))
+    # Fails in the analyze stage, after load has queued it
+    del submissions[1]['sections']
+    input_path = str(tmp_path / 'submissions.json')
+    with open(input_path, 'w', encoding='utf-8') as f:
+        json.dump(submissions, f)
+    output_dir = str(tmp_path / 'output')
+    
+    backend = TemplateBackend()
+    stats = run_pipeline([input_path], None, output_dir, llm_workers=1, queue_size=1,
+                         analysis_model=backend, feedback_model=backend)
+    assert stats['succeeded'] == 4
+    assert stats['failed'] == 1
+    assert stats['pipeline']['stages']['analyze']['failed'] == 1
+    assert stats['pipeline']['stages']['pdf']['processed'] == 4
+    for index, submission in enumerate(submissions):
+        path = report_path(output_dir, submission_id(submission, input_path, index), 'pdf')
+        assert os.path.exists(path) == (index != 1)
+        
+    with open(os.path.join(output_dir, '.manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert len(manifest) == 4
@@ -0,0 +1,16 @@
+from src.data_processor import DataProcessor
+from src.llm_backends import TemplateBackend
+from src.prompt_builder import build_report_prompt
+from src.synthetic import generate_submissions
+
+
+def test_unlimited_budget_reproduces_prompt():
+    backend = TemplateBackend()
+    for submission in generate_submissions(5, 0):
+        data = DataProcessor(None, None, data=submission, model=backend).process_data()
+        prompt, stats = build_report_prompt(data)
+        budgeted, budgeted_stats = build_report_prompt(data, token_budget=10 ** 9)
+        assert budgeted == prompt
+        assert budgeted_stats['dropped_rows'] == 0
+        assert budgeted_stats['full_tokens'] == budgeted_stats['tokens'] == stats['tokens']
+        assert budgeted_stats['rows'] == stats['rows'] > 0
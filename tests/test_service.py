@@ -0,0 +1,88 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from src.llm_backends import FakeBackend
+from src.service import DONE, FAILED, ReportService, make_server
+from src.synthetic import generate_submissions
+
+
+@pytest.fixture
+def start_service(tmp_path):
+    servers = []
+    
+    def start(**kwargs):
+        backend = FakeBackend(latency=0, jitter=0)
+        service = ReportService(str(tmp_path / 'output'), backend, backend, workers=1, **kwargs)
+        server = make_server(service, port=0)
+        service.start()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append((server, service))
+        return server.server_address[1]
+    yield start
+    for server, service in servers:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def _request(port, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, data
+
+
+def _post(port, submission):
+    status, data = _request(port, 'POST', '/jobs', json.dumps(submission).encode('utf-8'))
+    return status, json.loads(data)
+
+
+def _wait(port, job_id):
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        job = json.loads(_request(port, 'GET', f'/jobs/{job_id}')[1])
+        if job['status'] in (DONE, FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_post_poll_and_fetch_pdf(start_service):
+    port = start_service(chart_workers=1, pdf_workers=1)
+    status, job = _post(port, next(generate_submissions(1, 0)))
+    assert status == 202
+    job = _wait(port, job['job_id'])
+    assert job['status'] == DONE
+    status, data = _request(port, 'GET', job['report'])
+    assert status == 200
+    assert data.startswith(b'%PDF')
+
+
+def test_html_format(start_service):
+    port = start_service(output_format='html')
+    job = _wait(port, _post(port, next(generate_submissions(1, 0)))[1]['job_id'])
+    assert job['report'].endswith('/report.html')
+    assert _request(port, 'GET', job['report'])[1].startswith(b'<!DOCTYPE html>')
+    assert json.loads(_request(port, 'GET', f"/jobs/{job['job_id']}/report.json")[1])['feedback']
+    assert _request(port, 'GET', f"/jobs/{job['job_id']}/report.pdf")[0] == 404
+
+
+def test_rejects_bad_requests(start_service):
+    port = start_service(chart_workers=0, pdf_workers=0)
+    status, body = _post(port, {'a': 1})
+    assert status == 400
+    assert 'test' in body['error']
+    assert _request(port, 'POST', '/jobs', b'{}', {'Content-Length': 'abc'})[0] == 400
+    
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.putrequest('POST', '/jobs')
+    connection.endheaders()
+    assert connection.getresponse().status == 411
+    connection.close()
+    assert json.loads(_request(port, 'GET', '/stats')[1])['completed'] == 0
@@ -0,0 +1,42 @@
+import os
+import time
+
+import pytest
+
+from src.shards import LeaseLost, ShardLock
+
+
+def _age(path, seconds):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_stale_lock_is_taken_over_once(tmp_path):
+    path = str(tmp_path / 'locks' / '00000.lock')
+    first = ShardLock.acquire(path, 'a', lease=10)
+    assert first is not None
+    assert ShardLock.acquire(path, 'b', lease=10) is None
+    
+    _age(path, 60)
+    second = ShardLock.acquire(path, 'b', lease=10)
+    assert second is not None and second.owner == 'b'
+    # The fresh lock is not stale, so a third worker can't take it away again
+    assert ShardLock.acquire(path, 'c', lease=10) is None
+    with pytest.raises(LeaseLost):
+        first.refresh()
+    second.refresh()
+
+
+def test_takeover_in_progress_blocks_others(tmp_path):
+    path = str(tmp_path / '00000.lock')
+    assert ShardLock.acquire(path, 'a', lease=10) is not None
+    _age(path, 60)
+    # Another worker holds the takeover marker
+    open(path + '.takeover', 'w').close()
+    assert ShardLock.acquire(path, 'b', lease=10) is None
+    
+    # A marker left by a worker that died mid-takeover is cleared after the lease
+    _age(path + '.takeover', 60)
+    assert ShardLock.acquire(path, 'b', lease=10) is None
+    lock = ShardLock.acquire(path, 'b', lease=10)
+    assert lock is not None and lock.owner == 'b'
@@ -0,0 +1,31 @@
+import json
+import os
+
+from src.batch import run_batch
+from src.synthetic import write_submissions
+
+
+def _run(input_path, tmp_path):
+    return run_batch([input_path], None, str(tmp_path / 'output'), backend='template',
+                     table_cache_dir=str(tmp_path / 'table_cache'), output_format='html')
+
+
+def test_answer_edit_rebuilds_report(tmp_path):
+    input_path = str(tmp_path / 'submissions.json')
+    write_submissions(input_path, 1, 0)
+    
+    assert _run(input_path, tmp_path)['reports'] == {'rebuilt': 1, 'skipped': 0}
+    assert _run(input_path, tmp_path)['reports'] == {'rebuilt': 0, 'skipped': 1}
+    
+    # Flip one marked answer; nothing outside the sections changes
+    with open(input_path, 'r', encoding='utf-8') as f:
+        submissions = json.load(f)
+    option = submissions[0]['sections'][0]['questions'][0]['markedOptions'][0]
+    option['isCorrect'] = not option['isCorrect']
+    with open(input_path, 'w', encoding='utf-8') as f:
+        json.dump(submissions, f)
+    stat = os.stat(input_path)
+    # Make sure the table cache sees a new file even on coarse-mtime filesystems
+    os.utime(input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    
+    assert _run(input_path, tmp_path)['reports'] == {'rebuilt': 1, 'skipped': 0}